@@ -0,0 +1,71 @@
+"""
+Benchmark AITerminalAssistant construction
+------------------------------------------
+python benchmarks/bench_assistant_init.py [--repeat N]
+
+Reports the median wall time of:
+- construct:        AITerminalAssistant(...) alone
+- construct+roles:  construction plus touching all four AI roles (the old eager cost)
+- first command:    construction plus the Command Executor role only
+- reload:           switching configuration on a live assistant (reconfigure() when
+                    available, otherwise building a new assistant like older releases)
+"""
+
+import argparse
+import statistics
+import time
+
+from promptshell.ai_terminal_assistant import AITerminalAssistant
+from promptshell.setup import load_config, get_active_model
+
+ROLE_ATTRS = ("command_executor", "error_handler", "debugger", "question_answerer")
+
+def _median_ms(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per measurement (default: 20)")
+    args = parser.parse_args()
+
+    config = load_config()
+    model_name = get_active_model()
+
+    def construct():
+        return AITerminalAssistant(model_name, config=config)
+
+    def construct_with_roles():
+        assistant = construct()
+        for attr in ROLE_ATTRS:
+            getattr(assistant, attr)
+
+    def first_command():
+        construct().command_executor
+
+    assistant = construct()
+    assistant.command_executor
+
+    def reload():
+        if hasattr(AITerminalAssistant, "reconfigure"):
+            assistant.reconfigure(model_name, config=config)
+            assistant.command_executor
+        else:
+            AITerminalAssistant(model_name, config=config)
+
+    construct()  # Warm up imports and on-disk caches
+    results = {
+        "construct": _median_ms(construct, args.repeat),
+        "construct+roles": _median_ms(construct_with_roles, args.repeat),
+        "first command": _median_ms(first_command, args.repeat),
+        "reload": _median_ms(reload, args.repeat),
+    }
+    for name, elapsed in results.items():
+        print(f"{name:<18}{elapsed:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark Node calls against the fake LLM server
+------------------------------------------------
+python benchmarks/bench_fake_provider.py [--repeat N] [--latency S] [--tokens-per-second N]
+                                         [--error-rate R] [--providers openai anthropic ollama]
+
+Runs offline and reproducibly: every provider protocol is served by
+promptshell.fake_llm_server with the given latency and generation speed.
+For each provider it reports the median wall time of
+- call:             Node.__call__ (complete response)
+- stream ttft:      first streamed token of Node.stream
+- stream total:     whole Node.stream
+- command:          Node.generate_command (stops at the first complete command)
+and the client overhead: median call time minus the time the server spent
+simulating the response.
+"""
+
+import argparse
+import statistics
+import time
+
+from promptshell.fake_llm_server import FakeLLMServer, split_tokens
+from promptshell.node import Node
+
+RESPONSE = "find . -name '*.py' -mtime -1\n\nThis lists Python files changed in the last day."
+
+def _median_ms(samples):
+    return statistics.median(samples) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per measurement (default: 10)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token (default: 0.2)")
+    parser.add_argument("--tokens-per-second", type=float, default=50, help="Generation speed (default: 50)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail (default: 0)")
+    parser.add_argument("--providers", nargs="+", default=["openai", "anthropic", "ollama"],
+                        choices=["openai", "anthropic", "ollama"], help="Protocols to measure")
+    args = parser.parse_args()
+
+    simulated = args.latency + (len(split_tokens(RESPONSE)) - 1) / args.tokens_per_second
+    with FakeLLMServer(latency=args.latency, tokens_per_second=args.tokens_per_second, error_rate=args.error_rate,
+                       default_response=RESPONSE, seed=0) as server:
+        print(f"{'provider':<12}{'call':>10}{'stream ttft':>13}{'stream total':>14}{'command':>10}{'overhead':>10}")
+        for provider in args.providers:
+            config = {
+                "MODE": "local" if provider == "ollama" else "api", "ACTIVE_API_PROVIDER": provider,
+                f"{provider.upper()}_API_KEY": "fake", "FALLBACK_TO_LOCAL": "false", "TELEMETRY": "false",
+                **server.config([provider]),
+            }
+            node = Node("fake-model", "Command Executor", config=config)
+            node("warm up", remember=False)  # SDK import and connection setup
+
+            calls, ttfts, totals, commands = [], [], [], []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                node("list python files changed today", remember=False)
+                calls.append(time.perf_counter() - start)
+
+                for _ in node.stream("list python files changed today"):
+                    pass
+                ttfts.append(node.last_timing["ttft"])
+                totals.append(node.last_timing["total"])
+
+                start = time.perf_counter()
+                node.generate_command("list python files changed today")
+                commands.append(time.perf_counter() - start)
+                node.context.clear()
+
+            print(f"{provider:<12}{_median_ms(calls):8.1f}ms{_median_ms(ttfts):11.1f}ms{_median_ms(totals):12.1f}ms"
+                  f"{_median_ms(commands):8.1f}ms{_median_ms(calls) - simulated * 1000:8.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Replay recorded sessions as a regression benchmark
+--------------------------------------------------
+python benchmarks/bench_replay.py REQUESTS --record CASSETTE
+python benchmarks/bench_replay.py REQUESTS --cassette CASSETTE [--repeat N] [--time-scale F]
+
+REQUESTS holds one REPL input per line (blank lines and '#' comments are
+skipped), e.g. "list files larger than 100MB" or "? what does chmod 755 do".
+
+--record runs every input once through AITerminalAssistant.execute_command
+with the configured providers and writes their traffic to CASSETTE. These are
+real API requests and are billed by the providers.
+
+--cassette replays the inputs through the same pipeline offline, answering
+every provider call from CASSETTE with the recorded timing multiplied by
+--time-scale (1 = as recorded, 0 = instant, which leaves only PromptShell's
+own overhead). For each input it reports the median and minimum wall time
+and the answer or proposed command of the first run, marking inputs the
+cassette had no response for.
+
+Commands are never executed: every confirmation prompt is declined. The
+response and semantic caches are disabled so each run reaches the providers.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from unittest import mock
+
+from promptshell.ai_terminal_assistant import AITerminalAssistant
+from promptshell.batch import read_requests
+from promptshell.cassette import get_cassette, load_entries
+from promptshell.setup import load_config, get_active_model
+
+def _run(assistant, request):
+    """Runs one input, declining every prompt. Returns the wall time and the answer or proposed command."""
+
+    prompts = []
+
+    def declined(message, *args, **kwargs):
+        prompts.append(message)
+        return mock.Mock(ask=mock.Mock(return_value=False))
+
+    start = time.perf_counter()
+    with mock.patch("promptshell.ai_terminal_assistant.questionary.confirm", side_effect=declined):
+        output = assistant.execute_command(request)
+    return time.perf_counter() - start, str(output or "") or (prompts[0] if prompts else "")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("requests", help="File with one REPL input per line")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--record", metavar="CASSETTE", help="Record the provider traffic of the inputs")
+    mode.add_argument("--cassette", metavar="CASSETTE", help="Replay the inputs from a recorded cassette")
+    parser.add_argument("--repeat", type=int, default=5, help="Replays of the whole session (default: 5)")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Factor on the recorded timing (default: 1)")
+    args = parser.parse_args()
+
+    with open(args.requests, "r") as file:
+        requests = read_requests(file)
+    config = {
+        **load_config(), "RESPONSE_CACHE": "false", "SEMANTIC_CACHE": "false", "TELEMETRY": "false",
+        "CASSETTE_MODE": "record" if args.record else "replay",
+        "CASSETTE_PATH": os.path.abspath(args.record or args.cassette), "CASSETTE_TIME_SCALE": str(args.time_scale),
+    }
+    repeat = 1 if args.record else max(args.repeat, 1)
+    if args.cassette:
+        recorded = sum(entry.get("latency", 0.0) for entry in load_entries(config["CASSETTE_PATH"]))
+        print(f"Replaying {len(requests)} inputs x {repeat} from {args.cassette} "
+              f"({recorded:.2f}s of recorded provider time, scale {args.time_scale:g})", file=sys.stderr)
+
+    timings = {index: [] for index in range(len(requests))}
+    outputs = {}
+    for _ in range(repeat):
+        get_cassette(config).rewind()
+        # A fresh assistant per run, so every run starts with empty histories
+        assistant = AITerminalAssistant(get_active_model(config), config=config)
+        for index, request in enumerate(requests):
+            seconds, output = _run(assistant, request)
+            timings[index].append(seconds)
+            outputs.setdefault(index, output)
+
+    print(f"{'#':>3}  {'median':>9}  {'min':>9}  {'request':<40}  output")
+    for index, request in enumerate(requests):
+        samples = timings[index]
+        missed = "No recorded response" in outputs[index]
+        output = outputs[index].strip().splitlines()[0] if outputs[index].strip() else ""
+        print(f"{index:>3}  {statistics.median(samples) * 1000:7.1f}ms  {min(samples) * 1000:7.1f}ms  "
+              f"{request[:40]:<40}  {'MISS ' if missed else ''}{output[:60]}")
+    session = [sum(timings[index][run] for index in timings) for run in range(repeat)]
+    print(f"Session: median {statistics.median(session):.2f}s, min {min(session):.2f}s over {repeat} runs")
+    if args.record:
+        print(f"Recorded {len(get_cassette(config).entries)} provider calls to {args.record}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark per-role models
+-------------------------
+python benchmarks/bench_role_models.py [--repeat N] [--price MODEL=INPUT,OUTPUT ...]
+
+Sends representative inputs to every AI role, once through the provider and
+model configured for the role (ROLE_<NAME>_PROVIDER / ROLE_<NAME>_MODEL) and
+once through the active model, and reports per role and model:
+- median / p90:  wall time of a call
+- tokens:        mean prompt and completion tokens per call (~ when estimated)
+- cost:          mean USD per call, for models given a --price in USD per
+                 million input and output tokens (e.g. --price gpt-4o=2.5,10)
+- errors:        calls that failed
+
+The Command Executor is called through generate_command(), the streamed path
+the REPL uses, and the other roles as the REPL calls them. Roles without an
+override are only measured once. The calls are real API requests and are
+billed by the providers.
+"""
+
+import argparse
+import statistics
+import time
+
+from promptshell.ai_terminal_assistant import AITerminalAssistant, ROLES
+from promptshell.setup import load_config, get_active_model
+from promptshell.token_utils import estimate_message_tokens, estimate_tokens, track_usage
+
+def _role_inputs(assistant):
+    return {
+        "command_executor": [
+            assistant._translation_input("list all files larger than 100MB in this directory"),
+            assistant._translation_input("show how much disk space my home folder uses"),
+            assistant._translation_input("find python files modified in the last day"),
+        ],
+        "error_handler": [
+            assistant._correction_input("ls: invalid option -- 'z'", "list files by size", "ls -z"),
+            assistant._correction_input("grep: *.py: No such file or directory", "search for TODO", "grep TODO *.py"),
+        ],
+        "debugger": [
+            assistant._debug_input("python3 app.py", "ModuleNotFoundError: No module named 'flask'", 1),
+            assistant._debug_input("git push", "fatal: The current branch has no upstream branch.", 128),
+        ],
+        "question_answerer": [
+            "Question: what does chmod 755 do\nPlease provide a clear and concise answer to the question.",
+            "Question: what is the difference between a hard link and a symlink\nPlease provide a clear and concise answer.",
+        ],
+    }
+
+def _parse_prices(entries):
+    prices = {}
+    for entry in entries:
+        model, _, rates = entry.partition("=")
+        input_rate, _, output_rate = rates.partition(",")
+        prices[model.strip()] = (float(input_rate), float(output_rate or input_rate))
+    return prices
+
+def _measure(node, inputs, repeat, command=False):
+    latencies, prompt_tokens, completion_tokens = [], [], []
+    errors = 0
+    estimated = False
+    for _ in range(repeat):
+        for node_input in inputs:
+            messages = node._build_messages(node_input)
+            start = time.perf_counter()
+            with track_usage() as usage:
+                output = node.generate_command(node_input) if command else node(node_input, remember=False)
+            latencies.append(time.perf_counter() - start)
+            if command:
+                node.context.clear()  # generate_command() remembers the exchange, keep prompts comparable
+            if output.startswith(("Error in processing", "Unsupported provider")):
+                errors += 1
+            estimated = estimated or "prompt_tokens" not in usage
+            prompt_tokens.append(usage.get("prompt_tokens", estimate_message_tokens(messages)))
+            completion_tokens.append(usage.get("completion_tokens", estimate_tokens(output)))
+    latencies.sort()
+    return {
+        "median": statistics.median(latencies),
+        "p90": latencies[min(int(len(latencies) * 0.9), len(latencies) - 1)],
+        "prompt_tokens": statistics.mean(prompt_tokens),
+        "completion_tokens": statistics.mean(completion_tokens),
+        "estimated": estimated,
+        "errors": errors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of each input (default: 3)")
+    parser.add_argument("--price", action="append", default=[], metavar="MODEL=INPUT,OUTPUT",
+                        help="USD per million input and output tokens of a model (repeatable)")
+    parser.add_argument("--roles", nargs="+", choices=list(ROLES), default=list(ROLES), help="Roles to measure")
+    args = parser.parse_args()
+
+    config = load_config()
+    model_name = get_active_model(config)
+    prices = _parse_prices(args.price)
+    configured = AITerminalAssistant(model_name, config=config)
+    baseline = AITerminalAssistant(model_name, config={key: value for key, value in config.items()
+                                                       if not key.startswith("ROLE_")})
+    inputs = _role_inputs(configured)
+
+    print(f"{'role':<20}{'provider/model':<36}{'median':>9}{'p90':>9}{'tokens in/out':>16}{'cost':>11}{'errors':>8}")
+    for name in args.roles:
+        assistants = [configured]
+        if configured.role_model(name) != baseline.role_model(name):
+            assistants.append(baseline)
+        for assistant in assistants:
+            node = getattr(assistant, name)
+            result = _measure(node, inputs[name], args.repeat, command=name == "command_executor")
+            marker = "~" if result["estimated"] else ""
+            tokens = f"{marker}{result['prompt_tokens']:.0f}/{result['completion_tokens']:.0f}"
+            cost = "-"
+            if node.model_name in prices:
+                input_rate, output_rate = prices[node.model_name]
+                cost = f"${(result['prompt_tokens'] * input_rate + result['completion_tokens'] * output_rate) / 1e6:.5f}"
+            print(f"{ROLES[name]:<20}{node.provider + '/' + node.model_name:<36}{result['median']:8.2f}s"
+                  f"{result['p90']:8.2f}s{tokens:>16}{cost:>11}{result['errors']:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import subprocess
 import shlex
@@ -13,62 +14,199 @@ from .data_gatherer import DataGatherer
 from .format_utils import text_theme, reset_format, get_current_os, get_os_specific_examples
 from .system_info import get_system_info
 from .alias_manager import AliasManager
+from .executable_index import ExecutableIndex, command_program
+from .setup import get_config_snapshot, get_provider, config_flag, config_number, default_api_model
+from .response_cache import ResponseCache
+from .semantic_cache import SemanticCache
+from .providers import run_sync, client_pool
+from .provider_router import router
+from .token_utils import prompt_cache_stats
+
+# Attribute name -> role name of the AI nodes, created on first use
+ROLES = {
+    "command_executor": "Command Executor",
+    "error_handler": "Error Handler",
+    "debugger": "Debugger Expert",
+    "question_answerer": "Question Answerer",
+}
+
+# Per-role Node options. The Command Executor only needs one shell line, so it
+# gets a small token limit and stops at a new example; its stream is cancelled
+# after the first complete command. A blank-line stop is not used, as it ends
+# the response right away when the model starts with an empty line. Its prompt
+# budget is also smaller, since it rarely needs a whole file.
+ROLE_OPTIONS = {
+    "command_executor": {"max_tokens": 256, "stop": ["\nUser:"], "prompt_tokens": 4096},
+}
+
+# Largest part of a file read into a prompt as additional data
+MAX_FILE_READ_BYTES = 256 * 1024
 
 class AITerminalAssistant:
     def __init__(self, model_name: str, max_tokens: int = 8000, config: dict = None):
         """Initializes the AI Terminal Assistant.
+
+        AI roles and their definitions are only built when a role is first used.
         
         Args:
             model_name: Name of the AI model to use
             max_tokens: Maximum tokens for AI responses (default: 8000)
-            config: Configuration dictionary (default: None)
+            config: Configuration snapshot (default: current snapshot)
         """
 
         self.username = getpass.getuser()
         self.home_folder = os.path.expanduser("~")
         self.current_directory = os.getcwd()
-        self.config = config or {}
         self.alias_manager = AliasManager()
-        self.command_executor = Node(model_name, "Command Executor", max_tokens=max_tokens, config=self.config)
-        self.error_handler = Node(model_name, "Error Handler", max_tokens=max_tokens, config=self.config)
-        self.debugger = Node(model_name, "Debugger Expert", max_tokens=max_tokens, config=self.config)
-        self.question_answerer = Node(model_name, "Question Answerer", max_tokens=max_tokens, config=self.config)
         self.data_gatherer = DataGatherer()
         self.command_history = []
+        self.system_context = None
+        self._role_contexts = {}
+        self.reconfigure(model_name, max_tokens=max_tokens, config=config)
 
-        self.initialize_system_context()
+    def reconfigure(self, model_name: str, max_tokens: int = None, config: dict = None):
+        """Switches model and configuration, keeping history and system context.
 
-    def initialize_system_context(self):
-        """Sets up the initial context and definitions for AI roles."""
+        Roles are rebuilt on their next use and continue the conversation
+        history of the previous ones.
 
-        path_dirs = os.environ.get('PATH', '').split(os.pathsep)
-        installed_commands = []
-        for dir in path_dirs:
-            if os.path.isdir(dir):
-                try:
-                    installed_commands.extend([f for f in os.listdir(dir) if os.access(os.path.join(dir, f), os.X_OK)])
-                except PermissionError:
-                    continue
-        installed_commands = list(set(installed_commands))
-        
+        Args:
+            model_name: Name of the AI model to use
+            max_tokens: Maximum tokens for AI responses (default: unchanged)
+            config: Configuration snapshot (default: current snapshot)
+        """
+
+        self.model_name = model_name
+        if max_tokens is not None:
+            self.max_tokens = max_tokens
+        self.config = config or get_config_snapshot()
+        self._response_cache = None
+        self._semantic_cache = None
+        for attr in ROLES:
+            node = self.__dict__.pop(attr, None)
+            if node is not None:
+                self._role_contexts[attr] = node.context
+
+    @property
+    def response_cache(self):
+        """Translation cache, opened on first use. None when RESPONSE_CACHE is disabled."""
+
+        if self._response_cache is None and config_flag(self.config, "RESPONSE_CACHE", default=True):
+            try:
+                self._response_cache = ResponseCache(
+                    max_entries=int(config_number(self.config, "RESPONSE_CACHE_SIZE", 500)),
+                    ttl=config_number(self.config, "RESPONSE_CACHE_TTL", 7 * 24 * 3600),
+                )
+            except Exception:
+                return None  # Unwritable config directory, run without a cache
+        return self._response_cache
+
+    @property
+    def semantic_cache(self):
+        """Similarity cache of accepted translations. None when SEMANTIC_CACHE is disabled."""
+
+        if self._semantic_cache is None and config_flag(self.config, "SEMANTIC_CACHE", default=True):
+            try:
+                self._semantic_cache = SemanticCache(
+                    threshold=config_number(self.config, "SEMANTIC_CACHE_THRESHOLD", 0.8),
+                    max_entries=int(config_number(self.config, "SEMANTIC_CACHE_SIZE", 1000)),
+                )
+            except Exception:
+                return None
+        return self._semantic_cache
+
+    def role_model(self, name: str) -> Tuple[str, str]:
+        """Gets the provider and model serving an AI role.
+
+        ROLE_<NAME>_PROVIDER and ROLE_<NAME>_MODEL (e.g.
+        ROLE_COMMAND_EXECUTOR_MODEL) override the active provider and model for
+        one role. A role switched to another provider without a model uses
+        LOCAL_MODEL on Ollama and the setup wizard's default model elsewhere,
+        never the active model, which the other provider would not know.
+
+        Args:
+            name: Role attribute name (e.g. "command_executor")
+
+        Returns:
+            Tuple of (provider, model)
+
+        Raises:
+            ValueError: If the role's provider has no default model and ROLE_<NAME>_MODEL is empty
+        """
+
+        provider = str(self.config.get(f"ROLE_{name.upper()}_PROVIDER", "")).strip().lower() or get_provider(self.config)
+        model = str(self.config.get(f"ROLE_{name.upper()}_MODEL", "")).strip()
+        if model or provider == get_provider(self.config):
+            return provider, model or self.model_name
+        model = str(self.config.get("LOCAL_MODEL", "")).strip() if provider == "ollama" else default_api_model(provider)
+        if not model:
+            raise ValueError(f"ROLE_{name.upper()}_PROVIDER is {provider}, set ROLE_{name.upper()}_MODEL "
+                             f"to the {provider} model to use")
+        return provider, model
+
+    def __getattr__(self, name):
+        """Creates AI role nodes on first access."""
+
+        if name not in ROLES:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        options = {
+            "max_tokens": self.max_tokens,
+            "context_tokens": int(config_number(self.config, "CONTEXT_TOKEN_BUDGET", 2048)),
+            "prompt_tokens": int(config_number(self.config, "PROMPT_TOKEN_BUDGET", 8192)),
+            **ROLE_OPTIONS.get(name, {}),
+        }
+        provider, model = self.role_model(name)
+        node = Node(model, ROLES[name], config=self.config, provider=provider, **options)
+        node.definition = getattr(self, f"_{name}_definition")(self.initialize_system_context())
+        context = self._role_contexts.pop(name, None)
+        if context is not None:
+            context.max_tokens = node.context.max_tokens
+            node.context = context
+        setattr(self, name, node)
+        return node
+
+    def initialize_system_context(self) -> dict:
+        """Gathers the system context shared by the AI role definitions.
+
+        The context is collected once and kept across reconfigure() calls.
+
+        Returns:
+            Dictionary with the executable index, PATH directories, installed commands and system info
+        """
+
+        if self.system_context is not None:
+            return self.system_context
+
+        executable_index = ExecutableIndex()
         try:
             system_info = get_system_info()
         except Exception:
-            system_info = "Unable to retrieve system information"
+            system_info = {}
+
+        self.system_context = {
+            "executable_index": executable_index,
+            "path_dirs": executable_index.path_dirs,
+            "installed_commands": executable_index.commands(),
+            "system_info": system_info,
+        }
+        return self.system_context
 
-        self.command_executor.definition = f"""
+    def _command_executor_definition(self, context: dict) -> str:
+        """Renders the Command Executor role definition."""
+
+        return f"""
         [ROLE] Shell Command Interpreter
         [TASK] Translate natural language requests into precise shell commands
         
         [CONTEXT]
         User: {self.username}
         Shell: {os.environ.get('SHELL', 'Unknown')}
-        OS: {system_info.get('os', 'Unknown')} {system_info.get('release', '')}
-        CPU: {system_info.get('cpu', 'Unknown')}
-        Architecture: {system_info.get('machine', 'Unknown')}
-        Platform: {system_info.get('platform', 'Unknown')}
+        OS: {context['system_info'].get('os', 'Unknown')} {context['system_info'].get('release', '')}
+        CPU: {context['system_info'].get('cpu', 'Unknown')}
+        Architecture: {context['system_info'].get('machine', 'Unknown')}
+        Platform: {context['system_info'].get('platform', 'Unknown')}
         Path: {self.current_directory}
-        Installations: {', '.join(installed_commands[:75])}
+        Installations: {', '.join(context['installed_commands'][:75])}
         
         [GUIDELINES]
         1. Output ONLY valid shell commands - no explanations
@@ -97,13 +235,16 @@ class AITerminalAssistant:
         CMD: grep -rnw './' -e 'timeout'
         """
 
-        self.error_handler.definition = f"""
+    def _error_handler_definition(self, context: dict) -> str:
+        """Renders the Error Handler role definition."""
+
+        return f"""
         [ROLE] Command Error Diagnostician
         [TASK] Analyze failed commands and suggest fixes
         
         [ANALYSIS FRAMEWORK]
         1. Check path resolution
-        2. Verify command exists in {path_dirs}
+        2. Verify command exists in {context['path_dirs']}
         3. Validate file/directory permissions
         4. Check argument syntax
         5. Look for typos or similar valid commands
@@ -118,8 +259,11 @@ class AITerminalAssistant:
         Solution: Confirm file existence with 'ls'
         Alternative: Use trash-cli instead of rm
         """
-        
-        self.debugger.definition = """
+
+    def _debugger_definition(self, context: dict) -> str:
+        """Renders the Debugger Expert role definition."""
+
+        return """
         [ROLE] Shell Environment Debugger
         [TASK] Diagnose complex system issues
         
@@ -143,7 +287,10 @@ class AITerminalAssistant:
         Verify: echo $PATH | grep '/missing/path'
         """
 
-        self.question_answerer.definition = f"""
+    def _question_answerer_definition(self, context: dict) -> str:
+        """Renders the Question Answerer role definition."""
+
+        return f"""
         [ROLE] Technical Knowledge Engineer
         [TASK] Provide accurate, context-aware answers
         
@@ -157,7 +304,7 @@ class AITerminalAssistant:
         [CONTEXT AWARENESS]
         - Current directory: {self.current_directory}
         - Recent commands: {self.command_history[-3:]}
-        - System resources: {system_info.get('memory', 'Unknown')}
+        - System resources: {context['system_info'].get('memory', 'Unknown')}
         
         [EXAMPLE]
         Question: Monitor CPU usage?
@@ -259,21 +406,45 @@ class AITerminalAssistant:
                 if expanded != user_input[1:]:
                     print(f"Expanded to: {expanded}")
                 return self.run_direct_command(expanded)
+            bypass_cache = user_input.startswith("--fresh ")
+            if bypass_cache:
+                user_input = user_input[len("--fresh "):].strip()
             additional_data = self.gather_additional_data(user_input)
-            command = self.command_executor(f"""
-            User Input: {user_input}
-            Current OS: {get_current_os()}
-            Current OS specific examples: {get_os_specific_examples()}
-            Current Directory: {self.current_directory}
-            Translate the user input into a SINGLE shell command according to the operating system.
-            Return ONLY the command, nothing else.
-            If the input is already a valid shell command, return it as is.
-            Do not provide any explanations or comments.
-            Use the actual filenames and content provided in the additional data.
-            """, additional_data=additional_data).strip()
+
+            # Requests carrying file or clipboard content are never cached
+            use_cache = not bypass_cache and not additional_data
+            cache = self.response_cache if use_cache else None
+            semantic_cache = self.semantic_cache if use_cache else None
+            cache_key = None
+            command = None
+            if cache is not None:
+                provider, model = self.role_model("command_executor")
+                cache_key = cache.make_key(user_input, get_current_os(), model, provider, self.current_directory)
+                command = cache.get(cache_key)
+                if command is not None:
+                    print(text_theme('info') + "(cached translation)" + reset_format())
+
+            similar = False
+            if command is None and semantic_cache is not None:
+                match = semantic_cache.lookup(user_input, get_current_os(), self.current_directory)
+                if match is not None:
+                    command, score, original = match
+                    similar = True
+                    print(text_theme('info') + f"(similar to '{original}', score {score:.2f})" + reset_format())
+
+            cached = command is not None
+            if not cached:
+                command = self.command_executor.generate_command(
+                    self._translation_input(user_input), additional_data=additional_data
+                ).strip()
 
             choice = questionary.confirm(f"Do you want to run the command '{command}'?").ask()
             if choice:
+                if (not cached or similar) and not command.startswith(("Error in processing", "SafetyError")):
+                    if cache_key is not None:
+                        cache.put(cache_key, user_input, command)
+                    if semantic_cache is not None and not similar:
+                        semantic_cache.add(user_input, command, get_current_os(), self.current_directory)
                 if command.startswith("CONFIRM:"):
                     confirmation = questionary.confirm(f"Warning: This command may be destructive. Are you sure you want to run '{command[9:]}'?").ask()
                     if not confirmation:
@@ -298,8 +469,7 @@ class AITerminalAssistant:
                     _, stderr, exit_code = self.execute_command_with_live_output(command)
                     result = ""
                     if exit_code != 0:
-                        debug_suggestion = self.debug_error(command, stderr, exit_code)
-                        result += text_theme('tip') + f"\n\nDebugging Suggestion:\n{debug_suggestion}" + reset_format()
+                        result += self._debug_suggestion(command, stderr, exit_code)
                 return result.strip()
             else:
                 print(text_theme('info') + "Command cancelled!" + reset_format())
@@ -338,8 +508,7 @@ class AITerminalAssistant:
                 _, stderr, exit_code = self.execute_command_with_live_output(command)
                 result = ""
                 if exit_code != 0:
-                    debug_suggestion = self.debug_error(command, stderr, exit_code)
-                    result += text_theme('tip') + f"\n\nDebugging Suggestion:\n{debug_suggestion}" + reset_format()
+                    result += self._debug_suggestion(command, stderr, exit_code)
                 return result.strip()
         except Exception as e:
             return self.handle_error(str(e), command, command)
@@ -359,14 +528,47 @@ class AITerminalAssistant:
         {', '.join(self.command_history)}
         Current Directory: {self.current_directory}
         """
-        answer = self.question_answerer(f"""
+        question_input = f"""
         Question: {question.strip('?')}
         Context:
         {context}
         Please provide a clear and concise answer to the question, taking into account the given context.
-        """)
+        """
+        if self.stream_responses:
+            self.stream_to_terminal(self.question_answerer, question_input, "Answer:\n", 'success')
+            return ""
+        answer = self.question_answerer(question_input)
         return text_theme('success') + "Answer:\n" + answer + reset_format()
 
+    @property
+    def stream_responses(self) -> bool:
+        """Whether long answers are printed token by token (STREAM_RESPONSES)."""
+
+        return config_flag(self.config, "STREAM_RESPONSES", default=True)
+
+    def stream_to_terminal(self, node: Node, input_text: str, title: str, theme: str) -> str:
+        """Prints a node's response as it streams in, followed by its latency.
+        
+        Args:
+            node: AI node to query
+            input_text: Input prompt
+            title: Heading printed before the response
+            theme: Theme key used for the heading and response
+            
+        Returns:
+            Full response text
+        """
+
+        print(text_theme(theme) + title, end="", flush=True)
+        chunks = []
+        for chunk in node.stream(input_text):
+            chunks.append(chunk)
+            print(chunk, end="", flush=True)
+        print(reset_format())
+        timing = node.last_timing
+        print(text_theme('info') + f"[first token {timing['ttft']:.2f}s | total {timing['total']:.2f}s]" + reset_format())
+        return "".join(chunks).strip()
+
     def gather_additional_data(self, user_input: str) -> dict:
         """Collects supplementary data based on user input.
         
@@ -386,8 +588,10 @@ class AITerminalAssistant:
             words = user_input.split()
             for word in words:
                 if os.path.isfile(word):
-                    with open(word, 'r') as file:
-                        file_content = file.read()
+                    with open(word, 'r', errors='replace') as file:
+                        file_content = file.read(MAX_FILE_READ_BYTES)
+                        if file.read(1):
+                            file_content += f"\n[... file truncated after {MAX_FILE_READ_BYTES} characters ...]"
                     additional_data["file_content"] = file_content
                     additional_data["target_file"] = word
                     break
@@ -405,6 +609,69 @@ class AITerminalAssistant:
             Debugging suggestion string
         """
 
+        debug_input = self._debug_input(command, error_output, exit_code)
+        if self.stream_responses:
+            return self.stream_to_terminal(self.debugger, debug_input, "\nDebugging Suggestion:\n", 'tip')
+        return self.debugger(debug_input)
+
+    def _debug_suggestion(self, command: str, error_output: str, exit_code: int) -> str:
+        """Runs the debugger on a failed command.
+        
+        Args:
+            command: Failed command
+            error_output: Error message from command execution
+            exit_code: Exit status of failed command
+            
+        When responses are not streamed, the debugger and the error handler run
+        concurrently so a corrected command comes at no extra latency.
+
+        Returns:
+            Formatted suggestion to append to the result, empty if it was already streamed
+        """
+
+        if self.stream_responses:
+            self.debug_error(command, error_output, exit_code)
+            return ""
+        debug_suggestion, corrected_command = self.analyze_failure(command, error_output, exit_code)
+        result = text_theme('tip') + f"\n\nDebugging Suggestion:\n{debug_suggestion}" + reset_format()
+        if corrected_command and not corrected_command.startswith("Error in processing"):
+            result += text_theme('tip') + f"\nSuggested command: {corrected_command}" + reset_format()
+        return result
+
+    def _translation_input(self, user_input: str) -> str:
+        """Builds the Command Executor input translating a request into a command.
+
+        Args:
+            user_input: Natural-language request
+
+        Returns:
+            Node input text
+        """
+
+        return f"""
+            User Input: {user_input}
+            Current OS: {get_current_os()}
+            Current OS specific examples: {get_os_specific_examples()}
+            Current Directory: {self.current_directory}
+            Translate the user input into a SINGLE shell command according to the operating system.
+            Return ONLY the command, nothing else.
+            If the input is already a valid shell command, return it as is.
+            Do not provide any explanations or comments.
+            Use the actual filenames and content provided in the additional data.
+            """
+
+    def _debug_input(self, command: str, error_output: str, exit_code: int) -> str:
+        """Builds the Debugger input for a failed command.
+
+        Args:
+            command: Failed command
+            error_output: Error message from command execution
+            exit_code: Exit status of failed command
+
+        Returns:
+            Node input text
+        """
+
         context = f"""
         Command History (last 10 commands):
         {', '.join(self.command_history)}
@@ -413,13 +680,120 @@ class AITerminalAssistant:
         Error Output: {error_output}
         Exit Code: {exit_code}
         """
-        debug_input = f"""
+        executable_index = self.initialize_system_context()["executable_index"]
+        program = command_program(command)
+        if program and not executable_index.exists(program) and not os.path.exists(os.path.expanduser(program)):
+            similar = executable_index.find_similar(program)
+            context += f"""Note: '{program}' was not found on PATH.
+        Similar installed commands: {', '.join(similar) if similar else 'None'}
+        """
+        return f"""
         Analyze the following command and its error output.
         Provide a brief explanation of what went wrong and suggest a solution or alternative approach.
         Keep your response concise and focused on solving the immediate issue.
         {context}
         """
-        return self.debugger(debug_input)
+
+    def _correction_input(self, error: str, user_input: str, command: str) -> str:
+        """Builds the Error Handler input asking for a corrected command.
+
+        Args:
+            error: Error message
+            user_input: Original user input
+            command: Command that caused the error
+
+        Returns:
+            Node input text
+        """
+
+        return f"""
+        Error: {error}
+        User Input: {user_input}
+        Interpreted Command: {command}
+        Current Directory: {self.current_directory}
+        Provide ONLY a single, simple corrected command. No explanations.
+        """
+
+    async def analyze_failure_async(self, command: str, error_output: str, exit_code: int) -> Tuple[str, str]:
+        """Asks the Debugger and the Error Handler about a failed command concurrently.
+
+        Args:
+            command: Failed command
+            error_output: Error message from command execution
+            exit_code: Exit status of failed command
+
+        Returns:
+            Tuple of (debugging suggestion, corrected command)
+        """
+
+        debug_suggestion, corrected_command = await asyncio.gather(
+            self.debugger.acall(self._debug_input(command, error_output, exit_code)),
+            self.error_handler.acall(self._correction_input(error_output, command, command)),
+        )
+        return debug_suggestion, corrected_command
+
+    def analyze_failure(self, command: str, error_output: str, exit_code: int) -> Tuple[str, str]:
+        """Synchronous wrapper of analyze_failure_async()."""
+
+        return run_sync(self.analyze_failure_async(command, error_output, exit_code))
+
+    def status_report(self) -> str:
+        """Formats provider health, recent routing decisions and cache metrics.
+
+        Returns:
+            Multi-line status text
+        """
+
+        lines = [text_theme('section_header', bold=True) + "[Roles]" + reset_format()]
+        for name, role in ROLES.items():
+            try:
+                provider, model = self.role_model(name)
+                lines.append(f"  {role:<20}{provider}/{model}")
+            except ValueError as e:
+                lines.append(f"  {role:<20}{e}")
+
+        lines.append(text_theme('section_header', bold=True) + "[Providers]" + reset_format())
+        status = router.status()
+        if not status:
+            lines.append("  No provider calls yet")
+        for provider, health in status.items():
+            latency = "-" if health["median_latency"] is None else f"{health['median_latency']:.2f}s"
+            line = (f"  {provider:<12}{health['state']:<11}errors {health['error_rate']:>6.1%}  "
+                    f"median {latency:>7}")
+            if health["state"] != "closed" and health["last_error"]:
+                line += f"  last error: {health['last_error'][:60]}"
+            lines.append(line)
+
+        if router.decisions:
+            lines.append(text_theme('section_header', bold=True) + "[Recent Routing]" + reset_format())
+            for decision in list(router.decisions)[-5:]:
+                route = decision["used"] if decision["used"] == decision["requested"] \
+                    else f"{decision['requested']} -> {decision['used']} (failover)"
+                lines.append(f"  {decision['role']:<20}{route}")
+
+        lines.append(text_theme('section_header', bold=True) + "[Clients]" + reset_format())
+        for provider, stats in client_pool.client_stats().items():
+            lines.append(f"  {provider:<12}clients created {stats['created']}  pool hits {stats['pool_hits']}  "
+                         f"pool hit rate {stats['pool_hit_ratio']:.0%}")
+
+        lines.append(text_theme('section_header', bold=True) + "[Caches]" + reset_format())
+        for name, cache in (("translations", self._response_cache), ("similar", self._semantic_cache)):
+            if cache is not None:
+                stats = cache.stats()
+                lines.append(f"  {name:<12}hits {stats['hits']}  misses {stats['misses']}  "
+                             f"hit rate {stats['hit_rate']:.0%}  entries {stats['entries']}")
+
+        prompt_cache = prompt_cache_stats.stats()
+        if prompt_cache:
+            lines.append(text_theme('section_header', bold=True) + "[Prompt Cache]" + reset_format())
+            for role, stats in prompt_cache.items():
+                latencies = [
+                    f"{label} {stats[key]:.2f}s" for label, key in (("cached", "cached_latency"), ("uncached", "uncached_latency"))
+                    if stats[key] is not None
+                ]
+                lines.append(f"  {role:<20}calls {stats['calls']}  cached {stats['cached_tokens']}/{stats['prompt_tokens']} "
+                             f"tokens ({stats['hit_rate']:.0%})  " + "  ".join(latencies))
+        return "\n".join(lines)
 
     def handle_error(self, error: str, user_input: str, command: str) -> str:
         """Handles execution errors and suggests corrections.
@@ -433,13 +807,7 @@ class AITerminalAssistant:
             Error handling result message
         """
         
-        error_analysis = self.error_handler(f"""
-        Error: {error}
-        User Input: {user_input}
-        Interpreted Command: {command}
-        Current Directory: {self.current_directory}
-        Provide ONLY a single, simple corrected command. No explanations.
-        """)
+        error_analysis = self.error_handler(self._correction_input(error, user_input, command))
         error_msg = text_theme('error') + f"Error occurred: {error}" + reset_format()
         suggestion_msg = text_theme('tip') + f"Suggested command: {error_analysis}" + reset_format()
         print(error_msg)
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import sys
+import time
+
+from typing import IO, Iterable, List
+
+from .command_parser import first_complete_command
+from .providers import run_sync
+from .token_utils import estimate_message_tokens, estimate_tokens, track_usage
+
+def read_requests(stream: IO[str]) -> List[str]:
+    """Reads one natural-language request per line.
+
+    Blank lines and lines starting with '#' are skipped.
+
+    Args:
+        stream: Text stream to read
+
+    Returns:
+        List of requests
+    """
+
+    return [line.strip() for line in stream if line.strip() and not line.lstrip().startswith("#")]
+
+class BatchTranslator:
+    def __init__(self, assistant, concurrency: int = 4):
+        """Translates many requests into commands with bounded concurrency.
+
+        Requests go through the assistant's Command Executor with the same
+        prompt as in the REPL, without being added to its history.
+
+        Args:
+            assistant: AITerminalAssistant providing the Command Executor
+            concurrency: Maximum number of requests in flight (default: 4)
+        """
+
+        self.assistant = assistant
+        self.concurrency = max(concurrency, 1)
+
+    async def translate(self, index: int, request: str, semaphore: asyncio.Semaphore) -> dict:
+        """Translates a single request.
+
+        Args:
+            index: Position of the request in the input
+            request: Natural-language request
+            semaphore: Semaphore bounding concurrent requests
+
+        Returns:
+            Result record
+        """
+
+        async with semaphore:
+            node_input = self.assistant._translation_input(request)
+            start = time.perf_counter()
+            with track_usage() as usage:
+                output = await self.assistant.command_executor.acall(node_input, remember=False)
+            latency = time.perf_counter() - start
+
+        error = output if output.startswith(("Error in processing", "Unsupported provider")) else None
+        command = None if error else first_complete_command(output, final=True) or output
+        prompt_tokens = usage.get("prompt_tokens")
+        completion_tokens = usage.get("completion_tokens")
+        estimated = prompt_tokens is None or completion_tokens is None
+        if prompt_tokens is None:
+            prompt_tokens = estimate_message_tokens(self.assistant.command_executor._build_messages(node_input))
+        if completion_tokens is None:
+            completion_tokens = estimate_tokens(output)
+        return {
+            "index": index,
+            "request": request,
+            "command": command,
+            "error": error,
+            "latency_ms": round(latency * 1000, 1),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "tokens_estimated": estimated,
+        }
+
+    async def run(self, requests: Iterable[str], output: IO[str]) -> List[dict]:
+        """Translates all requests and writes JSON Lines results in input order.
+
+        Results are written as soon as every earlier request has finished.
+
+        Args:
+            requests: Natural-language requests
+            output: Text stream receiving one JSON object per line
+
+        Returns:
+            Result records in input order
+        """
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = [asyncio.ensure_future(self.translate(index, request, semaphore)) for index, request in enumerate(requests)]
+        results = []
+        for task in tasks:
+            result = await task
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            results.append(result)
+        return results
+
+def summarize(results: List[dict], seconds: float) -> str:
+    """Formats a one-line summary of a batch run.
+
+    Args:
+        results: Result records
+        seconds: Wall time of the run
+
+    Returns:
+        Summary text
+    """
+
+    errors = sum(1 for result in results if result["error"])
+    tokens = sum(result["prompt_tokens"] + result["completion_tokens"] for result in results)
+    return f"Translated {len(results)} requests in {seconds:.1f}s ({errors} errors, {tokens} tokens)"
+
+def run_batch(assistant, source: str = "-", concurrency: int = 4, output: IO[str] = None) -> int:
+    """Runs batch translation of a requests file.
+
+    Args:
+        assistant: AITerminalAssistant providing the Command Executor
+        source: Path of the requests file, or "-" for stdin (default: "-")
+        concurrency: Maximum number of requests in flight (default: 4)
+        output: Text stream receiving the JSON Lines results (default: stdout)
+
+    Returns:
+        Exit status: 0 if every request was translated, 1 otherwise, 2 if the requests file cannot be read
+    """
+
+    output = output or sys.stdout
+    if source == "-":
+        requests = read_requests(sys.stdin)
+    else:
+        try:
+            with open(source, "r") as file:
+                requests = read_requests(file)
+        except OSError as e:
+            print(f"Cannot read requests from {source}: {e.strerror or e}", file=sys.stderr)
+            return 2
+
+    start = time.perf_counter()
+    results = run_sync(BatchTranslator(assistant, concurrency).run(requests, output))
+    print(summarize(results, time.perf_counter() - start), file=sys.stderr)
+    return 1 if any(result["error"] for result in results) else 0
@@ -0,0 +1,296 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+from typing import Awaitable, Callable, Iterator, List
+
+from .setup import CONFIG_DIR, config_number
+from .token_utils import metered, record_usage, track_usage
+
+CASSETTE_DIR = os.path.join(CONFIG_DIR, "cassettes")
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when a request has no recorded response."""
+
+def request_key(role: str, messages: List[dict]) -> str:
+    """Gets the key a request is recorded and replayed under.
+
+    Args:
+        role: Node role name
+        messages: Chat messages
+
+    Returns:
+        Hex digest of the role and messages
+    """
+
+    payload = json.dumps([role, messages], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def load_entries(path: str) -> List[dict]:
+    """Reads the interactions stored in a cassette file.
+
+    Args:
+        path: Cassette file (JSON Lines, one interaction per line)
+
+    Returns:
+        Interactions in recording order
+    """
+
+    with open(path, "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+def _replay_usage(entry: dict):
+    usage = entry.get("usage") or {}
+    record_usage(usage.get("prompt_tokens"), usage.get("completion_tokens"),
+                 usage.get("cached_tokens"), usage.get("cache_write_tokens"))
+
+class Cassette:
+    def __init__(self, path: str, mode: str = "replay", time_scale: float = 1.0):
+        """Recorded provider traffic for offline, deterministic replays.
+
+        In record mode every successful provider call is appended to the file
+        with its messages, response, reported token usage and timing; streamed
+        responses keep the offset of each chunk. In replay mode requests are
+        answered from the file instead of the provider, with the recorded
+        timing multiplied by `time_scale` (0 replays instantly).
+
+        A request is matched by its role and exact messages first, so repeated
+        runs replay the same answers. Otherwise the next unused interaction of
+        the role is used, which keeps a session replayable when the prompt
+        differs slightly (e.g. another working directory or date).
+
+        Args:
+            path: Cassette file (JSON Lines)
+            mode: "record" or "replay" (default: "replay")
+            time_scale: Factor applied to the recorded timing (default: 1.0)
+
+        Raises:
+            ValueError: If the mode is unknown
+            OSError: If a cassette to replay cannot be read
+        """
+
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode '{mode}' (use record or replay)")
+        self.path = path
+        self.mode = mode
+        self.time_scale = max(time_scale, 0.0)
+        self._lock = threading.Lock()
+        self.entries = load_entries(path) if mode == "replay" else []
+        self._used = set()
+
+    def rewind(self):
+        """Makes every recorded interaction available again, e.g. before the next benchmark run."""
+
+        with self._lock:
+            self._used.clear()
+
+    def _append(self, entry: dict):
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.entries.append(entry)
+
+    @staticmethod
+    def _entry(node, messages: List[dict], response: str, latency: float, usage: dict = None,
+               chunks: list = None, complete: bool = True) -> dict:
+        return {
+            "time": time.time(),
+            "key": request_key(node.name, messages),
+            "role": node.name,
+            "provider": node.provider,
+            "model": node.model_name,
+            "messages": messages,
+            "response": response,
+            "latency": round(latency, 4),
+            "chunks": chunks,
+            "complete": complete,
+            "usage": usage or {},
+        }
+
+    def record_call(self, node, messages: List[dict], send: Callable[[], str]) -> str:
+        """Sends a request and records its response.
+
+        Args:
+            node: Node making the call
+            messages: Chat messages
+            send: Zero-argument callable calling the provider
+
+        Returns:
+            Provider response
+        """
+
+        start = time.perf_counter()
+        with track_usage() as usage:
+            response = send()
+        self._append(self._entry(node, messages, response, time.perf_counter() - start, usage))
+        return response
+
+    async def arecord_call(self, node, messages: List[dict], send: Callable[[], Awaitable[str]]) -> str:
+        """Async version of record_call()."""
+
+        start = time.perf_counter()
+        with track_usage() as usage:
+            response = await send()
+        self._append(self._entry(node, messages, response, time.perf_counter() - start, usage))
+        return response
+
+    def record_stream(self, node, messages: List[dict], chunks: Iterator[str]) -> Iterator[str]:
+        """Passes a provider stream through, recording every chunk with its offset and the reported usage.
+
+        A stream closed early (e.g. once a command is complete) is recorded
+        up to that point.
+
+        Args:
+            node: Node making the call
+            messages: Chat messages
+            chunks: Provider stream
+
+        Yields:
+            Response text chunks
+        """
+
+        start = time.perf_counter()
+        recorded = []
+        usage = {}
+
+        def save(complete):
+            response = "".join(chunk for _, chunk in recorded)
+            self._append(self._entry(node, messages, response, time.perf_counter() - start, usage,
+                                     chunks=recorded, complete=complete))
+
+        chunks = metered(chunks, usage)
+        try:
+            for chunk in chunks:
+                recorded.append([round(time.perf_counter() - start, 4), chunk])
+                yield chunk
+        except GeneratorExit:
+            save(complete=False)
+            raise
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+        save(complete=True)
+
+    def find(self, node, messages: List[dict]) -> dict:
+        """Picks the recorded interaction answering a request.
+
+        Args:
+            node: Node making the call
+            messages: Chat messages
+
+        Returns:
+            Recorded interaction
+
+        Raises:
+            CassetteMissError: If nothing was recorded for the request or its role
+        """
+
+        key = request_key(node.name, messages)
+        with self._lock:
+            exact = [index for index, entry in enumerate(self.entries) if entry.get("key") == key]
+            unused = [index for index in exact if index not in self._used]
+            if not unused and not exact:
+                unused = [index for index, entry in enumerate(self.entries)
+                          if entry.get("role") == node.name and index not in self._used]
+            if unused:
+                index = unused[0]
+            elif exact:
+                index = exact[-1]  # Replayed more often than recorded
+            else:
+                raise CassetteMissError(f"No recorded response for {node.name} in {self.path}")
+            self._used.add(index)
+            return self.entries[index]
+
+    def _offsets(self, entry: dict) -> list:
+        chunks = entry.get("chunks")
+        if chunks is None:
+            chunks = [[entry.get("latency", 0.0), entry.get("response", "")]]
+        return [(offset * self.time_scale, chunk) for offset, chunk in chunks]
+
+    def replay_call(self, node, messages: List[dict]) -> str:
+        """Answers a request from the cassette after the recorded latency.
+
+        Args:
+            node: Node making the call
+            messages: Chat messages
+
+        Returns:
+            Recorded response
+        """
+
+        entry = self.find(node, messages)
+        time.sleep(entry.get("latency", 0.0) * self.time_scale)
+        _replay_usage(entry)
+        return entry.get("response", "")
+
+    async def areplay_call(self, node, messages: List[dict]) -> str:
+        """Async version of replay_call()."""
+
+        entry = self.find(node, messages)
+        await asyncio.sleep(entry.get("latency", 0.0) * self.time_scale)
+        _replay_usage(entry)
+        return entry.get("response", "")
+
+    def replay_stream(self, node, messages: List[dict]) -> Iterator[str]:
+        """Streams a recorded response with the recorded chunk timing.
+
+        Responses recorded from complete calls arrive as one chunk after
+        their latency.
+
+        Args:
+            node: Node making the call
+            messages: Chat messages
+
+        Yields:
+            Response text chunks
+        """
+
+        entry = self.find(node, messages)
+        start = time.perf_counter()
+        try:
+            for offset, chunk in self._offsets(entry):
+                delay = offset - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+                yield chunk
+        finally:
+            _replay_usage(entry)
+
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+def get_cassette(config: dict):
+    """Gets the cassette selected by CASSETTE_MODE, CASSETTE_PATH and CASSETTE_TIME_SCALE.
+
+    Cassettes are shared by all nodes of the process, so a replay consumes
+    each recorded interaction once.
+
+    Args:
+        config: Configuration snapshot
+
+    Returns:
+        Cassette, or None when CASSETTE_MODE is off
+    """
+
+    mode = str(config.get("CASSETTE_MODE", "off")).strip().lower() or "off"
+    if mode == "off":
+        return None
+    path = os.path.expanduser(str(config.get("CASSETTE_PATH", "")).strip()) or os.path.join(CASSETTE_DIR, "session.jsonl")
+    time_scale = config_number(config, "CASSETTE_TIME_SCALE", 1.0)
+    with _cassettes_lock:
+        cassette = _cassettes.get((path, mode))
+        if cassette is None:
+            cassette = _cassettes[(path, mode)] = Cassette(path, mode)
+        cassette.time_scale = max(time_scale, 0.0)
+        return cassette
+
+def reset_cassettes():
+    """Forgets the loaded cassettes, so the next replay reads the files again."""
+
+    with _cassettes_lock:
+        _cassettes.clear()
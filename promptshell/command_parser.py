@@ -0,0 +1,133 @@
+import platform
+import re
+
+from typing import Optional
+
+# Windows shells use backslashes in paths, not as escapes or line continuations
+POSIX = platform.system() != "Windows"
+
+# Endings that mean the command continues on the next line
+CONTINUATION_SUFFIXES = ("\\", "|", "&&")
+
+FENCE_PATTERN = re.compile(r"^\s*```[\w+-]*\s*$")
+
+# Sentences around the command, e.g. "Here's the command:" or "Sure, this lists files"
+PROSE_PATTERN = re.compile(r"^[A-Z][a-z']*,?\s+[a-z][a-z']*\b")
+INLINE_CODE_PATTERN = re.compile(r"`([^`\n]+)`")
+LABELLED_COMMAND_PATTERN = re.compile(r"\bcommand\b[^:]*:\s*(\S.*)$", re.IGNORECASE)
+
+def is_balanced_command(command: str, posix: bool = POSIX) -> bool:
+    """Checks whether a shell command line is syntactically complete.
+
+    Quotes must be closed, brackets balanced outside of quotes, and the line
+    must not end with a pipe, logical operator or line continuation.
+    Here-documents are treated as incomplete since their body follows later.
+
+    Args:
+        command: Command text, possibly spanning several lines
+        posix: False for Windows shells, where a backslash is an ordinary character (default: this OS)
+
+    Returns:
+        True if the command can be run as-is, False otherwise
+    """
+
+    stripped = command.strip()
+    suffixes = CONTINUATION_SUFFIXES if posix else tuple(suffix for suffix in CONTINUATION_SUFFIXES if suffix != "\\")
+    if not stripped or stripped.endswith(suffixes):
+        return False
+
+    pairs = {")": "(", "}": "{", "]": "["}
+    stack = []
+    quote = None
+    escaped = False
+    for index, char in enumerate(stripped):
+        if escaped:
+            escaped = False
+            continue
+        if char == "\\" and quote != "'" and posix:
+            escaped = True
+            continue
+        if quote:
+            if char == quote:
+                quote = None
+            continue
+        if char in ("'", '"', "`"):
+            quote = char
+        elif char in "({[":
+            stack.append(char)
+        elif char in ")}]":
+            if not stack or stack.pop() != pairs[char]:
+                return False
+        elif stripped.startswith("<<", index) and not stripped.startswith("<<<", index) \
+                and not stripped.endswith("<", 0, index):
+            return False  # Here-document, its body follows on later lines
+    return quote is None and not stack and not escaped
+
+def is_prose(line: str) -> bool:
+    """Checks whether a line of model output is a sentence rather than a command.
+
+    Sentences start with a capitalized word followed by a lowercase one, or
+    are lead-ins of several words ending with a colon.
+
+    Args:
+        line: Line of model output
+
+    Returns:
+        True if the line reads as prose
+    """
+
+    stripped = line.strip()
+    return bool(PROSE_PATTERN.match(stripped)) or (stripped.endswith(":") and len(stripped.split()) >= 3)
+
+def _command_in_prose(line: str, posix: bool) -> Optional[str]:
+    """Gets a command quoted in a sentence, e.g. "Run `ls -la`" or "The command is: ls"."""
+
+    for code in INLINE_CODE_PATTERN.findall(line):
+        if is_balanced_command(code, posix):
+            return code.strip()
+    match = LABELLED_COMMAND_PATTERN.search(line)
+    if match and not is_prose(match.group(1)) and is_balanced_command(match.group(1), posix):
+        return match.group(1).strip()
+    return None
+
+def first_complete_command(text: str, final: bool = False, posix: bool = POSIX) -> Optional[str]:
+    """Extracts the first complete command from (possibly partial) model output.
+
+    Leading blank lines, Markdown code fences and sentences (whose
+    apostrophes would read as open quotes) are skipped, but a command quoted
+    in such a sentence is used. Only lines that end with a newline are
+    considered unless the output is final, since the last line of a stream
+    may still be growing.
+
+    Args:
+        text: Model output received so far
+        final: True once the model has finished responding
+        posix: False for Windows shells, where a backslash is an ordinary character (default: this OS)
+
+    Returns:
+        The command, or None if no complete command has arrived yet
+    """
+
+    lines = text.split("\n")
+    if not final:
+        lines = lines[:-1]  # Drop the unterminated last line
+
+    candidate = []
+    for line in lines:
+        if not candidate and (not line.strip() or FENCE_PATTERN.match(line)):
+            continue
+        if not candidate and is_prose(line):
+            command = _command_in_prose(line, posix)
+            if command is not None:
+                return command
+            continue
+        if candidate and FENCE_PATTERN.match(line):
+            break
+        candidate.append(line)
+        command = "\n".join(candidate).strip()
+        if is_balanced_command(command, posix):
+            return command
+
+    if final and candidate:
+        return "\n".join(candidate).strip()
+    return None
@@ -0,0 +1,104 @@
+from typing import Iterator
+
+from .token_utils import estimate_tokens
+
+class ContextWindow:
+    def __init__(self, max_tokens: int = 2048, keep_recent: int = 4, summary_chars: int = 80):
+        """Token-budgeted conversation history of a node.
+
+        The most recent messages are kept verbatim. Once the history exceeds
+        its budget, the oldest messages are compacted into one-line summaries
+        until it is back under three quarters of the budget, so compaction runs
+        in batches rather than on every turn. The token count is updated in
+        place on append and only recounted after a compaction.
+
+        Args:
+            max_tokens: Token budget of the history (default: 2048)
+            keep_recent: Number of messages never compacted (default: 4)
+            summary_chars: Length messages are shortened to in the summary (default: 80)
+        """
+
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.summary_chars = summary_chars
+        self.messages = []
+        self.summary = []
+        self._tokens = 0
+
+    def append(self, role: str, content: str):
+        """Adds a message and compacts the history if it is over budget.
+
+        Args:
+            role: Message role ("user" or "assistant")
+            content: Message text
+        """
+
+        self.messages.append({"role": role, "content": content})
+        self._tokens += estimate_tokens(self._render_message(self.messages[-1]))
+        if self._tokens > self.max_tokens:
+            self._compact()
+
+    def summary_text(self) -> str:
+        """Returns the summary of compacted messages, empty if nothing was compacted."""
+
+        return f"Summary of earlier conversation: {' | '.join(self.summary)}" if self.summary else ""
+
+    @property
+    def tokens(self) -> int:
+        """Estimated token count of the history, summary included."""
+
+        return self._tokens
+
+    def clear(self):
+        """Forgets the whole history."""
+
+        self.messages.clear()
+        self.summary.clear()
+        self._tokens = 0
+
+    def _compact(self):
+        """Moves the oldest messages into the summary until under 3/4 of the budget."""
+
+        target = self.max_tokens * 3 // 4
+        while self._tokens > target and len(self.messages) > self.keep_recent:
+            message = self.messages.pop(0)
+            self._tokens -= estimate_tokens(self._render_message(message))
+            self.summary.append(self._summarize(message))
+            self._tokens += estimate_tokens(self.summary[-1])
+        # Chat APIs expect the turns to start with a user message
+        while len(self.messages) > 1 and self.messages[0]["role"] != "user":
+            self.summary.append(self._summarize(self.messages.pop(0)))
+
+        # The summary gets at most a quarter of the budget
+        while self.summary and estimate_tokens(" ".join(self.summary)) > self.max_tokens // 4:
+            self.summary.pop(0)
+
+        lines = [f"system {self.summary_text()}"] if self.summary else []
+        lines.extend(self._render_message(message) for message in self.messages)
+        self._tokens = sum(estimate_tokens(line) for line in lines)
+
+    def _summarize(self, message: dict) -> str:
+        """Shortens a message to its first line, truncated."""
+
+        text = message["content"].strip().split("\n", 1)[0]
+        if len(text) > self.summary_chars:
+            text = text[:self.summary_chars - 3] + "..."
+        return f"{message['role']}: {text}"
+
+    @staticmethod
+    def _render_message(message: dict) -> str:
+        return f"{message['role']} {message['content']}"
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.messages)
+
+    def __getitem__(self, index):
+        return self.messages[index]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, list):
+            return self.messages == other
+        return NotImplemented
@@ -0,0 +1,220 @@
+import bisect
+import difflib
+import json
+import os
+import re
+import shlex
+
+from typing import Optional
+
+from .setup import CONFIG_DIR
+
+INDEX_FILE = os.path.join(CONFIG_DIR, "executables.json")
+
+# Commands run by the shell itself, which are never found on PATH
+SHELL_BUILTINS = frozenset({
+    ".", ":", "alias", "bg", "bind", "break", "builtin", "case", "cd", "continue", "declare", "dirs", "disown",
+    "eval", "exit", "export", "fg", "for", "function", "hash", "history", "if", "jobs", "let", "local", "popd",
+    "pushd", "read", "readonly", "return", "set", "shift", "shopt", "source", "trap", "type", "typeset", "ulimit",
+    "umask", "unalias", "unset", "until", "wait", "while",
+})
+if os.name == "nt":
+    SHELL_BUILTINS |= {"cls", "copy", "del", "dir", "echo", "erase", "md", "mkdir", "move", "rd", "ren", "rmdir", "start"}
+
+# Wrappers that run the command following them, with their options that take an argument
+COMMAND_PREFIXES = {
+    "sudo": {"-u", "-g", "-C", "-D", "-h", "-p", "-r", "-t", "-U"},
+    "doas": {"-u", "-C"},
+    "env": {"-u", "-C", "-S"},
+    "nice": {"-n"},
+    "nohup": set(),
+    "time": set(),
+    "command": set(),
+    "exec": set(),
+}
+
+ASSIGNMENT_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+
+def command_program(command: str) -> Optional[str]:
+    """Gets the program a shell command line runs.
+
+    Leading environment assignments (FOO=1) and wrappers such as sudo and
+    env, with their options, are skipped.
+
+    Args:
+        command: Shell command line
+
+    Returns:
+        Program name or path, or None for empty commands and shell builtins
+    """
+
+    try:
+        words = shlex.split(command) if os.name != "nt" else command.split()
+    except ValueError:
+        words = command.split()  # Unbalanced quotes
+    index = 0
+    while index < len(words):
+        word = words[index]
+        if ASSIGNMENT_PATTERN.match(word):
+            index += 1
+            continue
+        if word not in COMMAND_PREFIXES:
+            return None if word in SHELL_BUILTINS else word
+        option_arguments = COMMAND_PREFIXES[word]
+        index += 1
+        while index < len(words) and words[index].startswith("-"):
+            index += 2 if words[index] in option_arguments else 1
+    return None
+
+class ExecutableIndex:
+    def __init__(self, path_dirs: list = None):
+        """Persistent index of the executables found on PATH.
+
+        Each directory is stored with the mtime it had when it was scanned, so a
+        refresh only lists directories whose contents changed since the last run.
+
+        Args:
+            path_dirs: Directories to index (default: entries of $PATH)
+        """
+
+        if path_dirs is None:
+            path_dirs = os.environ.get('PATH', '').split(os.pathsep)
+        self.path_dirs = [d for d in path_dirs if d]
+        self.directories = {}
+        self._commands = []
+        self._command_set = set()
+        self._sorted_commands = []
+        self.load_index()
+        self.refresh()
+
+    def load_index(self):
+        """Loads the index from persistent storage."""
+
+        if os.path.exists(INDEX_FILE):
+            try:
+                with open(INDEX_FILE, 'r') as f:
+                    self.directories = json.load(f).get('directories', {})
+            except (json.JSONDecodeError, IOError, AttributeError):
+                self.directories = {}
+
+    def save_index(self):
+        """Saves the index to persistent storage."""
+
+        try:
+            with open(INDEX_FILE, 'w') as f:
+                json.dump({'directories': self.directories}, f)
+        except IOError:
+            pass
+
+    def refresh(self) -> int:
+        """Rescans PATH directories that changed since they were indexed.
+
+        Returns:
+            Number of directories that were rescanned
+        """
+
+        rescanned = 0
+        for directory in self.path_dirs:
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            entry = self.directories.get(directory)
+            if entry is not None and entry.get('mtime') == mtime:
+                continue
+            self.directories[directory] = {'mtime': mtime, 'commands': self._scan_directory(directory)}
+            rescanned += 1
+
+        # Forget directories that are no longer on PATH or no longer exist
+        stale = [d for d in self.directories if d not in self.path_dirs or not os.path.isdir(d)]
+        for directory in stale:
+            del self.directories[directory]
+
+        if rescanned or stale:
+            self.save_index()
+        self._build_lookup()
+        return rescanned
+
+    @staticmethod
+    def _scan_directory(directory: str) -> list:
+        """Lists the executable entries of a directory.
+
+        Args:
+            directory: Directory to scan
+
+        Returns:
+            Sorted list of executable names
+        """
+
+        try:
+            return sorted(f for f in os.listdir(directory) if os.access(os.path.join(directory, f), os.X_OK))
+        except (PermissionError, NotADirectoryError, FileNotFoundError):
+            return []
+
+    def _build_lookup(self):
+        """Builds the in-memory lookup structures in PATH order."""
+
+        seen = set()
+        commands = []
+        for directory in self.path_dirs:
+            for command in self.directories.get(directory, {}).get('commands', []):
+                if command not in seen:
+                    seen.add(command)
+                    commands.append(command)
+        self._commands = commands
+        self._command_set = seen
+        self._sorted_commands = sorted(seen)
+
+    def commands(self) -> list:
+        """Returns all indexed executables, first PATH match wins.
+
+        Returns:
+            List of executable names in PATH order
+        """
+
+        return list(self._commands)
+
+    def exists(self, name: str) -> bool:
+        """Checks whether an executable is available on PATH.
+
+        Args:
+            name: Executable name
+
+        Returns:
+            True if found, False otherwise
+        """
+
+        return name in self._command_set
+
+    def find_prefix(self, prefix: str, limit: int = None) -> list:
+        """Finds executables starting with a prefix.
+
+        Args:
+            prefix: Name prefix
+            limit: Maximum number of results (optional)
+
+        Returns:
+            Sorted list of matching executable names
+        """
+
+        start = bisect.bisect_left(self._sorted_commands, prefix)
+        matches = []
+        for command in self._sorted_commands[start:]:
+            if not command.startswith(prefix) or (limit is not None and len(matches) >= limit):
+                break
+            matches.append(command)
+        return matches
+
+    def find_similar(self, name: str, limit: int = 5, cutoff: float = 0.6) -> list:
+        """Finds executables with names similar to the given one.
+
+        Args:
+            name: Possibly misspelled executable name
+            limit: Maximum number of results (default: 5)
+            cutoff: Minimum similarity ratio between 0 and 1 (default: 0.6)
+
+        Returns:
+            List of close matches, best first
+        """
+
+        return difflib.get_close_matches(name, self._sorted_commands, n=limit, cutoff=cutoff)
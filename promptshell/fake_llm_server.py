@@ -0,0 +1,401 @@
+"""
+Local stand-in for LLM provider APIs, for offline tests and benchmarks.
+
+Speaks the OpenAI chat completions, Anthropic messages and Ollama chat and
+generate protocols, with and without streaming. Point providers at it with
+<PROVIDER>_BASE_URL (OPENAI_BASE_URL=http://127.0.0.1:8765/v1,
+ANTHROPIC_BASE_URL=http://127.0.0.1:8765, GROQ_BASE_URL=http://127.0.0.1:8765)
+or OLLAMA_HOST=http://127.0.0.1:8765.
+
+python -m promptshell.fake_llm_server [--port 8765] [--latency 0.3] [--tokens-per-second 40]
+                                      [--error-rate 0.1] [--error-status 429] [--script script.json]
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List
+
+from .token_utils import estimate_message_tokens
+
+def _text(content) -> str:
+    """Flattens message content given as a string or a list of content blocks."""
+
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(block if isinstance(block, str) else str(block.get("text", "")) for block in content)
+    return ""
+
+def split_tokens(text: str) -> List[str]:
+    """Splits a response into the pieces streamed as tokens (words with their leading whitespace)."""
+
+    return re.findall(r"\s*\S+", text) or ([text] if text else [])
+
+class FakeLLMServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, tokens_per_second: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 500, script: List = None,
+                 default_response: str = "echo hello", seed: int = None):
+        """Fake LLM API server.
+
+        Responses come from the script, then the default response. Script
+        entries are strings or dictionaries with "content" and optionally
+        "match" (regex tested against the last user message), "latency",
+        "tokens_per_second", "status" (error status to return instead),
+        "error" (error message) and "retry_after" (seconds, sent on errors).
+        Entries with "match" answer every matching request, the others are
+        used once each, in order.
+
+        Args:
+            host: Interface to listen on (default: 127.0.0.1)
+            port: Port to listen on, 0 picks a free one (default: 0)
+            latency: Seconds before the first token (default: 0)
+            tokens_per_second: Generation speed, 0 sends all tokens at once (default: 0)
+            error_rate: Share of requests failed with error_status (default: 0)
+            error_status: HTTP status of injected errors (default: 500)
+            script: Scripted responses (optional)
+            default_response: Response once the script is used up (default: "echo hello")
+            seed: Seed of the error injection, for reproducible runs (optional)
+        """
+
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.default_response = default_response
+        self.requests = []
+        self._rules = []
+        self._queue = []
+        for entry in script or []:
+            entry = {"content": entry} if isinstance(entry, str) else dict(entry)
+            (self._rules if "match" in entry else self._queue).append(entry)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server, e.g. http://127.0.0.1:8765."""
+
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def config(self, providers: List[str] = ("openai", "anthropic", "groq", "ollama")) -> dict:
+        """Builds configuration entries pointing providers at this server.
+
+        Args:
+            providers: Providers to redirect (default: openai, anthropic, groq, ollama)
+
+        Returns:
+            Dictionary of <PROVIDER>_BASE_URL and OLLAMA_HOST entries
+        """
+
+        entries = {}
+        for provider in providers:
+            if provider == "ollama":
+                entries["OLLAMA_HOST"] = self.url
+            elif provider in ("anthropic", "groq"):
+                entries[f"{provider.upper()}_BASE_URL"] = self.url
+            else:
+                entries[f"{provider.upper()}_BASE_URL"] = f"{self.url}/v1"
+        return entries
+
+    def start(self) -> "FakeLLMServer":
+        """Serves requests on a background thread."""
+
+        # A short poll interval keeps stop() fast
+        self._thread = threading.Thread(target=self._httpd.serve_forever, args=(0.05,), name="fake-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serves requests on the calling thread until interrupted."""
+
+        try:
+            self._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        """Stops serving and closes the socket."""
+
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def next_response(self, prompt: str) -> dict:
+        """Picks the response to a request.
+
+        Args:
+            prompt: Last user message of the request
+
+        Returns:
+            Response entry with content, latency, tokens_per_second and, for
+            errors, status, error and retry_after
+        """
+
+        with self._lock:
+            entry = next((rule for rule in self._rules if re.search(rule["match"], prompt)), None)
+            if entry is None and self._queue:
+                entry = self._queue.pop(0)
+            if entry is None:
+                entry = {"content": self.default_response}
+            if "status" not in entry and self.error_rate and self._random.random() < self.error_rate:
+                entry = {**entry, "status": self.error_status}
+        return {"latency": self.latency, "tokens_per_second": self.tokens_per_second, **entry}
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)  # Clients cancelling streams is expected
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Keep test and benchmark output clean
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/api/tags":
+            self._send_json(200, {"models": []})
+        elif self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": []})
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "Invalid JSON body"})
+            return
+
+        fake = self.server.fake
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path.endswith("/chat/completions"):
+            protocol = "openai"
+        elif path.endswith("/messages"):
+            protocol = "anthropic"
+        elif path in ("/api/chat", "/api/generate"):
+            protocol = "ollama"
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        with fake._lock:
+            fake.requests.append({"path": path, "body": body})
+
+        messages = self._messages(protocol, path, body)
+        user_messages = [message["content"] for message in messages if message["role"] == "user"]
+        response = fake.next_response(user_messages[-1] if user_messages else "")
+        if response.get("status"):
+            time.sleep(response["latency"])
+            self._send_error(protocol, response)
+            return
+
+        tokens = self._limit(split_tokens(response["content"]), body, protocol)
+        usage = {"prompt": estimate_message_tokens(messages), "completion": len(tokens)}
+        model = body.get("model", "fake-model")
+        if body.get("stream", protocol == "ollama"):
+            self._send_stream(protocol, path, model, tokens, usage, response, body)
+        else:
+            time.sleep(response["latency"] + (len(tokens) / response["tokens_per_second"] if response["tokens_per_second"] else 0))
+            self._send_json(200, self._complete(protocol, path, model, "".join(tokens), usage))
+
+    @staticmethod
+    def _messages(protocol: str, path: str, body: dict) -> List[dict]:
+        """Gets the request messages as role and plain text content."""
+
+        if path == "/api/generate":
+            messages = [{"role": "user", "content": body.get("prompt", "")}]
+            return ([{"role": "system", "content": body["system"]}] if body.get("system") else []) + messages
+        messages = [{"role": message.get("role", "user"), "content": _text(message.get("content"))}
+                    for message in body.get("messages", [])]
+        if protocol == "anthropic" and body.get("system"):
+            messages.insert(0, {"role": "system", "content": _text(body["system"])})
+        return messages
+
+    @staticmethod
+    def _limit(tokens: List[str], body: dict, protocol: str) -> List[str]:
+        """Applies the request's token limit and stop sequences."""
+
+        options = body.get("options") or {}
+        limit = body.get("max_tokens") or body.get("max_completion_tokens") or options.get("num_predict")
+        if isinstance(limit, int) and limit > 0:
+            tokens = tokens[:limit]
+        stops = body.get("stop_sequences") if protocol == "anthropic" else options.get("stop") or body.get("stop")
+        if isinstance(stops, str):
+            stops = [stops]
+        text = "".join(tokens)
+        cut = min((text.find(stop) for stop in stops or [] if stop and stop in text), default=-1)
+        if cut < 0:
+            return tokens
+        kept, length = [], 0
+        for token in tokens:
+            if length + len(token) > cut:
+                if cut > length:
+                    kept.append(token[:cut - length])
+                break
+            kept.append(token)
+            length += len(token)
+        return kept
+
+    def _complete(self, protocol: str, path: str, model: str, text: str, usage: dict) -> dict:
+        """Builds a non-streamed response body."""
+
+        if protocol == "openai":
+            return {
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": usage["prompt"], "completion_tokens": usage["completion"],
+                          "total_tokens": usage["prompt"] + usage["completion"]},
+            }
+        if protocol == "anthropic":
+            return {
+                "id": "msg_fake", "type": "message", "role": "assistant", "model": model,
+                "content": [{"type": "text", "text": text}], "stop_reason": "end_turn", "stop_sequence": None,
+                "usage": {"input_tokens": usage["prompt"], "output_tokens": usage["completion"]},
+            }
+        return self._ollama_chunk(path, model, text, done=True, usage=usage)
+
+    @staticmethod
+    def _ollama_chunk(path: str, model: str, text: str, done: bool, usage: dict = None) -> dict:
+        chunk = {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "done": done}
+        if path == "/api/generate":
+            chunk["response"] = text
+        else:
+            chunk["message"] = {"role": "assistant", "content": text}
+        if done:
+            chunk.update(done_reason="stop", prompt_eval_count=usage["prompt"], eval_count=usage["completion"])
+        return chunk
+
+    def _stream_events(self, protocol: str, path: str, model: str, tokens: List[str], usage: dict,
+                       body: dict) -> Iterator[bytes]:
+        """Yields the streamed response as (encoded event, whether it carries a token) pairs."""
+
+        def sse(data, event=None, token=False):
+            prefix = f"event: {event}\n" if event else ""
+            return f"{prefix}data: {json.dumps(data)}\n\n".encode(), token
+
+        if protocol == "openai":
+            base = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+            yield sse({**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]})
+            for token in tokens:
+                yield sse({**base, "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}, token=True)
+            yield sse({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield sse({**base, "choices": [], "usage": {
+                    "prompt_tokens": usage["prompt"], "completion_tokens": usage["completion"],
+                    "total_tokens": usage["prompt"] + usage["completion"]}})
+            yield b"data: [DONE]\n\n", False
+        elif protocol == "anthropic":
+            yield sse({"type": "message_start", "message": {
+                "id": "msg_fake", "type": "message", "role": "assistant", "model": model, "content": [],
+                "stop_reason": None, "stop_sequence": None,
+                "usage": {"input_tokens": usage["prompt"], "output_tokens": 0}}}, "message_start")
+            yield sse({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+                      "content_block_start")
+            for token in tokens:
+                yield sse({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token}},
+                          "content_block_delta", token=True)
+            yield sse({"type": "content_block_stop", "index": 0}, "content_block_stop")
+            yield sse({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                       "usage": {"output_tokens": usage["completion"]}}, "message_delta")
+            yield sse({"type": "message_stop"}, "message_stop")
+        else:
+            for token in tokens:
+                yield (json.dumps(self._ollama_chunk(path, model, token, done=False)) + "\n").encode(), True
+            yield (json.dumps(self._ollama_chunk(path, model, "", done=True, usage=usage)) + "\n").encode(), False
+
+    def _send_stream(self, protocol: str, path: str, model: str, tokens: List[str], usage: dict, response: dict,
+                     body: dict):
+        content_type = "application/x-ndjson" if protocol == "ollama" else "text/event-stream"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        interval = 1 / response["tokens_per_second"] if response["tokens_per_second"] else 0
+        first_token = True
+        try:
+            for event, carries_token in self._stream_events(protocol, path, model, tokens, usage, body):
+                if carries_token:
+                    time.sleep(response["latency"] if first_token else interval)
+                    first_token = False
+                self._write_chunk(event)
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # The client cancelled the stream
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_error(self, protocol: str, response: dict):
+        status = response["status"]
+        message = response.get("error") or f"Injected error {status}"
+        if protocol == "openai":
+            body = {"error": {"message": message, "type": "rate_limit_error" if status == 429 else "server_error",
+                              "code": None}}
+        elif protocol == "anthropic":
+            error_type = {429: "rate_limit_error", 529: "overloaded_error"}.get(status, "api_error")
+            body = {"type": "error", "error": {"type": error_type, "message": message}}
+        else:
+            body = {"error": message}
+        headers = {"Retry-After": str(response["retry_after"])} if response.get("retry_after") is not None else {}
+        self._send_json(status, body, headers)
+
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first token (default: 0)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Generation speed, 0 for instant (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail (default: 0)")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected errors (default: 500)")
+    parser.add_argument("--script", help="JSON file with a list of scripted responses")
+    parser.add_argument("--response", default="echo hello", help="Response once the script is used up")
+    parser.add_argument("--seed", type=int, help="Seed of the error injection")
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script, "r") as file:
+            script = json.load(file)
+    server = FakeLLMServer(args.host, args.port, latency=args.latency, tokens_per_second=args.tokens_per_second,
+                           error_rate=args.error_rate, error_status=args.error_status, script=script,
+                           default_response=args.response, seed=args.seed)
+    print(f"Fake LLM server listening on {server.url}. Configuration entries:")
+    for key, value in server.config().items():
+        print(f"  {key}={value}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
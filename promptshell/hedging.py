@@ -0,0 +1,108 @@
+import asyncio
+import threading
+
+from collections import deque
+from typing import Awaitable, Callable, Tuple
+
+class LatencyTracker:
+    def __init__(self, percentile: float = 95, default_delay: float = 2.0, min_samples: int = 10,
+                 window: int = 100, min_delay: float = 0.25):
+        """Tracks recent call latencies to pick a hedging delay.
+
+        Args:
+            percentile: Latency percentile after which a hedge is sent (default: 95)
+            default_delay: Delay in seconds used until enough samples exist (default: 2.0)
+            min_samples: Samples needed before the percentile is trusted (default: 10)
+            window: Number of recent samples kept (default: 100)
+            min_delay: Lower bound of the delay in seconds (default: 0.25)
+        """
+
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """Adds a latency sample.
+
+        Args:
+            seconds: Call latency in seconds
+        """
+
+        with self._lock:
+            self._samples.append(seconds)
+
+    def delay(self) -> float:
+        """Gets how long to wait for the primary provider before hedging.
+
+        Returns:
+            Delay in seconds
+        """
+
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        index = min(int(len(samples) * self.percentile / 100), len(samples) - 1)
+        return max(samples[index], self.min_delay)
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+def get_latency_tracker(key: tuple, **options) -> LatencyTracker:
+    """Gets the process-wide latency tracker for a key, creating it on first use.
+
+    Args:
+        key: Tracker key, e.g. (provider, model, role)
+        **options: LatencyTracker arguments used when the tracker is created
+
+    Returns:
+        LatencyTracker
+    """
+
+    with _trackers_lock:
+        if key not in _trackers:
+            _trackers[key] = LatencyTracker(**options)
+        return _trackers[key]
+
+async def hedge(primary: Callable[[], Awaitable[str]], secondary: Callable[[], Awaitable[str]],
+                delay: float) -> Tuple[str, str]:
+    """Runs a request with a delayed backup request.
+
+    The secondary request starts once the primary has not answered within
+    `delay` seconds, or right away if the primary fails first. The first
+    successful response wins and the other request is cancelled.
+
+    Args:
+        primary: Coroutine function calling the primary provider
+        secondary: Coroutine function calling the secondary provider
+        delay: Seconds to wait for the primary before hedging
+
+    Returns:
+        Tuple of (response, "primary" or "secondary")
+
+    Raises:
+        Exception: The last error if both requests fail
+    """
+
+    primary_task = asyncio.ensure_future(primary())
+    done, _ = await asyncio.wait({primary_task}, timeout=delay)
+    if done and primary_task.exception() is None:
+        return primary_task.result(), "primary"
+
+    names = {primary_task: "primary", asyncio.ensure_future(secondary()): "secondary"}
+    pending = {task for task in names if not task.done()}
+    error = primary_task.exception() if done else None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), names[task]
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
@@ -1,15 +1,120 @@
+import time
+
+# Recorded around the imports below for --profile-startup
+_IMPORTS_STARTED = time.perf_counter()
+
 import platform
 import os
 import sys
 
+from contextlib import redirect_stdout
+
 from .readline_setup import setup_readline
 from .ansi_support import enable_ansi_support
 from .ai_terminal_assistant import AITerminalAssistant
 from .format_utils import text_theme, reset_format, get_terminal_size
-from .setup import setup_wizard, load_config, get_active_model
+from .setup import setup_wizard, get_config_snapshot, get_active_model, invalidate_config_cache, config_number
 from .alias_manager import handle_alias_command
 from .version import get_version
 from .tutorial import start_tutorial
+from .startup_profiler import StartupProfiler
+
+_IMPORTS_FINISHED = time.perf_counter()
+
+def render_prompt() -> str:
+    """Builds the REPL prompt for the current directory.
+
+    Returns:
+        Formatted prompt string
+    """
+
+    return f"\n{text_theme('info', bold=True)}{os.getcwd()}$ {reset_format()}"
+
+def profile_startup(as_json: bool = False):
+    """Runs each startup phase once and reports its wall time and memory.
+
+    Args:
+        as_json: Print a JSON document instead of a table (default: False)
+    """
+
+    profiler = StartupProfiler()
+    profiler.add_phase("module imports", _IMPORTS_FINISHED - _IMPORTS_STARTED)
+
+    # Keep stdout clean for the JSON document
+    with redirect_stdout(sys.stderr if as_json else sys.stdout):
+        with profiler.phase("load_config"):
+            invalidate_config_cache()
+            config = get_config_snapshot()
+        with profiler.phase("enable_ansi_support"):
+            enable_ansi_support()
+        with profiler.phase("setup_readline"):
+            setup_readline()
+        with profiler.phase("AITerminalAssistant construction"):
+            assistant = AITerminalAssistant(config=config, model_name=get_active_model(config))
+            assistant.initialize_system_context()
+        with profiler.phase("first prompt render"):
+            try:
+                get_terminal_size()
+            except OSError:
+                pass  # Not attached to a terminal
+            render_prompt()
+
+    if as_json:
+        print(profiler.to_json({"version": get_version(), "python": platform.python_version(), "platform": platform.platform()}))
+    else:
+        print(f"PromptShell v{get_version()} startup profile\n")
+        print(profiler.report())
+
+def batch_mode(args: list) -> int:
+    """Translates a file of requests into commands, printing JSON Lines.
+
+    Args:
+        args: Arguments after --batch: [path or "-"] [--concurrency N]
+
+    Returns:
+        Exit status
+    """
+
+    from .batch import run_batch
+
+    source = args[0] if args and not args[0].startswith("--") else "-"
+    results_stream = sys.stdout
+    # Keep stdout clean for the JSON Lines results
+    with redirect_stdout(sys.stderr):
+        config = get_config_snapshot()
+        if config.signature is None:  # No configuration file yet
+            print("No configuration found. Run 'promptshell' once to complete the setup.")
+            return 1
+        concurrency = config_number(config, "BATCH_CONCURRENCY", 4)
+        if "--concurrency" in args:
+            position = args.index("--concurrency") + 1
+            if position >= len(args) or not args[position].isdigit() or int(args[position]) < 1:
+                print("Usage: promptshell --batch [file|-] [--concurrency N]")
+                return 2
+            concurrency = int(args[position])
+        assistant = AITerminalAssistant(config=config, model_name=get_active_model(config))
+        return run_batch(assistant, source, concurrency=int(concurrency), output=results_stream)
+
+def stats_report(window: str = "24h") -> str:
+    """Formats provider call latency and token totals per role and provider.
+
+    Args:
+        window: Time window to cover, e.g. "1h", "24h", "7d" or "all" (default: "24h")
+
+    Returns:
+        Report text, or a usage message for an invalid window
+    """
+
+    from .telemetry import get_telemetry, parse_window, format_summary
+
+    try:
+        seconds = parse_window(window)
+    except ValueError as e:
+        return str(e)
+    telemetry = get_telemetry()
+    if telemetry is None:
+        return "Telemetry store is not available."
+    return format_summary(telemetry.summary(seconds), window)
 
 def main():
     """Main entry point for the terminal assistant."""
@@ -19,15 +124,26 @@ def main():
         print(f"PromptShell v{get_version()}")
         return
 
-    config = load_config()
-    if not config:
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        sys.exit(batch_mode(sys.argv[2:]))
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--stats":
+        print(stats_report(*sys.argv[2:3]))
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--profile-startup":
+        profile_startup(as_json="--json" in sys.argv[2:])
+        return
+
+    config = get_config_snapshot()
+    if config.signature is None:  # No configuration file yet
         print("First-time setup required!")
         setup_wizard()
-        config = load_config()
+        config = get_config_snapshot()
 
     enable_ansi_support()
     setup_readline()
-    model_name = get_active_model()
+    model_name = get_active_model(config)
 
     assistant = AITerminalAssistant(config=config, model_name=model_name)
 
@@ -38,24 +154,40 @@ Type '--help' for assistance and '--config' for settings.{reset_format()}""")
     while True:
         try:
             columns, _ = get_terminal_size()
-            prompt = f"\n{text_theme('info', bold=True)}{os.getcwd()}$ {reset_format()}"
+            prompt = render_prompt()
             user_input = input(prompt)
 
             if len(prompt) + len(user_input) > columns:
                 print()  # Move to the next line if input is too long
 
+            # Pick up edits made to the config file while the assistant is running
+            latest_config = get_config_snapshot()
+            if latest_config is not config:
+                config = latest_config
+                model_name = get_active_model(config)
+                assistant.reconfigure(model_name, config=config)
+                print(f"{text_theme('info', bold=True)}Configuration reloaded ({model_name}){reset_format()}")
+
             if user_input.lower() in  ('quit', 'exit'):
                 print(text_theme('info', bold=True) + "\nTerminating..." + reset_format())
                 break
 
             if user_input.lower() == "--config":
                 setup_wizard()
-                config = load_config()
-                model_name = get_active_model()
-                assistant = AITerminalAssistant(config=config, model_name=model_name)
+                config = get_config_snapshot()
+                model_name = get_active_model(config)
+                assistant.reconfigure(model_name, config=config)
                 print(f"{text_theme('info', bold=True)}Configuration updated!{reset_format()}")
                 continue
 
+            if user_input.lower() == "--status":
+                print(assistant.status_report())
+                continue
+
+            if user_input.lower().split()[:1] == ["--stats"]:
+                print(stats_report(*user_input.split()[1:2]))
+                continue
+
             if user_input.lower() == "--tutorial":
                 start_tutorial()
                 continue
@@ -72,6 +204,8 @@ Type '--help' for assistance and '--config' for settings.{reset_format()}""")
   {text_theme('prompt')}{'--help':<{col_width}}{reset_format()}Show this help message
   {text_theme('prompt')}{'--tutorial':<{col_width}}{reset_format()}Start the interactive tutorial
   {text_theme('prompt')}{'--config':<{col_width}}{reset_format()}Re-run the setup wizard to change AI provider or model
+  {text_theme('prompt')}{'--status':<{col_width}}{reset_format()}Show provider health, failover decisions and cache statistics
+  {text_theme('prompt')}{'--stats [window]':<{col_width}}{reset_format()}Show call latency percentiles and tokens per role (e.g. 1h, 7d, all; default 24h)
   {text_theme('prompt')}{'alias':<{col_width}}{reset_format()}Manage command shortcuts (use 'alias help' for details)
   {text_theme('prompt')}{'clear / cls':<{col_width}}{reset_format()}Clear the terminal screen
   {text_theme('prompt')}{'exit / quit':<{col_width}}{reset_format()}Terminate the assistant
@@ -79,6 +213,7 @@ Type '--help' for assistance and '--config' for settings.{reset_format()}""")
 {text_theme('section_header', bold=True)}[Tips]{reset_format()}
   - Use {text_theme('tip')}Tab{reset_format()} for auto-completion of file and directory paths.
   - Prefixing with {text_theme('tip')}!{reset_format()} bypasses the AI for raw speed and direct execution.
+  - Prefixing with {text_theme('tip')}--fresh{reset_format()} skips the translation cache for that request.
 """)
                 continue
 
@@ -1,275 +1,1448 @@
-import requests
 import json
-import anthropic
-import google.generativeai as genai
+import logging
+import sqlite3
+import threading
+import time
 
-from openai import OpenAI
-from groq import Groq
-from typing import List, Tuple
+from types import SimpleNamespace
+from typing import Awaitable, Callable, Iterator, List, Tuple
 
-from .setup import get_provider
-from .spinner_progress_utils import spinner, progress_bar
+from .setup import get_provider, get_config_snapshot, config_flag, config_number
+from .providers import load_sdk, client_pool, create_http_session, create_async_http_client, ollama_base_url, run_sync, PROVIDER_BASE_URLS, PROVIDER_SDKS
+from .spinner_progress_utils import spinner, progress_bar, spinner_until_first
+from .command_parser import first_complete_command
+from .context_window import ContextWindow
+from .provider_router import router
+from .rate_limit import RetryPolicy, ProviderHTTPError, get_status_code, get_token_bucket
+from .telemetry import get_telemetry
+from .cassette import get_cassette
+from .token_utils import estimate_tokens, estimate_message_tokens, truncate_to_tokens, record_usage, track_usage, metered, prompt_cache_stats
+
+logger = logging.getLogger(__name__)
+
+# Bounds of the automatically sized Ollama context and the response tokens it reserves
+OLLAMA_MIN_CTX = 2048
+OLLAMA_MAX_CTX = 32768
+OLLAMA_RESPONSE_RESERVE = 1024
+
+# Chunks still read after a complete command, so a response ending there reports its usage
+USAGE_TAIL_CHUNKS = 4
+
+# OpenAI-compatible providers that only report usage in streams when asked with stream_options
+STREAM_USAGE_PROVIDERS = ("openai", "deepseek")
+
+# Client classes of the providers with their own SDK: (sync, async)
+SDK_CLIENT_CLASSES = {"anthropic": ("Anthropic", "AsyncAnthropic"), "groq": ("Groq", "AsyncGroq")}
+
+# Largest context size used so far per (Ollama host, model)
+_ollama_num_ctx = {}
+_ollama_num_ctx_lock = threading.Lock()
 
 class Node:
-    def __init__(self, model_name: str, name: str, max_tokens: int = 8192, config: dict = None):
+    def __init__(self, model_name: str, name: str, max_tokens: int = 8192, config: dict = None, stop: List[str] = None,
+                 context_tokens: int = 2048, prompt_tokens: int = 8192, provider: str = None):
         """Initializes an AI node.
         
         Args:
             model_name: AI model name
             name: Node role name
             max_tokens: Response token limit (default: 8192)
-            config: Configuration dictionary (default: None)
+            config: Configuration snapshot (default: current snapshot)
+            stop: Stop sequences ending the response early (optional)
+            context_tokens: Token budget of the conversation history (default: 2048)
+            prompt_tokens: Token budget of the whole prompt (default: 8192)
+            provider: Provider override (default: the configured provider)
         """
         
         self.model_name = model_name
         self.name = name
         self.definition = ""
-        self.context = []
+        self.context = ContextWindow(max_tokens=context_tokens)
+        self.prompt_tokens = prompt_tokens
         self.max_tokens = max_tokens
-        self.config = config or {}
-        self.provider = get_provider()
+        self.stop = list(stop or [])
+        self.config = config or get_config_snapshot()
+        self.provider = provider or get_provider(self.config)
+        self.last_timing = {}
+        self.last_winner = None
+        self.last_provider = None
+        self._hedge_node = None
+        self._fallback_nodes = {}
 
-    def __call__(self, input_text: str, additional_data: dict = None):
+    def __call__(self, input_text: str, additional_data: dict = None, remember: bool = True):
         """Processes input through the AI node.
         
         Args:
             input_text: Input prompt
             additional_data: Supplementary context (optional)
+            remember: Whether the exchange is added to the history (default: True)
             
         Returns:
             AI-generated response
         """
         
         try:
-            context_str = "\n".join([f"{msg['role']} {msg['content']}" for msg in self.context])
-            prompt = f""" system {self.definition} 
-{context_str}
-user {input_text} """
-            if additional_data:
-                prompt += "\n system Additional data:\n"
-                for key, value in additional_data.items():
-                    prompt += f"{key}: {value}\n"
-                prompt += " "
-            prompt += "\n assistant "
-
-            if self.provider == "ollama":
-                response = self._call_ollama(prompt)
-            elif self.provider == "openai":
-                response = self._call_openai(prompt)
-            elif self.provider == "anthropic":
-                response = self._call_anthropic(prompt)
-            elif self.provider == "google":
-                response = self._call_google(prompt)
-            elif self.provider == "groq":
-                response = self._call_groq(prompt)
-            elif self.provider == "fireworks":
-                response = self._call_fireworks(prompt)
-            elif self.provider == "openrouter":
-                response = self._call_openrouter(prompt)
-            elif self.provider == "deepseek":
-                response = self._call_deepseek(prompt)
-            else:
+            messages = self._build_messages(input_text, additional_data)
+
+            if self.provider not in PROVIDER_SDKS:
                 return "Unsupported provider."
+            if self.hedge_node is not None:
+                response = self._call_hedged(messages)
+            else:
+                response = self._route(lambda node: node._send(messages), messages)
 
-            output = response.strip()
-            self.context.append({"role": "user", "content": input_text})
-            self.context.append({"role": "assistant", "content": output})
-            return output
+            return self._finish(input_text, response, remember)
 
         except Exception as e:
             return f"Error in processing: {str(e)}"
 
-    @spinner(spinner_type="random", message=" [magenta]Waiting for API response...")
-    def _call_ollama(self, prompt: str) -> str:
-        """Calls Ollama API.
+    async def acall(self, input_text: str, additional_data: dict = None, remember: bool = True) -> str:
+        """Processes input through the AI node without blocking the event loop.
+
+        Uses the providers' async clients and shares prompt building and
+        history handling with __call__, so several nodes can be awaited
+        concurrently (e.g. with asyncio.gather).
         
         Args:
-            prompt: Input prompt
+            input_text: Input prompt
+            additional_data: Supplementary context (optional)
+            remember: Whether the exchange is added to the history (default: True)
             
         Returns:
-            API response
+            AI-generated response
+        """
+
+        try:
+            messages = self._build_messages(input_text, additional_data)
+            if self.provider not in PROVIDER_SDKS:
+                return "Unsupported provider."
+            if self.hedge_node is not None:
+                return self._finish(input_text, await self._ahedged(messages), remember)
+            response = await self._aroute(lambda node: node._asend(messages), messages)
+            return self._finish(input_text, response, remember)
+        except Exception as e:
+            return f"Error in processing: {str(e)}"
+
+    def _finish(self, input_text: str, response: str, remember: bool) -> str:
+        """Cleans up a complete response and records the exchange.
+
+        Args:
+            input_text: Input prompt
+            response: Raw response text
+            remember: Whether the exchange is added to the history
+
+        Returns:
+            Stripped response
         """
+
+        output = response.strip()
+        if remember:
+            self._remember(input_text, output)
+        return output
+
+    def stream(self, input_text: str, additional_data: dict = None) -> Iterator[str]:
+        """Processes input through the AI node, yielding the response as it arrives.
+
+        A spinner is shown until the first token. Timings are stored in
+        last_timing as {"ttft": seconds, "total": seconds}.
         
-        response = requests.post(
-            'http://localhost:11434/api/generate',
-            json={
-                "model": self.model_name,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "stop": [" ", " ", " "],
-                    "num_predict": self.max_tokens
-                }
-            }
-        )
-        if response.status_code == 200:
-            return response.json().get("response", "").strip()
-        else:
-            return f"Error in Ollama API call: {response.status_code} - {response.text}"
+        Args:
+            input_text: Input prompt
+            additional_data: Supplementary context (optional)
+            
+        Yields:
+            Response text chunks
+        """
 
-    @spinner(spinner_type="random", message=" [magenta]Waiting for API response...")
-    def _call_openai(self, prompt: str) -> str:
-        """Calls OpenAI API.
+        start = time.perf_counter()
+        self.last_timing = {}
+        chunks = []
+        try:
+            messages = self._build_messages(input_text, additional_data)
+            if self.provider not in PROVIDER_SDKS:
+                yield "Unsupported provider."
+                return
+
+            # Fail over to the next candidate only while nothing has been printed yet
+            first_error = None
+            attempt_ttft = None
+            for node in self._routed_nodes():
+                attempt_start = time.perf_counter()
+                try:
+                    usage = {}
+                    stream = node._retried_stream(messages, usage)
+                    for chunk in spinner_until_first(stream, spinner_type="random", message=" [magenta]Waiting for first token..."):
+                        if not chunk:
+                            continue
+                        if not chunks:
+                            self.last_timing["ttft"] = time.perf_counter() - start
+                            attempt_ttft = time.perf_counter() - attempt_start
+                        chunks.append(chunk)
+                        yield chunk
+                except Exception as e:
+                    self._record_failure(node, e)
+                    self._record_call(node, time.perf_counter() - attempt_start, type(e).__name__,
+                                      ttft=attempt_ttft)
+                    if chunks:
+                        raise
+                    first_error = first_error or e
+                    if not self._fails_over(e):
+                        raise first_error
+                    continue
+                self._record_route(node, time.perf_counter() - attempt_start, usage)
+                self._record_call(node, time.perf_counter() - attempt_start, usage=usage, messages=messages,
+                                  output="".join(chunks), ttft=attempt_ttft)
+                break
+            else:
+                raise first_error
+
+            self._remember(input_text, "".join(chunks).strip())
+        except Exception as e:
+            yield f"Error in processing: {str(e)}"
+        finally:
+            self.last_timing.setdefault("ttft", time.perf_counter() - start)
+            self.last_timing["total"] = time.perf_counter() - start
+
+    def generate_command(self, input_text: str, additional_data: dict = None) -> str:
+        """Generates a single shell command line.
+
+        The response is streamed and the request is cancelled as soon as one
+        complete, balanced command line has arrived, so trailing explanations
+        are never generated. Groq's JSON mode already returns a single command
+        and uses the regular call, as do hedged nodes.
         
         Args:
-            prompt: Input prompt
+            input_text: Input prompt
+            additional_data: Supplementary context (optional)
             
         Returns:
-            API response
+            Shell command, or an error message
         """
-        
-        api_key = self.config["OPENAI_API_KEY"]
-        client = OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model=self.model_name,
-            messages=[{"role": "user", "content": prompt}]
+
+        if self.provider not in PROVIDER_SDKS or self.provider == "groq" or self.hedge_node is not None:
+            response = self(input_text, additional_data)
+            return first_complete_command(response, final=True) or response
+
+        timing = {}
+
+        def read_command(node):
+            timing.clear()
+            timing["start"] = time.perf_counter()
+            chunks = node._send_stream(messages)
+            try:
+                return self._read_command(chunks, timing)
+            finally:
+                chunks.close()  # Cancels the request if the model is still generating
+
+        try:
+            messages = self._build_messages(input_text, additional_data)
+            command = self._route(read_command, messages, timing)
+            self._remember(input_text, command)
+            return command
+        except Exception as e:
+            return f"Error in processing: {str(e)}"
+
+    def _candidates(self) -> List[Tuple[str, str]]:
+        """Lists the (provider, model) pairs a request may be served by.
+
+        The configured provider comes first, then FALLBACK_PROVIDERS entries
+        ("provider:model", comma separated) and finally the local Ollama model
+        when FALLBACK_TO_LOCAL is true.
+
+        Returns:
+            Candidate (provider, model) pairs without duplicates
+        """
+
+        candidates = [(self.provider, self.model_name)]
+        for entry in str(self.config.get("FALLBACK_PROVIDERS", "")).split(","):
+            provider, _, model = entry.strip().partition(":")
+            if provider.strip():
+                candidates.append((provider.strip().lower(), model.strip() or self.model_name))
+        local_model = str(self.config.get("LOCAL_MODEL", "")).strip()
+        if local_model and config_flag(self.config, "FALLBACK_TO_LOCAL", default=False):
+            candidates.append(("ollama", local_model))
+        return list(dict.fromkeys(candidates))
+
+    def _routed_nodes(self) -> List["Node"]:
+        """Gets the nodes to try for a request, healthiest first (only this one when replaying)."""
+
+        if self._replaying():
+            return [self]
+        nodes = []
+        for provider, model in router.route(self._candidates()):
+            if (provider, model) == (self.provider, self.model_name):
+                nodes.append(self)
+                continue
+            if (provider, model) not in self._fallback_nodes:
+                self._fallback_nodes[(provider, model)] = Node(
+                    model, self.name, max_tokens=self.max_tokens, config=self.config, stop=self.stop, provider=provider
+                )
+            nodes.append(self._fallback_nodes[(provider, model)])
+        return nodes
+
+    def _record_route(self, node: "Node", seconds: float, usage: dict = None):
+        """Records a successful call on the node that served it.
+
+        Args:
+            node: Node that answered
+            seconds: Call latency
+            usage: Usage record of the call, for the prompt cache metrics (optional)
+        """
+
+        if not node._replaying():
+            router.record_success(node.provider, seconds)
+            router.record_decision(self.name, self.provider, node.provider)
+        self.last_provider = node.provider
+        if usage is not None:
+            prompt_cache_stats.record(self.name, usage, seconds)
+
+    def _record_call(self, node: "Node", seconds: float, outcome: str = "ok", usage: dict = None,
+                     messages: List[dict] = None, output: str = None, ttft: float = None):
+        """Stores a provider call in the local telemetry unless TELEMETRY is off.
+
+        Token counts the provider did not report are estimated from the
+        messages and output, each on its own, and the call is flagged as
+        estimated. The prompt size estimate the role's budget is enforced
+        against is stored as well, so --stats shows it per role.
+
+        Args:
+            node: Node that made the call
+            seconds: Call latency
+            outcome: "ok", or the name of the error the call failed with (default: "ok")
+            usage: Usage record of the call (optional)
+            messages: Chat messages sent (optional)
+            output: Response text (optional)
+            ttft: Seconds until the first streamed token (optional)
+        """
+
+        if not config_flag(self.config, "TELEMETRY", default=True):
+            return
+        telemetry = get_telemetry()
+        if telemetry is None:
+            return
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens")
+        completion_tokens = usage.get("completion_tokens")
+        prompt_estimate = estimate_message_tokens(messages) if messages else None
+        estimated = outcome == "ok" and (prompt_tokens is None or completion_tokens is None)
+        if outcome == "ok" and prompt_tokens is None:
+            prompt_tokens = prompt_estimate
+        if outcome == "ok" and completion_tokens is None and isinstance(output, str):
+            completion_tokens = estimate_tokens(output)
+        try:
+            telemetry.record(self.name, node.provider, node.model_name, seconds, outcome,
+                             prompt_tokens, completion_tokens, estimated, ttft, prompt_estimate)
+        except sqlite3.Error as e:
+            logger.debug("Telemetry not recorded: %s", e)
+
+    @staticmethod
+    def _fails_over(error: Exception) -> bool:
+        """Checks whether a failed request may move on to the next candidate.
+
+        Only transient errors (connection errors, timeouts, 429 and 5xx) fail
+        over. Permanent ones such as a rejected API key or an unknown model
+        are reported as they are instead of being hidden by a fallback's error.
+
+        Args:
+            error: Exception raised by the candidate
+
+        Returns:
+            True if the next candidate should be tried
+        """
+
+        return RetryPolicy.is_retryable(error)
+
+    def _route(self, attempt: Callable[["Node"], str], messages: List[dict] = None, timing: dict = None) -> str:
+        """Runs a request on the first healthy candidate, failing over on errors.
+
+        Transient errors are retried on the same candidate first and then
+        fail over to the next one; permanent errors end the request. Every
+        candidate tried is recorded in the telemetry.
+
+        Args:
+            attempt: Callable sending the request through a given node
+            messages: Chat messages sent, for token estimates (optional)
+            timing: Dictionary a streaming attempt stores its "ttft" in (optional)
+
+        Returns:
+            Result of the first successful attempt
+
+        Raises:
+            Exception: The error of the first candidate tried if none succeeded
+        """
+
+        first_error = None
+        for node in self._routed_nodes():
+            start = time.perf_counter()
+            try:
+                with track_usage() as usage:
+                    result = node.retry_policy.call(lambda: node._rate_limited(attempt), on_retry=node._on_retry)
+            except Exception as e:
+                self._record_failure(node, e)
+                self._record_call(node, time.perf_counter() - start, type(e).__name__,
+                                  ttft=timing.get("ttft") if timing else None)
+                first_error = first_error or e
+                if not self._fails_over(e):
+                    break
+                continue
+            self._record_route(node, time.perf_counter() - start, usage)
+            self._record_call(node, time.perf_counter() - start, usage=usage, messages=messages, output=result,
+                              ttft=timing.get("ttft") if timing else None)
+            return result
+        raise first_error
+
+    async def _aroute(self, attempt: Callable[["Node"], Awaitable[str]], messages: List[dict] = None) -> str:
+        """Async version of _route().
+
+        Args:
+            attempt: Coroutine function sending the request through a given node
+            messages: Chat messages sent, for token estimates (optional)
+
+        Returns:
+            Result of the first successful attempt
+        """
+
+        first_error = None
+        for node in self._routed_nodes():
+            start = time.perf_counter()
+            try:
+                with track_usage() as usage:
+                    result = await node.retry_policy.acall(lambda: node._arate_limited(attempt), on_retry=node._on_retry)
+            except Exception as e:
+                self._record_failure(node, e)
+                self._record_call(node, time.perf_counter() - start, type(e).__name__)
+                first_error = first_error or e
+                if not self._fails_over(e):
+                    break
+                continue
+            self._record_route(node, time.perf_counter() - start, usage)
+            self._record_call(node, time.perf_counter() - start, usage=usage, messages=messages, output=result)
+            return result
+        raise first_error
+
+    @property
+    def retry_policy(self) -> RetryPolicy:
+        """Retry policy from RETRY_MAX_ATTEMPTS and RETRY_MAX_DELAY, a single attempt when replaying."""
+
+        return RetryPolicy(
+            max_attempts=1 if self._replaying() else max(int(config_number(self.config, "RETRY_MAX_ATTEMPTS", 4)), 1),
+            max_delay=config_number(self.config, "RETRY_MAX_DELAY", 30.0),
         )
-        return response.choices[0].message.content.strip()
+
+    def _rate_limiter(self):
+        """Gets the token bucket shared by all sessions using this node's API key.
+
+        The rate is <PROVIDER>_RATE_LIMIT_RPM, falling back to RATE_LIMIT_RPM.
+
+        Replayed requests never reach the provider and are not limited.
+
+        Returns:
+            TokenBucket, or None when no limit is configured or requests are replayed
+        """
+
+        if self._replaying():
+            return None
+        provider = self.provider.upper()
+        rpm = config_number(self.config, f"{provider}_RATE_LIMIT_RPM", config_number(self.config, "RATE_LIMIT_RPM", 0))
+        if rpm <= 0:
+            return None
+        credential = self.config.get(f"{provider}_API_KEY") or ollama_base_url(self.config.get("OLLAMA_HOST"))
+        return get_token_bucket(f"{self.provider}:{credential}", rpm)
+
+    def _rate_limited(self, attempt: Callable[["Node"], str]) -> str:
+        """Waits for the rate limiter, then runs one attempt through this node."""
+
+        limiter = self._rate_limiter()
+        if limiter is not None:
+            limiter.acquire()
+        return attempt(self)
+
+    async def _arate_limited(self, attempt: Callable[["Node"], Awaitable[str]]) -> str:
+        """Async version of _rate_limited()."""
+
+        limiter = self._rate_limiter()
+        if limiter is not None:
+            await limiter.acquire_async()
+        return await attempt(self)
+
+    def _retried_stream(self, messages: List[dict], usage: dict) -> Iterator[str]:
+        """Streams a response through this node's rate limiter and retry policy.
+
+        Errors before the first chunk are retried like a regular call; once
+        a chunk has arrived the stream is passed through as it is.
+
+        Args:
+            messages: Chat messages
+            usage: Dictionary the reported token usage is added to
+
+        Yields:
+            Response text chunks
+        """
+
+        def open_stream(node):
+            stream = metered(node._send_stream(messages), usage)
+            return next(stream, None), stream
+
+        first, stream = self.retry_policy.call(lambda: self._rate_limited(open_stream), on_retry=self._on_retry)
+        try:
+            if first is None:
+                return
+            yield first
+            yield from stream
+        finally:
+            stream.close()
+
+    def _on_retry(self, error: Exception, delay: float):
+        """Logs a retry and, on a rate limit, pauses every session sharing the key.
+
+        Args:
+            error: Error of the failed attempt
+            delay: Seconds until the next attempt
+        """
+
+        logger.info("%s: %s failed (%s), retrying in %.2fs", self.name, self.provider, error, delay)
+        limiter = self._rate_limiter()
+        if limiter is not None and get_status_code(error) == 429:
+            limiter.pause(delay)
+
+    def _replaying(self) -> bool:
+        """Checks whether requests are answered from a cassette instead of the provider."""
+
+        cassette = get_cassette(self.config)
+        return cassette is not None and cassette.mode == "replay"
+
+    def _record_failure(self, node: "Node", error: Exception):
+        """Records a failed call in the provider router, unless it was replayed from a cassette."""
+
+        if not node._replaying():
+            router.record_failure(node.provider, error, probe=node._probe)
+
+    def _probe(self) -> bool:
+        """Sends a minimal request to check whether this node's provider answers.
+
+        Returns:
+            True if the provider responded
+
+        Raises:
+            Exception: If the request failed
+        """
+
+        if self._replaying():
+            return True  # Replayed responses never reach the provider
+        probe = Node(self.model_name, "Probe", max_tokens=16, config=self.config, provider=self.provider)
+        try:
+            run_sync(getattr(probe, f"_acall_{self.provider}")([{"role": "user", "content": "Reply with OK."}]))
+        except (ValueError, KeyError):
+            pass  # The provider answered, the reply just did not parse
+        return True
+
+    def _send(self, messages: List[dict]) -> str:
+        """Sends chat messages, recording or replaying them when CASSETTE_MODE is set.
+
+        Args:
+            messages: Chat messages
+
+        Returns:
+            API response, or the recorded response in replay mode
+        """
+
+        cassette = get_cassette(self.config)
+        if cassette is None:
+            return self._dispatch(messages)
+        if cassette.mode == "replay":
+            return cassette.replay_call(self, messages)
+        return cassette.record_call(self, messages, lambda: self._dispatch(messages))
+
+    async def _asend(self, messages: List[dict]) -> str:
+        """Async version of _send()."""
+
+        cassette = get_cassette(self.config)
+        call = getattr(self, f"_acall_{self.provider}")
+        if cassette is None:
+            return await call(messages)
+        if cassette.mode == "replay":
+            return await cassette.areplay_call(self, messages)
+        return await cassette.arecord_call(self, messages, lambda: call(messages))
+
+    def _send_stream(self, messages: List[dict]) -> Iterator[str]:
+        """Streams a response, recording or replaying it when CASSETTE_MODE is set.
+
+        Args:
+            messages: Chat messages
+
+        Returns:
+            Iterator of response text chunks
+        """
+
+        cassette = get_cassette(self.config)
+        if cassette is not None and cassette.mode == "replay":
+            return cassette.replay_stream(self, messages)
+        chunks = getattr(self, f"_stream_{self.provider}")(messages)
+        if cassette is None:
+            return chunks
+        return cassette.record_stream(self, messages, chunks)
 
     @spinner(spinner_type="random", message=" [magenta]Waiting for API response...")
-    def _call_anthropic(self, prompt: str) -> str:
-        """Calls Anthropic API.
+    def _dispatch(self, messages: List[dict]) -> str:
+        """Sends chat messages to this node's provider.
+
+        Runs the provider's async call on the thread's long-lived event loop,
+        so sync and async requests share one implementation and its pooled
+        clients.
         
         Args:
-            prompt: Input prompt
+            messages: Chat messages
             
         Returns:
             API response
+
+        Raises:
+            ValueError: If the provider is not supported
         """
-        
-        api_key = self.config["ANTHROPIC_API_KEY"]
-        client = anthropic.Anthropic(api_key=api_key)
-        response = client.messages.create(
-            model=self.model_name,
-            max_tokens=self.max_tokens,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.content[0].text.strip()
+
+        call = getattr(self, f"_acall_{self.provider}", None)
+        if call is None:
+            raise ValueError(f"Unsupported provider: {self.provider}")
+        return run_sync(call(messages))
+
+    @property
+    def hedge_node(self):
+        """Secondary node requests are hedged to, or None when hedging is off.
+
+        Hedging is enabled by HEDGE_PROVIDER, with HEDGE_MODEL naming the
+        secondary model (default: this node's model).
+        """
+
+        provider = str(self.config.get("HEDGE_PROVIDER", "")).strip().lower()
+        model = str(self.config.get("HEDGE_MODEL", "")).strip() or self.model_name
+        if not provider or (provider == self.provider and model == self.model_name):
+            return None
+        if self._hedge_node is None:
+            self._hedge_node = Node(model, self.name, max_tokens=self.max_tokens, config=self.config,
+                                    stop=self.stop, provider=provider)
+        return self._hedge_node
 
     @spinner(spinner_type="random", message=" [magenta]Waiting for API response...")
-    def _call_google(self, prompt: str) -> str:
-        """Calls Google API.
+    def _call_hedged(self, messages: List[dict]) -> str:
+        """Calls the primary provider, hedging to the secondary one if it is slow.
         
         Args:
-            prompt: Input prompt
+            messages: Chat messages
             
         Returns:
             API response
         """
+
+        return run_sync(self._ahedged(messages))
+
+    async def _ahedged(self, messages: List[dict]) -> str:
+        """Sends the messages to the primary provider and, after a delay, to the hedge node.
+
+        The delay is the HEDGE_PERCENTILE (default: 95th) percentile of this
+        role's recent primary latencies, HEDGE_DELAY seconds until enough calls
+        were made. Both requests are retried and rate limited like routed
+        ones, and their outcomes update the provider router. The winner is
+        stored in last_winner.
         
-        api_key = self.config["GOOGLE_API_KEY"]
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(self.model_name)
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        Args:
+            messages: Chat messages
+            
+        Returns:
+            API response of whichever provider answered first
+        """
+
+        from .hedging import get_latency_tracker, hedge
+
+        tracker = get_latency_tracker(
+            (self.provider, self.model_name, self.name),
+            percentile=config_number(self.config, "HEDGE_PERCENTILE", 95),
+            default_delay=config_number(self.config, "HEDGE_DELAY", 2.0),
+        )
+        secondary = self.hedge_node
+        latencies = {}
+        start = time.perf_counter()
+        try:
+            with track_usage() as usage:
+                response, self.last_winner = await hedge(
+                    lambda: self._ahedge_leg(self, messages, latencies),
+                    lambda: self._ahedge_leg(secondary, messages, latencies),
+                    tracker.delay(),
+                )
+        finally:
+            # A cancelled primary still tells how long it took at least
+            tracker.record(time.perf_counter() - start)
+        winner = self if self.last_winner == "primary" else secondary
+        self._record_route(winner, latencies[winner], usage)
+        self._record_call(winner, latencies[winner], usage=usage, messages=messages, output=response)
+        return response
+
+    async def _ahedge_leg(self, node: "Node", messages: List[dict], latencies: dict) -> str:
+        """Sends one leg of a hedged request through a node's rate limiter and retry policy.
+
+        Args:
+            node: Primary or hedge node
+            messages: Chat messages
+            latencies: Dictionary the latency of a successful leg is stored in, by node
+
+        Returns:
+            API response
+        """
+
+        start = time.perf_counter()
+        try:
+            response = await node.retry_policy.acall(
+                lambda: node._arate_limited(lambda leg: leg._asend(messages)), on_retry=node._on_retry
+            )
+        except Exception as e:
+            self._record_failure(node, e)
+            self._record_call(node, time.perf_counter() - start, type(e).__name__)
+            raise
+        latencies[node] = time.perf_counter() - start
+        return response
 
     @spinner(spinner_type="random", message=" [magenta]Waiting for API response...")
-    def _call_groq(self, prompt: str) -> str:
-        """Calls Groq API.
+    def _read_command(self, chunks: Iterator[str], timing: dict = None) -> str:
+        """Reads streamed chunks until the first complete command line.
         
         Args:
-            prompt: Input prompt
+            chunks: Streamed response chunks
+            timing: Dictionary with the "start" of the request, gets the "ttft" (optional)
             
         Returns:
-            API response
+            First complete command, or the whole response if none was found
+        """
+
+        received = ""
+        chunks = iter(chunks)
+        for chunk in chunks:
+            if timing is not None and chunk and "ttft" not in timing:
+                timing["ttft"] = time.perf_counter() - timing["start"]
+            received += chunk
+            command = first_complete_command(received)
+            if command is not None:
+                # Stop sequences usually end the response right after the command, and most
+                # providers report token usage with the last chunk: read a few more to get it
+                for _ in zip(range(USAGE_TAIL_CHUNKS), chunks):
+                    pass
+                return command
+        return first_complete_command(received, final=True) or received.strip()
+
+    def _build_messages(self, input_text: str, additional_data: dict = None) -> List[dict]:
+        """Builds the chat messages of a request.
+
+        The role definition comes first as its own system message and is the
+        same on every call, so providers can reuse their cache of the prompt
+        prefix. The summary of compacted history, the history turns and the
+        input follow. Additional data is appended to the input, truncated so
+        the messages stay within the node's prompt_tokens budget. The estimated
+        size is logged.
+
+        Args:
+            input_text: Input prompt
+            additional_data: Supplementary context (optional)
+
+        Returns:
+            List of messages with "role" and "content" keys
+        """
+
+        messages = [{"role": "system", "content": self.definition}]
+        summary = self.context.summary_text()
+        if summary:
+            messages.append({"role": "system", "content": summary})
+        messages.extend(dict(message) for message in self.context)
+        content = input_text
+        if additional_data:
+            header = "\n\nAdditional data:\n"
+            framing = estimate_tokens(header) + len(additional_data)
+            budget = self.prompt_tokens - estimate_message_tokens(messages + [{"role": "user", "content": input_text}]) - framing
+            additional_data = self._fit_additional_data(additional_data, budget)
+            content += header + "".join(f"{key}: {value}\n" for key, value in additional_data.items())
+        messages.append({"role": "user", "content": content})
+        logger.info("%s prompt: ~%d tokens (budget %d)", self.name, estimate_message_tokens(messages), self.prompt_tokens)
+        return messages
+
+    @staticmethod
+    def _fit_additional_data(additional_data: dict, budget: int) -> dict:
+        """Truncates additional data values to share a token budget.
+
+        Values that fit within an even share are kept whole, and whatever they
+        leave unused is split among the larger ones.
+
+        Args:
+            additional_data: Supplementary context
+            budget: Tokens available for all values
+
+        Returns:
+            Dictionary with the same keys and possibly truncated values
         """
+
+        values = {key: str(value) for key, value in additional_data.items()}
+        sizes = {key: estimate_tokens(f"{key}: {value}") for key, value in values.items()}
+        if sum(sizes.values()) <= budget:
+            return values
+
+        remaining = max(budget, 0)
+        oversized = sorted(values, key=sizes.get)
+        fitted = {}
+        while oversized:
+            share = remaining // len(oversized)
+            key = oversized[0]
+            if sizes[key] > share:
+                break
+            fitted[key] = values[key]
+            remaining -= sizes[key]
+            oversized.pop(0)
+        for key in oversized:
+            share = remaining // len(oversized)
+            fitted[key] = truncate_to_tokens(values[key], share - estimate_tokens(f"{key}: "))
+            logger.info("Truncated additional data '%s' from ~%d to ~%d tokens", key, sizes[key], share)
+        return {key: fitted[key] for key in additional_data}
+
+    def _remember(self, input_text: str, output: str):
+        """Appends a completed exchange to the conversation history.
+
+        Args:
+            input_text: Input prompt
+            output: AI-generated response
+        """
+
+        self.context.append("user", input_text)
+        self.context.append("assistant", output)
+
+    def _base_url(self, provider: str):
+        """Gets a provider's API base URL, overridable with <PROVIDER>_BASE_URL.
+
+        Pointing a provider at another endpoint, such as the fake server in
+        promptshell.fake_llm_server, needs no other change.
+
+        Args:
+            provider: Provider name
+
+        Returns:
+            Base URL, or None for the SDK default
+        """
+
+        override = str(self.config.get(f"{provider.upper()}_BASE_URL", "")).strip()
+        return override or PROVIDER_BASE_URLS.get(provider)
+
+    def _sdk_client(self, provider: str, asynchronous: bool = False):
+        """Gets a pooled client of a provider with its own SDK (Anthropic, Groq).
+
+        Args:
+            provider: "anthropic" or "groq"
+            asynchronous: True for an async client, pooled per event loop (default: False)
+
+        Returns:
+            SDK client shared by all nodes using the same endpoint
+        """
+
+        api_key = self.config[f"{provider.upper()}_API_KEY"]
+        base_url = self._base_url(provider)
+        class_name = SDK_CLIENT_CLASSES[provider][asynchronous]
+        factory = lambda: getattr(load_sdk(provider), class_name)(api_key=api_key, base_url=base_url, max_retries=0)
+        return client_pool.get(provider, api_key, factory, base_url=base_url, bound_to_loop=asynchronous)
+
+    @staticmethod
+    def _openai_client(provider: str, api_key: str, base_url: str = None):
+        """Gets a pooled client for an OpenAI-compatible endpoint.
+
+        Args:
+            provider: Provider name
+            api_key: API key
+            base_url: Endpoint base URL (default: OpenAI)
+
+        Returns:
+            OpenAI client shared by all nodes using the same endpoint
+        """
+
+        factory = lambda: load_sdk("openai").OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        return client_pool.get(provider, api_key, factory, base_url=base_url)
+
+    @staticmethod
+    def _async_openai_client(provider: str, api_key: str, base_url: str = None):
+        """Gets a pooled async client for an OpenAI-compatible endpoint.
+
+        Args:
+            provider: Provider name
+            api_key: API key
+            base_url: Endpoint base URL (default: OpenAI)
+
+        Returns:
+            AsyncOpenAI client shared within the running event loop
+        """
+
+        factory = lambda: load_sdk("openai").AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        return client_pool.get(provider, api_key, factory, base_url=base_url, bound_to_loop=True)
+
+    def _completion_options(self, provider: str) -> dict:
+        """Builds the token limit and stop sequence arguments for chat completions.
         
-        api_key = self.config["GROQ_API_KEY"]
-        client = Groq(api_key=api_key)
+        Args:
+            provider: OpenAI-compatible provider name
+            
+        Returns:
+            Keyword arguments for chat.completions.create
+        """
+
+        options = {}
+        if self.reasoning_model:
+            return options
+        if provider != "openai":
+            options["max_tokens"] = self.max_tokens
+        elif self.max_tokens <= 4096:
+            # Larger limits are left to the model default, older OpenAI models reject them
+            options["max_completion_tokens"] = self.max_tokens
+        if self.stop:
+            options["stop"] = self.stop[:4]  # OpenAI-compatible APIs accept at most 4
+        return options
+
+    @property
+    def reasoning_model(self) -> bool:
+        """Whether the model reasons before answering (OpenAI o-series, DeepSeek R1, Gemini thinking models).
+
+        Their reasoning counts against the output token limit, so a small
+        limit can end the response before the answer starts, and stop
+        sequences can match inside the reasoning. Neither is sent to them.
+        """
+
+        name = self.model_name.lower().rsplit("/", 1)[-1]
+        return (name.startswith(("o1", "o3", "o4")) or "reasoner" in name or "-r1" in name
+                or "thinking" in name or name.startswith("gemini-2.5"))
+
+    @staticmethod
+    def _split_system(messages: List[dict]) -> Tuple[str, List[dict]]:
+        """Separates the system messages from the conversation turns.
+
+        Args:
+            messages: Chat messages
+
+        Returns:
+            Tuple of (system messages joined by blank lines, user and assistant turns)
+        """
+
+        system = "\n\n".join(message["content"] for message in messages if message["role"] == "system" and message["content"])
+        turns = [message for message in messages if message["role"] != "system"]
+        return system, turns
+
+    def _chat_messages(self, messages: List[dict]) -> List[dict]:
+        """Merges the system messages into one leading system message, as some OpenAI-compatible APIs require."""
+
+        system, turns = self._split_system(messages)
+        return ([{"role": "system", "content": system}] if system else []) + turns
+
+    def _anthropic_kwargs(self, messages: List[dict]) -> dict:
+        """Builds the Anthropic messages arguments (whitespace-only stop sequences are rejected).
+
+        With PROMPT_CACHE on, cache breakpoints are set after the role
+        definition and after the history, so later calls read both from the
+        prompt cache.
+        """
+
+        system, turns = self._split_system(messages)
+        kwargs = {
+            "model": self.model_name,
+            "max_tokens": self.max_tokens,
+            "messages": turns,
+        }
+        if system and config_flag(self.config, "PROMPT_CACHE"):
+            blocks = [{"type": "text", "text": message["content"]} for message in messages
+                      if message["role"] == "system" and message["content"]]
+            blocks[0]["cache_control"] = {"type": "ephemeral"}
+            kwargs["system"] = blocks
+            if len(turns) > 1:
+                history_end = turns[-2]
+                turns[-2] = {"role": history_end["role"], "content": [
+                    {"type": "text", "text": history_end["content"], "cache_control": {"type": "ephemeral"}}
+                ]}
+        elif system:
+            kwargs["system"] = system
+        stop_sequences = [stop for stop in self.stop if stop.strip()]
+        if stop_sequences:
+            kwargs["stop_sequences"] = stop_sequences
+        return kwargs
+
+    def _google_generation_config(self):
+        """Builds the Google generation config for this node's limits.
         
-        messages = [
-            {
-                "role": "system",
-                "content": "Always respond in valid JSON format using double quotes with a 'command' key."
-            },
-            {
-                "role": "user", 
-                "content": f"{prompt}. Return ONLY a JSON object with a 'command' key."
-            }
+        Returns:
+            Generation config dictionary, or None to use the model defaults
+        """
+
+        if not self.stop or self.reasoning_model:
+            return None
+        return {"stop_sequences": self.stop[:5], "max_output_tokens": self.max_tokens}
+
+    def _openrouter_headers(self) -> dict:
+        """Gets the attribution headers OpenRouter expects on each request."""
+
+        return {
+            "HTTP-Referer": self.config.get("OPENROUTER_REFERER", "https://github.com/your-repo"),
+            "X-Title": self.config.get("OPENROUTER_TITLE", "AI Application"),
+        }
+
+    def _google_model(self, api_key: str, system_instruction: str = None):
+        """Configures the Google SDK and builds a model handle.
+
+        Args:
+            api_key: Google API key
+            system_instruction: System instruction of the model (optional)
+
+        Returns:
+            GenerativeModel for this node's model
+        """
+
+        genai = load_sdk("google.generativeai")
+        genai.configure(api_key=api_key)
+        return genai.GenerativeModel(self.model_name, system_instruction=system_instruction or None)
+
+    def _google_request(self, api_key: str, messages: List[dict], bound_to_loop: bool = False):
+        """Gets the pooled Google model of this role and the request contents.
+
+        The role definition becomes the model's system instruction, so one
+        model handle is pooled per model and role. A history summary is put in
+        front of the first turn and assistant turns use Google's "model" role.
+
+        Args:
+            api_key: Google API key
+            messages: Chat messages
+            bound_to_loop: True when the model is used by async calls
+
+        Returns:
+            Tuple of (GenerativeModel, contents)
+        """
+
+        definition = messages[0]["content"] if messages[0]["role"] == "system" else ""
+        model = client_pool.get("google", api_key, lambda: self._google_model(api_key, definition),
+                                variant=f"{self.model_name}:{definition}", bound_to_loop=bound_to_loop)
+        summary, turns = self._split_system(messages[1:] if definition else messages)
+        contents = [
+            {"role": "model" if message["role"] == "assistant" else "user", "parts": [message["content"]]}
+            for message in turns
         ]
+        if summary:
+            contents[0]["parts"].insert(0, summary)
+        return model, contents
+
+    def _ollama_keep_alive(self):
+        """Gets how long Ollama should keep the model loaded after a call.
+
+        Returns:
+            Duration string (e.g. "30m") or number of seconds (-1 keeps it loaded)
+        """
+
+        keep_alive = str(self.config.get("OLLAMA_KEEP_ALIVE", "30m")).strip() or "30m"
+        try:
+            return int(keep_alive)
+        except ValueError:
+            return keep_alive
+
+    def _chat_kwargs(self, provider: str, messages: List[dict]) -> dict:
+        """Builds the chat completion arguments for an OpenAI-compatible provider.
+
+        Args:
+            provider: OpenAI-compatible provider name
+            messages: Chat messages
+
+        Returns:
+            Keyword arguments for chat.completions.create
+        """
+
+        kwargs = {
+            "model": self.model_name,
+            "messages": self._chat_messages(messages),
+            **self._completion_options(provider),
+        }
+        if provider == "openai" and config_flag(self.config, "PROMPT_CACHE"):
+            # Requests sharing a cache key are routed to the same prefix cache
+            kwargs["extra_body"] = {"prompt_cache_key": f"promptshell-{self.name}"}
+        if provider == "openrouter":
+            kwargs["extra_headers"] = self._openrouter_headers()
+        elif provider == "deepseek":
+            kwargs["temperature"] = 0.3  # Recommended default for DeepSeek
+        return kwargs
+
+    def _groq_json_kwargs(self, messages: List[dict]) -> dict:
+        """Builds the Groq chat completion arguments for a JSON-mode command request."""
+
+        system, turns = self._split_system(messages)
+        instruction = "Always respond in valid JSON format using double quotes with a 'command' key."
+        turns[-1] = {"role": "user", "content": f"{turns[-1]['content']}. Return ONLY a JSON object with a 'command' key."}
+        return {
+            "model": self.model_name,
+            "messages": [{"role": "system", "content": f"{system}\n\n{instruction}" if system else instruction}] + turns,
+            "max_tokens": self.max_tokens,
+            "response_format": {"type": "json_object"},
+        }
+
+    @staticmethod
+    def _parse_groq_command(content: str) -> str:
+        """Extracts the command from a Groq JSON-mode response."""
+
+        return json.loads(content.strip())["command"].strip()
+
+    def _ollama_num_ctx(self, messages: List[dict]) -> int:
+        """Picks the Ollama context size for a request.
+
+        OLLAMA_NUM_CTX sets a fixed size. With "auto" (the default) the size is
+        the smallest power of two holding the estimated prompt and part of the
+        response, at least OLLAMA_MIN_CTX and at most OLLAMA_MAX_CTX tokens.
+        Ollama reloads the model whenever num_ctx changes, which also drops its
+        cached prompt, so the size chosen for a model never shrinks.
+
+        Args:
+            messages: Chat messages
+
+        Returns:
+            Context size in tokens
+        """
+
+        configured = str(self.config.get("OLLAMA_NUM_CTX", "auto")).strip().lower()
+        if configured not in ("", "auto"):
+            return int(config_number(self.config, "OLLAMA_NUM_CTX", OLLAMA_MIN_CTX))
+
+        needed = estimate_message_tokens(messages) + min(self.max_tokens, OLLAMA_RESPONSE_RESERVE)
+        size = OLLAMA_MIN_CTX
+        while size < needed and size < OLLAMA_MAX_CTX:
+            size *= 2
+        key = (ollama_base_url(self.config.get("OLLAMA_HOST")), self.model_name)
+        with _ollama_num_ctx_lock:
+            size = _ollama_num_ctx[key] = max(size, _ollama_num_ctx.get(key, 0))
+        return size
+
+    def _ollama_payload(self, messages: List[dict], stream: bool) -> dict:
+        """Builds the Ollama chat request body.
+
+        Ollama keeps the evaluated prompt of a loaded model and only evaluates
+        what follows the longest matching prefix, so the unchanged role
+        definition and history are not processed again on the next turn.
+
+        Args:
+            messages: Chat messages
+            stream: Whether the response is streamed
+
+        Returns:
+            JSON request body
+        """
+
+        options = {"num_ctx": self._ollama_num_ctx(messages)}
+        if not self.reasoning_model:
+            options.update(stop=self.stop, num_predict=self.max_tokens)
+        return {
+            "model": self.model_name,
+            "messages": self._chat_messages(messages),
+            "stream": stream,
+            "keep_alive": self._ollama_keep_alive(),
+            "options": options,
+        }
+
+    def _record_usage(self, response):
+        """Adds the token counts reported with a response to the active usage record.
+
+        Prompt tokens always include the ones served from the provider's
+        prompt cache, which are also recorded separately.
+
+        Args:
+            response: Provider response object, or the decoded JSON body for Ollama
+        """
+
+        if self.provider == "ollama":
+            record_usage(response.get("prompt_eval_count"), response.get("eval_count"))
+        elif self.provider == "anthropic":
+            usage = getattr(response, "usage", None)
+            # Anthropic's input_tokens leaves out cache reads and writes
+            counts = [getattr(usage, name, None) for name in ("input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")]
+            prompt_tokens = sum(count for count in counts if isinstance(count, int)) if isinstance(counts[0], int) else None
+            record_usage(prompt_tokens, getattr(usage, "output_tokens", None), counts[1], counts[2])
+        elif self.provider == "google":
+            usage = getattr(response, "usage_metadata", None)
+            record_usage(getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None),
+                         getattr(usage, "cached_content_token_count", None))
+        else:
+            usage = getattr(response, "usage", None)
+            cached_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+            if self.provider == "deepseek":
+                cached_tokens = getattr(usage, "prompt_cache_hit_tokens", None)
+            record_usage(getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None), cached_tokens)
+
+    def _stream_ollama(self, messages: List[dict]) -> Iterator[str]:
+        """Streams a response from the Ollama API.
         
-        response = client.chat.completions.create(
-            model=self.model_name,
-            messages=messages,
-            max_tokens=self.max_tokens,
-            response_format={"type": "json_object"},
+        Args:
+            messages: Chat messages
+            
+        Yields:
+            Response text chunks
+        """
+
+        host = ollama_base_url(self.config.get("OLLAMA_HOST"))
+        session = client_pool.get("ollama", None, create_http_session, base_url=host)
+        response = session.post(
+            f"{host}/api/chat",
+            json=self._ollama_payload(messages, stream=True),
+            stream=True
         )
+        try:
+            if response.status_code != 200:
+                raise ProviderHTTPError(f"Ollama API call failed: {response.status_code} - {response.text}",
+                                        response.status_code, response.headers)
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(data["error"])
+                if data.get("done"):
+                    self._record_usage(data)
+                yield data.get("message", {}).get("content", "")
+                if data.get("done"):
+                    break
+        finally:
+            response.close()
+
+    def _stream_chat_completion(self, client, **kwargs) -> Iterator[str]:
+        """Streams a response from an OpenAI-compatible chat completions endpoint.
+
+        The token usage arrives with the last chunk (OpenAI and DeepSeek send
+        it when asked with stream_options, Groq in its x_groq extension).
+
+        Args:
+            client: OpenAI-compatible client (OpenAI, Groq)
+            **kwargs: Arguments for chat.completions.create
+
+        Yields:
+            Response text chunks
+        """
+
+        if self.provider in STREAM_USAGE_PROVIDERS:
+            kwargs["stream_options"] = {"include_usage": True}
+        stream = client.chat.completions.create(stream=True, **kwargs)
+        try:
+            for chunk in stream:
+                usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+                if usage is not None:
+                    self._record_usage(SimpleNamespace(usage=usage))
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+
+    def _stream_openai(self, messages: List[dict]) -> Iterator[str]:
+        """Streams a response from the OpenAI API.
         
-        # Extract and parse the JSON response
-        response_json = json.loads(response.choices[0].message.content.strip())
-        return response_json["command"].strip()
+        Args:
+            messages: Chat messages
+            
+        Yields:
+            Response text chunks
+        """
 
-    @spinner(spinner_type="random", message=" [magenta]Waiting for API response...")
-    def _call_fireworks(self, prompt: str) -> str:
-        """Handle API calls for Fireworks AI provider
+        client = self._openai_client("openai", self.config["OPENAI_API_KEY"], self._base_url("openai"))
+        yield from self._stream_chat_completion(client, **self._chat_kwargs("openai", messages))
+
+    def _stream_anthropic(self, messages: List[dict]) -> Iterator[str]:
+        """Streams a response from the Anthropic API.
+        
+        Args:
+            messages: Chat messages
+            
+        Yields:
+            Response text chunks
+        """
+
+        client = self._sdk_client("anthropic")
+        usage = {}
+        try:
+            with client.messages.stream(**self._anthropic_kwargs(messages)) as stream:
+                for event in stream:
+                    if event.type == "message_start":
+                        usage.update({name: getattr(event.message.usage, name, None) for name in (
+                            "input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")})
+                    elif event.type == "message_delta":
+                        usage["output_tokens"] = event.usage.output_tokens
+                    elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                        yield event.delta.text
+        finally:
+            if usage:
+                # Output tokens stay at the message_start placeholder if the stream was closed early
+                self._record_usage(SimpleNamespace(usage=SimpleNamespace(**usage)))
+
+    def _stream_google(self, messages: List[dict]) -> Iterator[str]:
+        """Streams a response from the Google API.
+        
+        Args:
+            messages: Chat messages
+            
+        Yields:
+            Response text chunks
+        """
+
+        api_key = self.config["GOOGLE_API_KEY"]
+        model, contents = self._google_request(api_key, messages)
+        last = None
+        try:
+            for chunk in model.generate_content(contents, stream=True, generation_config=self._google_generation_config()):
+                last = chunk  # Every chunk carries the usage so far
+                try:
+                    yield chunk.text
+                except ValueError:
+                    continue  # Chunk without text parts (e.g. safety metadata)
+        finally:
+            if last is not None:
+                self._record_usage(last)
+
+    def _stream_groq(self, messages: List[dict]) -> Iterator[str]:
+        """Streams a response from the Groq API.
+
+        JSON mode cannot be parsed incrementally, so the streamed response is plain text.
+        
+        Args:
+            messages: Chat messages
+            
+        Yields:
+            Response text chunks
+        """
+
+        client = self._sdk_client("groq")
+        yield from self._stream_chat_completion(client, **self._chat_kwargs("groq", messages))
+
+    def _stream_fireworks(self, messages: List[dict]) -> Iterator[str]:
+        """Streams a response from the Fireworks AI API.
+        
+        Args:
+            messages: Chat messages
+            
+        Yields:
+            Response text chunks
+        """
+
+        client = self._openai_client("fireworks", self.config["FIREWORKS_API_KEY"], self._base_url("fireworks"))
+        yield from self._stream_chat_completion(client, **self._chat_kwargs("fireworks", messages))
+
+    def _stream_openrouter(self, messages: List[dict]) -> Iterator[str]:
+        """Streams a response from the OpenRouter API.
+        
+        Args:
+            messages: Chat messages
+            
+        Yields:
+            Response text chunks
+        """
+
+        client = self._openai_client("openrouter", self.config["OPENROUTER_API_KEY"], self._base_url("openrouter"))
+        yield from self._stream_chat_completion(client, **self._chat_kwargs("openrouter", messages))
+
+    def _stream_deepseek(self, messages: List[dict]) -> Iterator[str]:
+        """Streams a response from the DeepSeek API.
         
         Args:
-            prompt: Input prompt
+            messages: Chat messages
+            
+        Yields:
+            Response text chunks
+        """
+
+        client = self._openai_client("deepseek", self.config["DEEPSEEK_API_KEY"], self._base_url("deepseek"))
+        yield from self._stream_chat_completion(client, **self._chat_kwargs("deepseek", messages))
+
+    async def _acall_ollama(self, messages: List[dict]) -> str:
+        """Calls the Ollama API asynchronously.
+        
+        Args:
+            messages: Chat messages
             
         Returns:
             API response
         """
+
+        host = ollama_base_url(self.config.get("OLLAMA_HOST"))
+        client = client_pool.get("ollama", None, create_async_http_client, base_url=host, bound_to_loop=True)
+        response = await client.post(f"{host}/api/chat", json=self._ollama_payload(messages, stream=False))
+        if response.status_code != 200:
+            raise ProviderHTTPError(f"Ollama API call failed: {response.status_code} - {response.text}",
+                                    response.status_code, response.headers)
+        data = response.json()
+        self._record_usage(data)
+        return data.get("message", {}).get("content", "").strip()
+
+    async def _acall_chat_completion(self, provider: str, messages: List[dict]) -> str:
+        """Calls an OpenAI-compatible provider asynchronously.
         
-        api_key = self.config["FIREWORKS_API_KEY"]
-        client = OpenAI(
-            api_key=api_key,
-            base_url="https://api.fireworks.ai/inference/v1/accounts/fireworks/models/",
-        )
-        response = client.chat.completions.create(
-            model=self.model_name,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=self.max_tokens
-        )
+        Args:
+            provider: OpenAI-compatible provider name
+            messages: Chat messages
+            
+        Returns:
+            API response
+        """
+
+        api_key = self.config[f"{provider.upper()}_API_KEY"]
+        client = self._async_openai_client(provider, api_key, self._base_url(provider))
+        response = await client.chat.completions.create(**self._chat_kwargs(provider, messages))
+        self._record_usage(response)
         return response.choices[0].message.content.strip()
 
-    @spinner(spinner_type="random", message=" [magenta]Waiting for API response...")
-    def _call_openrouter(self, prompt: str) -> str:
-        """Handle API calls for OpenRouter provider
+    async def _acall_openai(self, messages: List[dict]) -> str:
+        """Calls the OpenAI API asynchronously."""
+
+        return await self._acall_chat_completion("openai", messages)
+
+    async def _acall_fireworks(self, messages: List[dict]) -> str:
+        """Calls the Fireworks AI API asynchronously."""
+
+        return await self._acall_chat_completion("fireworks", messages)
+
+    async def _acall_openrouter(self, messages: List[dict]) -> str:
+        """Calls the OpenRouter API asynchronously."""
+
+        return await self._acall_chat_completion("openrouter", messages)
+
+    async def _acall_deepseek(self, messages: List[dict]) -> str:
+        """Calls the DeepSeek API asynchronously."""
+
+        return await self._acall_chat_completion("deepseek", messages)
+
+    async def _acall_anthropic(self, messages: List[dict]) -> str:
+        """Calls the Anthropic API asynchronously.
         
         Args:
-            prompt: Input prompt
+            messages: Chat messages
             
         Returns:
             API response
         """
 
-        api_key = self.config["OPENROUTER_API_KEY"]
-        client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=api_key,
-            default_headers={
-                "HTTP-Referer": self.config.get("OPENROUTER_REFERER", "https://github.com/your-repo"),
-                "X-Title": self.config.get("OPENROUTER_TITLE", "AI Application"),
-            }
-        )
-        response = client.chat.completions.create(
-            model=self.model_name,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=self.max_tokens
-        )
-        return response.choices[0].message.content.strip()
+        client = self._sdk_client("anthropic", asynchronous=True)
+        response = await client.messages.create(**self._anthropic_kwargs(messages))
+        self._record_usage(response)
+        return response.content[0].text.strip()
 
-    @spinner(spinner_type="random", message=" [magenta]Waiting for API response...")
-    def _call_deepseek(self, prompt: str) -> str:
-        """Handle API calls for DeepSeek provider
+    async def _acall_google(self, messages: List[dict]) -> str:
+        """Calls the Google API asynchronously.
         
         Args:
-            prompt: Input prompt
+            messages: Chat messages
             
         Returns:
             API response
         """
 
-        api_key = self.config["DEEPSEEK_API_KEY"]
-        client = OpenAI(
-            api_key=api_key,
-            base_url="https://api.deepseek.com/v1",
-        )
-        response = client.chat.completions.create(
-            model=self.model_name,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=self.max_tokens,
-            temperature=0.3  # Recommended default for DeepSeek
-        )
-        return response.choices[0].message.content.strip()
+        api_key = self.config["GOOGLE_API_KEY"]
+        model, contents = self._google_request(api_key, messages, bound_to_loop=True)
+        response = await model.generate_content_async(contents, generation_config=self._google_generation_config())
+        self._record_usage(response)
+        return response.text.strip()
+
+    async def _acall_groq(self, messages: List[dict]) -> str:
+        """Calls the Groq API asynchronously in JSON mode.
+        
+        Args:
+            messages: Chat messages
+            
+        Returns:
+            API response
+        """
 
+        client = self._sdk_client("groq", asynchronous=True)
+        response = await client.chat.completions.create(**self._groq_json_kwargs(messages))
+        self._record_usage(response)
+        return self._parse_groq_command(response.choices[0].message.content)
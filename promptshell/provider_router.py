@@ -0,0 +1,250 @@
+import threading
+import time
+
+from collections import deque
+from typing import Callable, List, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+class ProviderHealth:
+    def __init__(self, window: int = 20):
+        """Rolling outcome and latency record of one provider.
+
+        Args:
+            window: Number of recent calls kept (default: 20)
+        """
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self.probe = None
+        self._outcomes = deque(maxlen=window)
+
+    def record(self, ok: bool, seconds: float = None):
+        """Adds a call outcome.
+
+        Args:
+            ok: Whether the call succeeded
+            seconds: Latency of a successful call (optional)
+        """
+
+        self._outcomes.append((ok, seconds))
+
+    @property
+    def error_rate(self) -> float:
+        """Share of failed calls in the window."""
+
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for ok, _ in self._outcomes if not ok) / len(self._outcomes)
+
+    @property
+    def median_latency(self):
+        """Median latency of successful calls in the window, None without any."""
+
+        latencies = sorted(seconds for ok, seconds in self._outcomes if ok and seconds is not None)
+        return latencies[len(latencies) // 2] if latencies else None
+
+class ProviderRouter:
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0, probe_interval: float = 10.0):
+        """Circuit breaker and failover routing across providers.
+
+        A provider's circuit opens after `failure_threshold` consecutive
+        failures. While open, requests go to the next healthy candidate. After
+        `cooldown` seconds a background thread probes the provider and closes
+        the circuit once it answers again; without a probe, the next request is
+        let through as a trial (half-open).
+
+        Args:
+            failure_threshold: Consecutive failures that open a circuit (default: 3)
+            cooldown: Seconds before an open circuit is retried (default: 30)
+            probe_interval: Seconds between background probe rounds (default: 10)
+        """
+
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.probe_interval = probe_interval
+        self.decisions = deque(maxlen=20)
+        self._health = {}
+        self._lock = threading.Lock()
+        self._probe_thread = None
+
+    def _get(self, provider: str) -> ProviderHealth:
+        return self._health.setdefault(provider, ProviderHealth())
+
+    def is_available(self, provider: str) -> bool:
+        """Checks whether requests may be sent to a provider.
+
+        Args:
+            provider: Provider name
+
+        Returns:
+            True unless the provider's circuit is open and cooling down
+        """
+
+        with self._lock:
+            health = self._get(provider)
+            if health.state != OPEN:
+                return True
+            if health.probe is None and time.monotonic() - health.opened_at >= self.cooldown:
+                health.state = HALF_OPEN
+                return True
+            return False
+
+    def route(self, candidates: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Orders candidates for a request.
+
+        The first candidate is the configured provider and keeps its place
+        while healthy. Healthy fallbacks follow, fastest median latency first.
+        If every circuit is open, the configured provider is tried anyway.
+
+        Args:
+            candidates: (provider, model) pairs, configured provider first
+
+        Returns:
+            (provider, model) pairs to try in order
+        """
+
+        available = [candidate for candidate in candidates if self.is_available(candidate[0])]
+        if not available:
+            return candidates[:1]
+        primary = [candidate for candidate in available[:1] if candidate == candidates[0]]
+        fallbacks = available[len(primary):]
+        with self._lock:
+            def latency(candidate):
+                median = self._get(candidate[0]).median_latency
+                return float("inf") if median is None else median
+            fallbacks.sort(key=latency)
+        return primary + fallbacks
+
+    def record_success(self, provider: str, seconds: float):
+        """Records a successful call and closes the provider's circuit.
+
+        Args:
+            provider: Provider name
+            seconds: Call latency
+        """
+
+        with self._lock:
+            health = self._get(provider)
+            health.record(True, seconds)
+            health.consecutive_failures = 0
+            health.state = CLOSED
+            health.probe = None
+
+    def record_failure(self, provider: str, error: Exception, probe: Callable[[], bool] = None):
+        """Records a failed call, opening the circuit after repeated failures.
+
+        Args:
+            provider: Provider name
+            error: Exception raised by the call
+            probe: Zero-argument callable returning True if the provider answers (optional)
+        """
+
+        with self._lock:
+            health = self._get(provider)
+            health.record(False)
+            health.consecutive_failures += 1
+            health.last_error = str(error)
+            if health.state == HALF_OPEN or health.consecutive_failures >= self.failure_threshold:
+                health.state = OPEN
+                health.opened_at = time.monotonic()
+                health.probe = probe
+        if probe is not None:
+            self._start_probing()
+
+    def record_decision(self, role: str, requested: str, used: str):
+        """Remembers which provider served a request.
+
+        Args:
+            role: Node role name
+            requested: Configured provider
+            used: Provider that answered
+        """
+
+        self.decisions.append({"time": time.time(), "role": role, "requested": requested, "used": used})
+
+    def _start_probing(self):
+        """Starts the background probe thread unless it is already running."""
+
+        with self._lock:
+            if self._probe_thread is not None and self._probe_thread.is_alive():
+                return
+            self._probe_thread = threading.Thread(target=self._probe_loop, name="provider-probe", daemon=True)
+            self._probe_thread.start()
+
+    def _probe_loop(self):
+        """Probes open circuits until all of them are closed."""
+
+        while True:
+            time.sleep(self.probe_interval)
+            with self._lock:
+                due = [
+                    (provider, health.probe) for provider, health in self._health.items()
+                    if health.state == OPEN and health.probe is not None
+                    and time.monotonic() - health.opened_at >= self.cooldown
+                ]
+                waiting = any(health.state == OPEN and health.probe is not None for health in self._health.values())
+            if not waiting:
+                return
+            for provider, probe in due:
+                self.probe_now(provider, probe)
+
+    def probe_now(self, provider: str, probe: Callable[[], bool]) -> bool:
+        """Runs one probe and updates the circuit with its outcome.
+
+        Args:
+            provider: Provider name
+            probe: Zero-argument callable returning True if the provider answers
+
+        Returns:
+            True if the provider answered
+        """
+
+        start = time.perf_counter()
+        try:
+            ok = bool(probe())
+        except Exception:
+            ok = False
+        with self._lock:
+            health = self._get(provider)
+            if ok:
+                health.record(True, time.perf_counter() - start)
+                health.state = CLOSED
+                health.consecutive_failures = 0
+                health.probe = None
+            else:
+                health.opened_at = time.monotonic()
+        return ok
+
+    def status(self) -> dict:
+        """Gets circuit state and rolling metrics per provider.
+
+        Returns:
+            Dictionary mapping provider to state, error_rate, median_latency,
+            consecutive_failures and last_error
+        """
+
+        with self._lock:
+            return {
+                provider: {
+                    "state": health.state,
+                    "error_rate": round(health.error_rate, 3),
+                    "median_latency": None if health.median_latency is None else round(health.median_latency, 3),
+                    "consecutive_failures": health.consecutive_failures,
+                    "last_error": health.last_error,
+                }
+                for provider, health in self._health.items()
+            }
+
+    def reset(self):
+        """Forgets all provider health and routing decisions."""
+
+        with self._lock:
+            self._health.clear()
+            self.decisions.clear()
+
+router = ProviderRouter()
@@ -0,0 +1,196 @@
+import importlib
+import threading
+
+from functools import lru_cache
+from typing import Callable
+
+# SDK module backing each provider. Several OpenAI-compatible providers share the
+# `openai` package. Ollama has no SDK: its requests go through `httpx`, and its
+# streamed responses through a `requests` session.
+PROVIDER_SDKS = {
+    "ollama": "httpx",
+    "openai": "openai",
+    "anthropic": "anthropic",
+    "google": "google.generativeai",
+    "groq": "groq",
+    "fireworks": "openai",
+    "openrouter": "openai",
+    "deepseek": "openai",
+}
+
+@lru_cache(maxsize=None)
+def load_sdk(module_name: str):
+    """Imports an SDK module on first use.
+
+    Provider SDKs are expensive to import, so they are only loaded when the
+    provider that needs them makes its first call.
+
+    Args:
+        module_name: Dotted module name (e.g. "google.generativeai")
+
+    Returns:
+        Imported module
+    """
+
+    return importlib.import_module(module_name)
+
+# Base URLs of the OpenAI-compatible providers (None uses the SDK default)
+PROVIDER_BASE_URLS = {
+    "openai": None,
+    "fireworks": "https://api.fireworks.ai/inference/v1/accounts/fireworks/models/",
+    "openrouter": "https://openrouter.ai/api/v1",
+    "deepseek": "https://api.deepseek.com/v1",
+}
+
+DEFAULT_OLLAMA_HOST = "http://localhost:11434"
+
+def ollama_base_url(host: str = None) -> str:
+    """Normalizes an OLLAMA_HOST value into a base URL.
+
+    Args:
+        host: Configured host, with or without scheme (e.g. "127.0.0.1:11434")
+
+    Returns:
+        Base URL without trailing slash
+    """
+
+    host = (host or "").strip() or DEFAULT_OLLAMA_HOST
+    if "://" not in host:
+        host = f"http://{host}"
+    return host.rstrip("/")
+
+def create_async_http_client():
+    """Creates an httpx async client with a keep-alive connection pool.
+
+    Returns:
+        httpx.AsyncClient
+    """
+
+    httpx = load_sdk("httpx")
+    return httpx.AsyncClient(timeout=None, limits=httpx.Limits(max_keepalive_connections=10))
+
+def create_http_session(pool_maxsize: int = 10):
+    """Creates a requests session with a keep-alive connection pool.
+
+    Args:
+        pool_maxsize: Connections kept open per host (default: 10)
+
+    Returns:
+        requests.Session
+    """
+
+    requests = load_sdk("requests")
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class ClientPool:
+    def __init__(self):
+        """Process-wide pool of long-lived provider clients.
+
+        Clients are keyed by provider, API key, base URL and an optional variant
+        (e.g. the model name for Google), so every role talking to the same
+        endpoint shares one client and its HTTP connection pool.
+        """
+
+        self._clients = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str, api_key: str, factory: Callable, base_url: str = None, variant: str = None,
+            bound_to_loop: bool = False):
+        """Returns the pooled client for an endpoint, creating it on first use.
+
+        Args:
+            provider: Provider name
+            api_key: API key the client authenticates with
+            factory: Zero-argument callable building a new client
+            base_url: Endpoint base URL (optional)
+            variant: Extra discriminator for providers with per-model clients (optional)
+            bound_to_loop: True for async clients, which are pooled per running event loop
+
+        Returns:
+            Provider client
+        """
+
+        key = (provider, api_key, base_url, variant)
+        if bound_to_loop:
+            import asyncio  # Only needed by async callers, kept off the startup path
+            key += (asyncio.get_running_loop(),)
+        with self._lock:
+            if bound_to_loop:
+                self._drop_closed_loops()
+            stats = self._stats.setdefault(provider, {"created": 0, "pool_hits": 0})
+            client = self._clients.get(key)
+            if client is not None:
+                stats["pool_hits"] += 1
+                return client
+            client = factory()
+            self._clients[key] = client
+            stats["created"] += 1
+            return client
+
+    def _drop_closed_loops(self):
+        """Forgets async clients whose event loop has been closed."""
+
+        for key in [key for key in self._clients if len(key) > 4 and key[4].is_closed()]:
+            del self._clients[key]
+
+    def client_stats(self) -> dict:
+        """Gets client pool metrics per provider.
+
+        A pool hit is a lookup answered with an existing client object. It
+        does not tell whether the client's HTTP library kept the connection
+        alive, which these metrics do not measure.
+
+        Returns:
+            Dictionary mapping provider to created, pool_hits and pool_hit_ratio
+        """
+
+        with self._lock:
+            result = {}
+            for provider, stats in self._stats.items():
+                lookups = stats["created"] + stats["pool_hits"]
+                result[provider] = {**stats, "pool_hit_ratio": round(stats["pool_hits"] / lookups, 3) if lookups else 0.0}
+            return result
+
+    def clear(self):
+        """Closes and forgets all pooled clients."""
+
+        with self._lock:
+            for client in self._clients.values():
+                close = getattr(client, "close", None)
+                if callable(close):
+                    try:
+                        result = close()
+                        if hasattr(result, "__await__") and hasattr(result, "close"):
+                            result.close()  # Async clients are closed with their event loop
+                    except Exception:
+                        pass
+            self._clients.clear()
+            self._stats.clear()
+
+client_pool = ClientPool()
+
+_event_loops = threading.local()
+
+def run_sync(coroutine):
+    """Runs a coroutine to completion on the calling thread's event loop.
+
+    The loop is created on first use and kept for the life of the thread, so
+    async clients pooled for it stay usable across calls.
+
+    Args:
+        coroutine: Coroutine to run
+
+    Returns:
+        The coroutine's result
+    """
+
+    import asyncio
+    loop = getattr(_event_loops, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _event_loops.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(coroutine)
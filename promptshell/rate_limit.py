@@ -0,0 +1,369 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+
+from contextlib import contextmanager
+from datetime import datetime
+
+from .setup import CONFIG_DIR
+
+try:
+    import fcntl  # Unix
+except ImportError:
+    fcntl = None
+    import msvcrt  # Windows
+
+RATE_LIMIT_DIR = os.path.join(CONFIG_DIR, "rate_limits")
+
+# Status codes worth retrying: timeouts, conflicts, rate limits, server errors and overload (529)
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+# Transport errors raised by requests, httpx (TransportError covers ConnectError, ReadError and the
+# other dropped connections) and the provider SDKs
+RETRYABLE_ERROR_NAMES = {
+    "ConnectionError", "ConnectTimeout", "ReadTimeout", "Timeout", "TimeoutException", "RemoteProtocolError",
+    "TransportError",
+    "APIConnectionError", "APITimeoutError", "ServiceUnavailable", "DeadlineExceeded", "ResourceExhausted",
+    "InternalServerError", "TooManyRequests",
+}
+
+class ProviderHTTPError(RuntimeError):
+    def __init__(self, message: str, status_code: int, headers: dict = None):
+        """Error response from a provider called over plain HTTP.
+
+        Args:
+            message: Error message
+            status_code: HTTP status code
+            headers: Response headers (optional)
+        """
+
+        super().__init__(message)
+        self.status_code = status_code
+        self.headers = dict(headers or {})
+
+def get_status_code(error: Exception):
+    """Extracts the HTTP status code from a provider error.
+
+    Args:
+        error: Exception raised by a provider call
+
+    Returns:
+        Status code, or None if the error carries none
+    """
+
+    for attribute in ("status_code", "code"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+def get_headers(error: Exception) -> dict:
+    """Extracts the response headers from a provider error, lower-cased."""
+
+    headers = getattr(error, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+    try:
+        return {str(key).lower(): str(value) for key, value in dict(headers or {}).items()}
+    except (TypeError, ValueError):
+        return {}
+
+def parse_duration(value: str):
+    """Parses a rate-limit reset duration such as "1.5", "20ms", "1s" or "6m0s".
+
+    Args:
+        value: Header value
+
+    Returns:
+        Seconds, or None if the value is not a duration
+    """
+
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not parts or "".join(number + unit for number, unit in parts) != value:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+def retry_after(error: Exception):
+    """Reads how long the provider asked us to wait before retrying.
+
+    Understands Retry-After (seconds or HTTP date), retry-after-ms, OpenAI and
+    Groq's x-ratelimit-reset-* durations and Anthropic's reset timestamps.
+
+    Args:
+        error: Exception raised by a provider call
+
+    Returns:
+        Seconds to wait, or None if the response gave no hint
+    """
+
+    headers = get_headers(error)
+    if "retry-after-ms" in headers:
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if "retry-after" in headers:
+        seconds = parse_duration(headers["retry-after"])
+        if seconds is not None:
+            return seconds
+        from email.utils import parsedate_to_datetime
+        try:
+            return max(parsedate_to_datetime(headers["retry-after"]).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            pass
+
+    waits = []
+    for name, value in headers.items():
+        if name.startswith("x-ratelimit-reset"):
+            seconds = parse_duration(value)
+        elif name.startswith("anthropic-ratelimit-") and name.endswith("-reset"):
+            try:
+                seconds = datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() - time.time()
+            except ValueError:
+                seconds = None
+        else:
+            continue
+        if seconds is not None:
+            waits.append(max(seconds, 0.0))
+    return max(waits) if waits else None
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 30.0):
+        """Retries transient provider errors with jittered exponential backoff.
+
+        Rate limits and server errors are retried, and delays requested by the
+        provider (Retry-After and rate-limit reset headers) take precedence over
+        the backoff schedule.
+
+        Args:
+            max_attempts: Total attempts including the first (default: 4)
+            base_delay: Backoff delay of the first retry in seconds (default: 0.5)
+            max_delay: Upper bound of any single delay in seconds (default: 30)
+        """
+
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """Checks whether an error is transient.
+
+        Args:
+            error: Exception raised by a provider call
+
+        Returns:
+            True for rate limits, server errors, timeouts and connection errors
+        """
+
+        status_code = get_status_code(error)
+        if status_code is not None:
+            return status_code in RETRYABLE_STATUS_CODES
+        return isinstance(error, (ConnectionError, TimeoutError)) or \
+            any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+    def delay(self, attempt: int, error: Exception) -> float:
+        """Computes the wait before the next attempt.
+
+        Args:
+            attempt: Number of attempts made so far (1 after the first failure)
+            error: Exception raised by the last attempt
+
+        Returns:
+            Seconds to wait
+        """
+
+        hinted = retry_after(error)
+        if hinted is not None:
+            # A little jitter keeps sessions told the same reset time from retrying in lockstep
+            return min(hinted, self.max_delay) + random.uniform(0, self.base_delay / 2)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def call(self, func, on_retry=None):
+        """Calls a function, retrying transient errors.
+
+        Args:
+            func: Zero-argument callable making the request
+            on_retry: Callable receiving (error, delay) before each retry (optional)
+
+        Returns:
+            Result of the first successful call
+
+        Raises:
+            Exception: The last error once attempts are exhausted or it is not retryable
+        """
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return func()
+            except Exception as e:
+                if attempt == self.max_attempts or not self.is_retryable(e):
+                    raise
+                wait = self.delay(attempt, e)
+                if on_retry is not None:
+                    on_retry(e, wait)
+                time.sleep(wait)
+
+    async def acall(self, func, on_retry=None):
+        """Async version of call().
+
+        Args:
+            func: Zero-argument coroutine function making the request
+            on_retry: Callable receiving (error, delay) before each retry (optional)
+
+        Returns:
+            Result of the first successful call
+        """
+
+        import asyncio
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return await func()
+            except Exception as e:
+                if attempt == self.max_attempts or not self.is_retryable(e):
+                    raise
+                wait = self.delay(attempt, e)
+                if on_retry is not None:
+                    on_retry(e, wait)
+                await asyncio.sleep(wait)
+
+class TokenBucket:
+    def __init__(self, key: str, requests_per_minute: float, burst: float = None, directory: str = None):
+        """Client-side request rate limiter shared by all processes using one API key.
+
+        The bucket state lives in a small JSON file guarded by a lock file, so
+        concurrent sessions draw from the same budget.
+
+        Args:
+            key: Limiter identity, e.g. provider and API key (hashed before use)
+            requests_per_minute: Sustained request rate
+            burst: Bucket capacity (default: a tenth of a minute's budget, at least 1)
+            directory: State directory (default: CONFIG_DIR/rate_limits)
+        """
+
+        self.rate = requests_per_minute / 60.0
+        self.capacity = burst if burst is not None else max(requests_per_minute / 10.0, 1.0)
+        directory = directory or RATE_LIMIT_DIR
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+        self.state_file = os.path.join(directory, f"{digest}.json")
+        self.lock_file = os.path.join(directory, f"{digest}.lock")
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        """Holds the cross-process lock for the bucket."""
+
+        with self._thread_lock, open(self.lock_file, "a+") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+                else:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _read(self, now: float) -> dict:
+        try:
+            with open(self.state_file, "r") as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return {"tokens": self.capacity, "updated": now}
+        elapsed = max(now - state.get("updated", now), 0.0)
+        return {"tokens": min(self.capacity, state.get("tokens", self.capacity) + elapsed * self.rate), "updated": now}
+
+    def _write(self, state: dict):
+        with open(self.state_file, "w") as file:
+            json.dump(state, file)
+
+    def try_acquire(self) -> float:
+        """Takes one request from the bucket if one is available.
+
+        Returns:
+            0 if a request was taken, otherwise seconds until one will be available
+        """
+
+        with self._locked():
+            now = time.time()
+            state = self._read(now)
+            if state["tokens"] >= 1:
+                state["tokens"] -= 1
+                self._write(state)
+                return 0.0
+            self._write(state)
+            return (1 - state["tokens"]) / self.rate
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Waits without blocking the event loop until a request may be sent."""
+
+        import asyncio
+
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Empties the bucket for a while, e.g. after the provider returned 429.
+
+        Every process sharing the key then waits instead of retrying into the
+        same limit.
+
+        Args:
+            seconds: How long no requests should be sent
+        """
+
+        with self._locked():
+            now = time.time()
+            state = self._read(now)
+            state["tokens"] = min(state["tokens"], 1 - seconds * self.rate)
+            self._write(state)
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def get_token_bucket(key: str, requests_per_minute: float) -> TokenBucket:
+    """Gets the token bucket for a key, creating it on first use.
+
+    Args:
+        key: Limiter identity, e.g. provider and API key
+        requests_per_minute: Sustained request rate
+
+    Returns:
+        TokenBucket
+    """
+
+    with _buckets_lock:
+        bucket = _buckets.get((key, requests_per_minute, RATE_LIMIT_DIR))
+        if bucket is None:
+            bucket = _buckets[(key, requests_per_minute, RATE_LIMIT_DIR)] = TokenBucket(key, requests_per_minute)
+        return bucket
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from typing import Optional
+
+from .setup import CONFIG_DIR
+
+CACHE_FILE = os.path.join(CONFIG_DIR, "response_cache.sqlite3")
+
+class ResponseCache:
+    def __init__(self, path: str = None, max_entries: int = 500, ttl: float = 7 * 24 * 3600):
+        """On-disk cache of natural-language to command translations.
+
+        Entries expire after `ttl` seconds and the least recently used ones are
+        evicted once the cache holds more than `max_entries`.
+
+        Args:
+            path: SQLite database file (default: CONFIG_DIR/response_cache.sqlite3)
+            max_entries: Maximum number of cached translations (default: 500)
+            ttl: Entry lifetime in seconds (default: 7 days)
+        """
+
+        self.path = path or CACHE_FILE
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, request TEXT, response TEXT, created REAL, last_used REAL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def normalize(request: str) -> str:
+        """Normalizes a request so trivially different phrasings share an entry.
+
+        Args:
+            request: Natural-language request
+
+        Returns:
+            Lower-cased request with collapsed whitespace and no trailing punctuation
+        """
+
+        return re.sub(r"\s+", " ", request).strip().lower().rstrip(".!")
+
+    @staticmethod
+    def cwd_fingerprint(path: str) -> str:
+        """Fingerprints a working directory.
+
+        The directory mtime changes when entries are added or removed, so a
+        translation that referred to files there is not reused after they change.
+
+        Args:
+            path: Directory path
+
+        Returns:
+            Fingerprint string
+        """
+
+        try:
+            return f"{path}:{os.stat(path).st_mtime_ns}"
+        except OSError:
+            return path
+
+    def make_key(self, request: str, os_name: str, model: str, provider: str, cwd: str) -> str:
+        """Builds the cache key for a translation.
+
+        Args:
+            request: Natural-language request
+            os_name: Current operating system
+            model: Model name
+            provider: Provider name
+            cwd: Current working directory
+
+        Returns:
+            Hex digest identifying the translation context
+        """
+
+        payload = json.dumps([self.normalize(request), os_name, model, provider, self.cwd_fingerprint(cwd)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Looks up a cached translation.
+
+        Args:
+            key: Cache key from make_key()
+
+        Returns:
+            Cached command, or None on a miss
+        """
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created >= ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, request: str, response: str):
+        """Stores a translation and evicts expired and least recently used entries.
+
+        Args:
+            key: Cache key from make_key()
+            request: Natural-language request
+            response: Generated command
+        """
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, request, response, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, request, response, now, now),
+            )
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key NOT IN "
+                "(SELECT key FROM responses ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self):
+        """Removes all cached translations."""
+
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """Gets cache counters for this session.
+
+        Returns:
+            Dictionary with hits, misses, hit_rate and entries
+        """
+
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+        }
@@ -0,0 +1,273 @@
+import math
+import re
+import sqlite3
+import threading
+import time
+
+from collections import Counter, defaultdict
+from typing import Optional, Tuple
+
+from . import response_cache
+from .response_cache import ResponseCache
+
+# Words that carry no intent, and common synonyms folded onto one spelling
+STOPWORDS = frozenset(
+    "a an the all my me of in on at here there this that these those which what whats are is be to for with "
+    "please some any can could you i do does how".split()
+)
+SYNONYMS = {
+    "show": "list", "display": "list", "print": "list", "view": "list", "get": "list", "find": "list",
+    "big": "large", "huge": "large", "bigger": "larger", "biggest": "largest",
+    "remove": "delete", "erase": "delete", "rm": "delete",
+    "folder": "directory", "folders": "directories", "dir": "directory", "dirs": "directories",
+    "file": "files", "make": "create", "mkdir": "create", "cp": "copy", "mv": "move", "terminate": "kill",
+    "launch": "start", "grep": "search", "unzip": "extract", "zip": "compress",
+}
+
+# Verbs naming what a request does; a request without one asks to list something
+ACTION_VERBS = frozenset(
+    "list delete create copy move rename compress decompress extract install uninstall update upgrade kill stop "
+    "start restart turn enable disable mount unmount download upload open close edit change set count sort search "
+    "replace clone commit push pull run execute build backup restore archive chmod chown connect disconnect add "
+    "check clean clear empty truncate merge split convert send ping save write append touch link shutdown reboot".split()
+)
+
+# Switch words, folded onto on/off; they flip what a command does, so they must match like arguments
+SWITCH_WORDS = {"on": "on", "enable": "on", "enabled": "on", "off": "off", "disable": "off", "disabled": "off"}
+
+QUOTED = re.compile(r"""(?:^|\s)(['"])(.+?)\1(?=\s|$)""")
+
+def content_words(text: str) -> list:
+    """Splits a request into its intent-bearing words.
+
+    Args:
+        text: Request text
+
+    Returns:
+        Lower-cased words with synonyms folded and stopwords removed
+    """
+
+    words = (SYNONYMS.get(word, word) for word in re.findall(r"[\w./~\\-]+", ResponseCache.normalize(text)))
+    return [word for word in words if word not in STOPWORDS]
+
+def action_verb(words: list) -> str:
+    """Gets the action of a request.
+
+    Args:
+        words: Content words of the request
+
+    Returns:
+        First action verb, with synonyms folded, or "list" if there is none
+    """
+
+    return next((word for word in words if word in ACTION_VERBS), "list")
+
+def argument_tokens(text: str) -> frozenset:
+    """Collects the parts of a request that end up as command arguments.
+
+    Numbers, paths, file names, quoted strings and on/off switches must match
+    exactly for two requests to share a command, however similar the rest of
+    the wording is.
+
+    Args:
+        text: Request text
+
+    Returns:
+        Set of argument tokens
+    """
+
+    tokens = {match.group(2) for match in QUOTED.finditer(text)}
+    for token in QUOTED.sub(" ", text).split():
+        token = token.strip(",;:!?()").rstrip(".")
+        if any(char.isdigit() or char in "/\\._~" for char in token):
+            tokens.add(token)
+        elif token.lower() in SWITCH_WORDS:
+            tokens.add(SWITCH_WORDS[token.lower()])
+    return frozenset(tokens)
+
+def opposite_words(first: list, second: list) -> bool:
+    """Checks whether two requests differ by a prefixed variant of a word.
+
+    Such pairs are usually opposites (compress / decompress, mount / unmount)
+    and score high on shared n-grams.
+
+    Args:
+        first: Content words of one request
+        second: Content words of the other request
+
+    Returns:
+        True if a word of one request ends with a different word of the other
+    """
+
+    only_first = set(first) - set(second)
+    only_second = set(second) - set(first)
+    return any(
+        min(len(a), len(b)) >= 3 and (a.endswith(b) or b.endswith(a))
+        for a in only_first for b in only_second
+    )
+
+def ngram_vector(text: str, n: int = 3) -> dict:
+    """Builds an L2-normalized character n-gram vector.
+
+    Words are padded with spaces so n-grams at word boundaries count too, and
+    whole words are added as features so shared vocabulary weighs more than
+    shared fragments. Only content words count, with synonyms folded, so
+    "show big files" and "list large files here" get the same vector.
+
+    Args:
+        text: Request text
+        n: N-gram length (default: 3)
+
+    Returns:
+        Dictionary mapping feature to weight
+    """
+
+    counts = Counter()
+    for word in content_words(text):
+        padded = f" {word} "
+        counts.update(padded[i:i + n] for i in range(max(len(padded) - n + 1, 1)))
+        counts[f"w:{word}"] += 4
+    norm = math.sqrt(sum(value * value for value in counts.values()))
+    return {feature: value / norm for feature, value in counts.items()} if norm else {}
+
+class SemanticCache:
+    def __init__(self, path: str = None, threshold: float = 0.8, max_entries: int = 1000):
+        """Similarity cache of accepted translations.
+
+        Past requests are indexed by character n-gram vectors in an inverted
+        index, so a lookup scores all candidates with one sparse dot product
+        pass over the postings of the query's features. A match also needs the
+        same action verb, the same argument tokens (numbers, paths, file names,
+        quoted strings, on/off switches) and no opposite words, since those
+        change the command but barely the score.
+
+        Args:
+            path: SQLite database file (default: the response cache database)
+            threshold: Minimum cosine similarity for a match (default: 0.8)
+            max_entries: Number of most recent translations kept (default: 1000)
+        """
+
+        self.path = path or response_cache.CACHE_FILE
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS accepted_commands ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, request TEXT, command TEXT, os TEXT, cwd TEXT, created REAL)"
+        )
+        self._conn.commit()
+        self._entries = {}
+        self._postings = defaultdict(list)
+        self._load()
+
+    def _load(self):
+        """Loads the most recent translations into the in-memory index."""
+
+        rows = self._conn.execute(
+            "SELECT id, request, command, os, cwd FROM accepted_commands ORDER BY id DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for row in reversed(rows):
+            self._index(*row)
+
+    def _index(self, entry_id: int, request: str, command: str, os_name: str, cwd: str):
+        """Adds one translation to the in-memory index."""
+
+        self._entries[entry_id] = (request, command, os_name, cwd)
+        for feature, weight in ngram_vector(request).items():
+            self._postings[feature].append((entry_id, weight))
+
+    def lookup(self, request: str, os_name: str, cwd: str) -> Optional[Tuple[str, float, str]]:
+        """Finds the most similar past translation made in the same context.
+
+        Args:
+            request: Natural-language request
+            os_name: Current operating system
+            cwd: Current working directory
+
+        Returns:
+            Tuple of (command, similarity, original request), or None below the threshold
+        """
+
+        with self._lock:
+            scores = defaultdict(float)
+            for feature, weight in ngram_vector(request).items():
+                for entry_id, entry_weight in self._postings.get(feature, ()):
+                    scores[entry_id] += weight * entry_weight
+
+            best = None
+            arguments = argument_tokens(request)
+            words = content_words(request)
+            verb = action_verb(words)
+            for entry_id, score in scores.items():
+                if score < self.threshold or (best is not None and score <= best[1]):
+                    continue
+                original, command, entry_os, entry_cwd = self._entries[entry_id]
+                if entry_os != os_name or entry_cwd != cwd:
+                    continue
+                original_words = content_words(original)
+                if argument_tokens(original) != arguments or action_verb(original_words) != verb \
+                        or opposite_words(words, original_words):
+                    continue
+                best = (command, score, original)
+
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return best[0], round(best[1], 3), best[2]
+
+    def add(self, request: str, command: str, os_name: str, cwd: str):
+        """Records an accepted translation.
+
+        Args:
+            request: Natural-language request
+            command: Accepted command
+            os_name: Current operating system
+            cwd: Current working directory
+        """
+
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO accepted_commands (request, command, os, cwd, created) VALUES (?, ?, ?, ?, ?)",
+                (request, command, os_name, cwd, time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM accepted_commands WHERE id NOT IN "
+                "(SELECT id FROM accepted_commands ORDER BY id DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+            self._index(cursor.lastrowid, request, command, os_name, cwd)
+            if len(self._entries) > self.max_entries:
+                self._evict_oldest()
+
+    def _evict_oldest(self):
+        """Drops the oldest entries from the in-memory index."""
+
+        keep = set(sorted(self._entries)[-self.max_entries:])
+        self._entries = {entry_id: entry for entry_id, entry in self._entries.items() if entry_id in keep}
+        for feature in list(self._postings):
+            postings = [posting for posting in self._postings[feature] if posting[0] in keep]
+            if postings:
+                self._postings[feature] = postings
+            else:
+                del self._postings[feature]
+
+    def stats(self) -> dict:
+        """Gets lookup counters for this session.
+
+        Returns:
+            Dictionary with hits, misses, hit_rate and entries
+        """
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+        }
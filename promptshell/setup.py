@@ -1,8 +1,11 @@
 import questionary
-import requests
 import os
+import re
+
+from collections.abc import Mapping
 
 from .format_utils import text_theme, reset_format
+from .providers import ollama_base_url
 
 # Determine the configuration directory based on the operating system
 if os.name == 'nt':  # Windows
@@ -16,6 +19,31 @@ os.makedirs(CONFIG_DIR, exist_ok=True)
 CONFIG_FILE = os.path.join(CONFIG_DIR, "promptshell_config.conf")
 warning_printed = False  # Global variable to track if the warning has been printed
 
+API_PROVIDER_MODELS = {
+    "Groq": ['llama-3.1-8b-instant', 'deepseek-r1-distill-llama-70b', 'gemma2-9b-it', 'llama-3.3-70b-versatile', 'llama3-70b-8192', 'llama3-8b-8192', 'mixtral-8x7b-32768'],
+    "OpenAI": ['gpt-4o', 'chatgpt-4o-latest', 'o1', 'o1-mini', 'o1-preview', 'gpt-4o-2024-08-06', 'gpt-4o-mini-2024-07-18', 'gpt-4-turbo', 'gpt-3.5-turbo'],
+    "Google": ["gemini-2.0-flash", "gemini-2.0-flash-lite", "gemini-1.5-flash", "gemini-1.5-flash-8b", "gemini-1.5-pro"],
+    "Anthropic": ['claude-3-5-sonnet-20241022', 'claude-3-opus-20240229', 'claude-3-sonnet-20240229'],
+    "Fireworks": ["mixtral-8x7b-instruct", "llama-v3p3-70b-instruct", "llama-v3p1-8b-instruct", "llama-v3p1-405b-instruct", "deepseek-v3"],
+    "OpenRouter": ["google/gemini-2.0-flash-thinking-exp:free"],
+    "Deepseek": ["deepseek-chat"]
+}
+
+def default_api_model(provider: str) -> str:
+    """Gets the model the setup wizard suggests first for an API provider.
+
+    Args:
+        provider: Provider name (e.g. "groq")
+
+    Returns:
+        Model name, or "" for providers without a suggested model
+    """
+
+    for name, models in API_PROVIDER_MODELS.items():
+        if name.lower() == provider.lower():
+            return models[0] if models else ""
+    return ""
+
 def setup_wizard():
     """Interactive configuration setup wizard."""
 
@@ -36,25 +64,17 @@ def setup_wizard():
     operation_mode = operation_mode.split()[0]  # Extract "local" or "api"
 
     # Default values
-    ollama_host = "http://localhost:11434"
+    ollama_host = config.get("OLLAMA_HOST") or "http://localhost:11434"
     local_model = "llama3:8b-instruct-q4_1"
     api_provider = None
     api_model = None
 
-    API_PROVIDER_MODELS = {
-        "Groq": ['llama-3.1-8b-instant', 'deepseek-r1-distill-llama-70b', 'gemma2-9b-it', 'llama-3.3-70b-versatile', 'llama3-70b-8192', 'llama3-8b-8192', 'mixtral-8x7b-32768'],
-        "OpenAI": ['gpt-4o', 'chatgpt-4o-latest', 'o1', 'o1-mini', 'o1-preview', 'gpt-4o-2024-08-06', 'gpt-4o-mini-2024-07-18', 'gpt-4-turbo', 'gpt-3.5-turbo'],
-        "Google": ["gemini-2.0-flash", "gemini-2.0-flash-lite", "gemini-1.5-flash", "gemini-1.5-flash-8b", "gemini-1.5-pro"],
-        "Anthropic": ['claude-3-5-sonnet-20241022', 'claude-3-opus-20240229', 'claude-3-sonnet-20240229'],
-        "Fireworks": ["mixtral-8x7b-instruct", "llama-v3p3-70b-instruct", "llama-v3p1-8b-instruct", "llama-v3p1-405b-instruct", "deepseek-v3"],
-        "OpenRouter": ["google/gemini-2.0-flash-thinking-exp:free"],
-        "Deepseek": ["deepseek-chat"]
-    }
-
     def get_installed_models():
         """Fetch installed models from local Ollama server"""
+        import requests
+
         try:
-            response = requests.get(f"{ollama_host}/api/tags")
+            response = requests.get(f"{ollama_base_url(ollama_host)}/api/tags")
             response.raise_for_status()
             models = [model["name"] for model in response.json().get("models", [])]
             
@@ -174,11 +194,26 @@ def setup_wizard():
 # Operation Mode (local/api)
 MODE={config["MODE"]}
 OLLAMA_HOST={config["OLLAMA_HOST"]}
+# How long Ollama keeps the model in memory between turns (e.g. 30m, -1 for forever)
+OLLAMA_KEEP_ALIVE={config.get("OLLAMA_KEEP_ALIVE", "30m")}
+# Ollama context size in tokens, or auto to size it from the prompt
+OLLAMA_NUM_CTX={config.get("OLLAMA_NUM_CTX", "auto")}
 # Local Configuration
 LOCAL_MODEL={config["LOCAL_MODEL"]}
 # API Configuration
 ACTIVE_API_PROVIDER={config["ACTIVE_API_PROVIDER"]}
 API_MODEL={config["API_MODEL"]}
+# Per-role provider and model (empty uses the active ones), e.g. a small fast model for the Command Executor
+ROLE_COMMAND_EXECUTOR_PROVIDER={config.get("ROLE_COMMAND_EXECUTOR_PROVIDER", "")}
+ROLE_COMMAND_EXECUTOR_MODEL={config.get("ROLE_COMMAND_EXECUTOR_MODEL", "")}
+ROLE_ERROR_HANDLER_PROVIDER={config.get("ROLE_ERROR_HANDLER_PROVIDER", "")}
+ROLE_ERROR_HANDLER_MODEL={config.get("ROLE_ERROR_HANDLER_MODEL", "")}
+ROLE_DEBUGGER_PROVIDER={config.get("ROLE_DEBUGGER_PROVIDER", "")}
+ROLE_DEBUGGER_MODEL={config.get("ROLE_DEBUGGER_MODEL", "")}
+ROLE_QUESTION_ANSWERER_PROVIDER={config.get("ROLE_QUESTION_ANSWERER_PROVIDER", "")}
+ROLE_QUESTION_ANSWERER_MODEL={config.get("ROLE_QUESTION_ANSWERER_MODEL", "")}
+# Endpoints can be overridden with <PROVIDER>_BASE_URL, e.g. OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+# for the offline test server (python -m promptshell.fake_llm_server)
 # Provider API Keys (only set for your active provider)
 GROQ_API_KEY={config.get("GROQ_API_KEY", "")}
 OPENAI_API_KEY={config.get("OPENAI_API_KEY", "")}
@@ -187,24 +222,179 @@ ANTHROPIC_API_KEY={config.get("ANTHROPIC_API_KEY", "")}
 FIREWORKS_API_KEY={config.get("FIREWORKS_API_KEY", "")}
 OPENROUTER_API_KEY={config.get("OPENROUTER_API_KEY", "")}
 DEEPSEEK_API_KEY={config.get("DEEPSEEK_API_KEY", "")}
+# Response Settings
+# Print answers and debugging suggestions token by token (true/false)
+STREAM_RESPONSES={config.get("STREAM_RESPONSES", "true")}
+# Reuse accepted translations of repeated requests (prefix a request with --fresh to bypass)
+RESPONSE_CACHE={config.get("RESPONSE_CACHE", "true")}
+RESPONSE_CACHE_TTL={config.get("RESPONSE_CACHE_TTL", "604800")}
+RESPONSE_CACHE_SIZE={config.get("RESPONSE_CACHE_SIZE", "500")}
+SEMANTIC_CACHE={config.get("SEMANTIC_CACHE", "true")}
+SEMANTIC_CACHE_THRESHOLD={config.get("SEMANTIC_CACHE_THRESHOLD", "0.8")}
+# Token budget of each role's conversation history; older turns are summarized
+CONTEXT_TOKEN_BUDGET={config.get("CONTEXT_TOKEN_BUDGET", "2048")}
+# Token budget of a whole prompt; file and clipboard content is truncated to fit
+PROMPT_TOKEN_BUDGET={config.get("PROMPT_TOKEN_BUDGET", "8192")}
+# Mark the role definitions for provider prompt caching (Anthropic cache breakpoints, OpenAI cache keys)
+PROMPT_CACHE={config.get("PROMPT_CACHE", "false")}
+# Hedging: resend slow requests to a second provider (leave HEDGE_PROVIDER empty to disable)
+HEDGE_PROVIDER={config.get("HEDGE_PROVIDER", "")}
+HEDGE_MODEL={config.get("HEDGE_MODEL", "")}
+# Send the hedge once the primary is slower than this percentile of its recent calls
+HEDGE_PERCENTILE={config.get("HEDGE_PERCENTILE", "95")}
+HEDGE_DELAY={config.get("HEDGE_DELAY", "2.0")}
+# Failover on connection errors, timeouts, rate limits and server errors: comma-separated provider:model pairs,
+# then the local Ollama model if FALLBACK_TO_LOCAL is true
+FALLBACK_PROVIDERS={config.get("FALLBACK_PROVIDERS", "")}
+FALLBACK_TO_LOCAL={config.get("FALLBACK_TO_LOCAL", "false")}
+# Retries of rate-limited and failed requests, and an optional client-side limit in requests per minute
+# (0 disables it; <PROVIDER>_RATE_LIMIT_RPM, e.g. OPENAI_RATE_LIMIT_RPM, overrides it per provider)
+RETRY_MAX_ATTEMPTS={config.get("RETRY_MAX_ATTEMPTS", "4")}
+RETRY_MAX_DELAY={config.get("RETRY_MAX_DELAY", "30")}
+RATE_LIMIT_RPM={config.get("RATE_LIMIT_RPM", "0")}
+# Requests translated at the same time by promptshell --batch
+BATCH_CONCURRENCY={config.get("BATCH_CONCURRENCY", "4")}
+# Record latency and tokens of every provider call locally for --stats (true/false)
+TELEMETRY={config.get("TELEMETRY", "true")}
+# Record provider traffic to a cassette, or replay it offline instead of calling the provider (off/record/replay).
+# CASSETTE_PATH defaults to cassettes/session.jsonl in the config directory; CASSETTE_TIME_SCALE scales the
+# replayed timing (1 = as recorded, 0 = instant)
+CASSETTE_MODE={config.get("CASSETTE_MODE", "off")}
+CASSETTE_PATH={config.get("CASSETTE_PATH", "")}
+CASSETTE_TIME_SCALE={config.get("CASSETTE_TIME_SCALE", "1.0")}
 """
+    # Keep settings the template does not list, e.g. <PROVIDER>_BASE_URL or <PROVIDER>_RATE_LIMIT_RPM overrides
+    template_keys = set(re.findall(r"^([A-Z0-9_]+)=", config_content, re.MULTILINE))
+    other_settings = [f"{key}={value}" for key, value in config.items() if key not in template_keys]
+    if other_settings:
+        config_content += "# Other settings\n" + "\n".join(other_settings) + "\n"
 
     with open(CONFIG_FILE, "w") as file:
         file.write(config_content)
+    invalidate_config_cache()
 
     print(text_theme("success", bg="black") + f"\n✅ Configuration updated! Saved to {CONFIG_FILE}" + reset_format())
     print(text_theme("info") + f"Active model: {get_active_model()}" + reset_format())
 
+class ConfigSnapshot(Mapping):
+    def __init__(self, values: dict, signature: tuple = None):
+        """Immutable view of the configuration file at one point in time.
+
+        Args:
+            values: Parsed configuration values
+            signature: (mtime_ns, size) of the file that was parsed, None if missing
+        """
+
+        self._values = dict(values)
+        self.signature = signature
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return f"ConfigSnapshot(mode={self.mode!r}, provider={self.provider!r}, model={self.active_model!r})"
+
+    @property
+    def mode(self) -> str:
+        return self._values["MODE"]
+
+    @property
+    def active_model(self) -> str:
+        return get_active_model(self)
+
+    @property
+    def provider(self) -> str:
+        return get_provider(self)
+
+_config_snapshot = None  # Last parsed configuration, reused while the file is unchanged
+
+def _config_signature():
+    """Returns the (mtime_ns, size) of the configuration file, or None if it is missing."""
+
+    try:
+        stat = os.stat(CONFIG_FILE)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def get_config_snapshot() -> ConfigSnapshot:
+    """Gets the current configuration snapshot.
+
+    The file is only re-read when its mtime or size changed since the last
+    snapshot was taken, so this is cheap enough to call on every prompt.
+
+    Returns:
+        ConfigSnapshot of the configuration file
+    """
+
+    global _config_snapshot
+
+    signature = _config_signature()
+    if _config_snapshot is None or _config_snapshot.signature != signature:
+        _config_snapshot = ConfigSnapshot(_read_config(), signature)
+    return _config_snapshot
+
+def invalidate_config_cache():
+    """Forces the next get_config_snapshot() call to re-read the file."""
+
+    global _config_snapshot
+    _config_snapshot = None
+
 def load_config():
     """
     Loads the configuration file into a dictionary.
     Returns default values if the file is missing or incomplete.
     """
+
+    return dict(get_config_snapshot())
+
+def _read_config():
+    """Parses the configuration file, filling in defaults for missing keys."""
+
     global warning_printed  
 
     config = {
         "MODE": "local",
         "OLLAMA_HOST": "http://localhost:11434",
+        "OLLAMA_KEEP_ALIVE": "30m",
+        "OLLAMA_NUM_CTX": "auto",
+        "STREAM_RESPONSES": "true",
+        "RESPONSE_CACHE": "true",
+        "RESPONSE_CACHE_TTL": "604800",
+        "RESPONSE_CACHE_SIZE": "500",
+        "SEMANTIC_CACHE": "true",
+        "SEMANTIC_CACHE_THRESHOLD": "0.8",
+        "CONTEXT_TOKEN_BUDGET": "2048",
+        "PROMPT_TOKEN_BUDGET": "8192",
+        "PROMPT_CACHE": "false",
+        "HEDGE_PROVIDER": "",
+        "HEDGE_MODEL": "",
+        "HEDGE_PERCENTILE": "95",
+        "HEDGE_DELAY": "2.0",
+        "FALLBACK_PROVIDERS": "",
+        "FALLBACK_TO_LOCAL": "false",
+        "RETRY_MAX_ATTEMPTS": "4",
+        "RETRY_MAX_DELAY": "30",
+        "RATE_LIMIT_RPM": "0",
+        "BATCH_CONCURRENCY": "4",
+        "TELEMETRY": "true",
+        "CASSETTE_MODE": "off",
+        "CASSETTE_PATH": "",
+        "CASSETTE_TIME_SCALE": "1.0",
+        "ROLE_COMMAND_EXECUTOR_PROVIDER": "",
+        "ROLE_COMMAND_EXECUTOR_MODEL": "",
+        "ROLE_ERROR_HANDLER_PROVIDER": "",
+        "ROLE_ERROR_HANDLER_MODEL": "",
+        "ROLE_DEBUGGER_PROVIDER": "",
+        "ROLE_DEBUGGER_MODEL": "",
+        "ROLE_QUESTION_ANSWERER_PROVIDER": "",
+        "ROLE_QUESTION_ANSWERER_MODEL": "",
         "LOCAL_MODEL": "llama3:8b-instruct-q4_1",
         "ACTIVE_API_PROVIDER": "groq",
         "API_MODEL": "mixtral-8x7b-32768",
@@ -238,7 +428,41 @@ def load_config():
 
     return config
 
-def get_active_model():
+def config_flag(config: Mapping, key: str, default: bool = False) -> bool:
+    """Reads a boolean setting.
+
+    Args:
+        config: Configuration to read
+        key: Setting name
+        default: Value used when the setting is missing or empty
+
+    Returns:
+        True for "true", "yes", "on" or "1" (case-insensitive), False otherwise
+    """
+
+    value = str(config.get(key, "")).strip().lower()
+    if not value:
+        return default
+    return value in ("true", "yes", "on", "1")
+
+def config_number(config: Mapping, key: str, default: float) -> float:
+    """Reads a numeric setting.
+
+    Args:
+        config: Configuration to read
+        key: Setting name
+        default: Value used when the setting is missing or not a number
+
+    Returns:
+        Setting value as a float
+    """
+
+    try:
+        return float(str(config.get(key, "")).strip())
+    except ValueError:
+        return default
+
+def get_active_model(config: Mapping = None):
     """
     Gets active AI model name based on the operation mode.
 
@@ -246,21 +470,26 @@ def get_active_model():
     Uses 'LOCAL_MODEL' if in local mode, otherwise 'API_MODEL'.
     """
     
-    config = load_config()
+    if config is None:
+        config = get_config_snapshot()
 
     if config["MODE"] == "local":
         return config["LOCAL_MODEL"]
     else:
         return config["API_MODEL"]
 
-def get_provider():
+def get_provider(config: Mapping = None):
     """Gets current AI provider.
     
+    Args:
+        config: Configuration to read (default: current snapshot)
+
     Returns:
         Provider name string
     """
 
-    config = load_config()
+    if config is None:
+        config = get_config_snapshot()
     if config["MODE"] == "api":
         return config["ACTIVE_API_PROVIDER"]
     else:
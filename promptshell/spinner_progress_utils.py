@@ -84,6 +84,42 @@ def spinner(spinner_type="dots", message=" [cyan]Working..."):
         return wrapper
     return decorator
 
+def spinner_until_first(iterable, spinner_type="dots", message=" [cyan]Working..."):
+    """Shows a spinner until an iterable produces its first item.
+
+    Meant for streamed responses: the spinner covers the wait for the first
+    token and is removed before anything is printed.
+    
+    Args:
+        iterable: Source of items (e.g. streamed response chunks)
+        spinner_type: Spinner style
+        message: Display message
+        
+    Yields:
+        Items from the iterable
+    """
+
+    iterator = iter(iterable)
+    console = Console()
+    chosen_spinner = (
+        random.choice(list(SPINNERS.keys()))
+        if spinner_type == "random"
+        else spinner_type
+    )
+    try:
+        with console.status(f"{message}", spinner=chosen_spinner):
+            try:
+                first = next(iterator)
+            except StopIteration:
+                return
+        yield first
+        yield from iterator
+    finally:
+        # Make sure an abandoned stream releases its connection
+        close = getattr(iterator, "close", None)
+        if callable(close):
+            close()
+
 #--------PROGRESS BAR-------
 def progress_bar(description="Downloading..."):
     """Decorator for progress bars.
@@ -0,0 +1,124 @@
+import json
+import sys
+import time
+import tracemalloc
+
+from contextlib import contextmanager
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+def get_peak_rss_kib():
+    """Gets the peak resident set size of the process.
+
+    Returns:
+        Peak RSS in KiB, or None where it is not available (Windows)
+    """
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports KiB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+class StartupProfiler:
+    def __init__(self):
+        """Collects wall time and memory usage for named startup phases."""
+
+        self.phases = []
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def add_phase(self, name: str, seconds: float, allocated_kib: float = None, peak_kib: float = None):
+        """Records a phase that was measured outside the profiler.
+
+        Args:
+            name: Phase name
+            seconds: Wall time in seconds
+            allocated_kib: Net Python allocations in KiB (optional)
+            peak_kib: Peak Python allocations in KiB (optional)
+        """
+
+        self.phases.append({
+            "name": name,
+            "wall_ms": round(seconds * 1000, 3),
+            "allocated_kib": None if allocated_kib is None else round(allocated_kib, 1),
+            "peak_kib": None if peak_kib is None else round(peak_kib, 1),
+            "rss_kib": get_peak_rss_kib(),
+        })
+
+    @contextmanager
+    def phase(self, name: str):
+        """Measures the wall time and memory of the enclosed block.
+
+        Args:
+            name: Phase name
+        """
+
+        tracemalloc.reset_peak()
+        allocated_before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            allocated_after, peak = tracemalloc.get_traced_memory()
+            self.add_phase(
+                name,
+                elapsed,
+                allocated_kib=(allocated_after - allocated_before) / 1024,
+                peak_kib=max(peak - allocated_before, 0) / 1024,
+            )
+
+    def total_ms(self) -> float:
+        """Returns the summed wall time of all phases in milliseconds."""
+
+        return round(sum(phase["wall_ms"] for phase in self.phases), 3)
+
+    def to_dict(self, metadata: dict = None) -> dict:
+        """Returns the collected phases as a JSON-serialisable dictionary.
+
+        Args:
+            metadata: Extra top-level fields, e.g. the version (optional)
+        """
+
+        return {**(metadata or {}), "phases": self.phases, "total_ms": self.total_ms()}
+
+    def to_json(self, metadata: dict = None) -> str:
+        """Returns the collected phases as a JSON document.
+
+        Args:
+            metadata: Extra top-level fields, e.g. the version (optional)
+        """
+
+        return json.dumps(self.to_dict(metadata), indent=2)
+
+    def report(self) -> str:
+        """Formats the collected phases as a table.
+
+        Returns:
+            Human-readable report
+        """
+
+        def cell(value, fmt):
+            return "-" if value is None else format(value, fmt)
+
+        name_width = max([len(phase["name"]) for phase in self.phases] + [len("Total")]) + 2
+        lines = [
+            f"{'Phase':<{name_width}}{'Wall (ms)':>11}{'Alloc (KiB)':>13}{'Peak (KiB)':>12}{'RSS (MiB)':>11}",
+            "-" * (name_width + 47),
+        ]
+        for phase in self.phases:
+            rss_mib = None if phase["rss_kib"] is None else phase["rss_kib"] / 1024
+            lines.append(
+                f"{phase['name']:<{name_width}}"
+                f"{cell(phase['wall_ms'], '.1f'):>11}"
+                f"{cell(phase['allocated_kib'], '.1f'):>13}"
+                f"{cell(phase['peak_kib'], '.1f'):>12}"
+                f"{cell(rss_mib, '.1f'):>11}"
+            )
+        lines.append("-" * (name_width + 47))
+        lines.append(f"{'Total':<{name_width}}{self.total_ms():>11.1f}")
+        return "\n".join(lines)
@@ -0,0 +1,218 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from .setup import CONFIG_DIR
+
+TELEMETRY_FILE = os.path.join(CONFIG_DIR, "telemetry.sqlite3")
+
+WINDOW_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+def parse_window(text: str):
+    """Parses a time window such as "30m", "24h", "7d", "2w" or "all".
+
+    Args:
+        text: Window text
+
+    Returns:
+        Window length in seconds, or None for "all"
+
+    Raises:
+        ValueError: If the text is not a window
+    """
+
+    text = text.strip().lower()
+    if text == "all":
+        return None
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([mhdw])", text)
+    if not match:
+        raise ValueError(f"Invalid time window '{text}' (use e.g. 30m, 24h, 7d, 2w or all)")
+    return float(match.group(1)) * WINDOW_UNITS[match.group(2)]
+
+def percentile(sorted_values: list, percent: float) -> float:
+    """Gets a percentile of sorted values by the nearest-rank method."""
+
+    index = max(int(-(-len(sorted_values) * percent // 100)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+class Telemetry:
+    def __init__(self, path: str = None, retention_days: float = 30):
+        """Local store of per-call provider latency and token counts.
+
+        Rows older than `retention_days` are deleted when the store is opened.
+
+        Args:
+            path: SQLite database file (default: CONFIG_DIR/telemetry.sqlite3)
+            retention_days: Days calls are kept (default: 30)
+        """
+
+        self.path = path or TELEMETRY_FILE
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS calls ("
+            "time REAL, role TEXT, provider TEXT, model TEXT, prompt_tokens INTEGER, completion_tokens INTEGER, "
+            "tokens_estimated INTEGER, ttft REAL, latency REAL, outcome TEXT, prompt_estimate INTEGER)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(calls)")}
+        if "prompt_estimate" not in columns:  # Store created before prompt estimates were recorded
+            self._conn.execute("ALTER TABLE calls ADD COLUMN prompt_estimate INTEGER")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS calls_time ON calls (time)")
+        self._conn.execute("DELETE FROM calls WHERE time < ?", (time.time() - retention_days * 86400,))
+        self._conn.commit()
+
+    def record(self, role: str, provider: str, model: str, latency: float, outcome: str = "ok",
+               prompt_tokens: int = None, completion_tokens: int = None, tokens_estimated: bool = False,
+               ttft: float = None, prompt_estimate: int = None):
+        """Stores one provider call.
+
+        Args:
+            role: Node role name
+            provider: Provider that handled the call
+            model: Model that handled the call
+            latency: Seconds until the call completed or failed
+            outcome: "ok", or the name of the error the call failed with (default: "ok")
+            prompt_tokens: Input tokens (optional)
+            completion_tokens: Output tokens (optional)
+            tokens_estimated: True if the token counts are estimates rather than provider reports
+            ttft: Seconds until the first streamed token (optional)
+            prompt_estimate: Prompt size in tokens estimated before sending, as checked against
+                the role's prompt budget (optional)
+        """
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO calls (time, role, provider, model, prompt_tokens, completion_tokens, tokens_estimated, "
+                "ttft, latency, outcome, prompt_estimate) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), role, provider, model, prompt_tokens, completion_tokens, int(tokens_estimated),
+                 ttft, latency, outcome, prompt_estimate),
+            )
+            self._conn.commit()
+
+    def summary(self, window: float = None) -> list:
+        """Aggregates the calls of a time window per role and provider.
+
+        Args:
+            window: Seconds to look back, None for all stored calls (default: None)
+
+        Returns:
+            List of dictionaries with role, provider, calls, errors, p50, p90
+            and p99 latency of successful calls, median ttft, prompt_tokens and
+            completion_tokens, estimated_share, the fraction of those tokens
+            that are estimates, and prompt_estimate, the mean prompt size
+            estimated before sending, busiest role first
+        """
+
+        since = 0 if window is None else time.time() - window
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, provider, prompt_tokens, completion_tokens, tokens_estimated, ttft, latency, outcome, "
+                "prompt_estimate "
+                "FROM calls WHERE time >= ?", (since,)
+            ).fetchall()
+
+        groups = {}
+        for (role, provider, prompt_tokens, completion_tokens, tokens_estimated, ttft, latency, outcome,
+             prompt_estimate) in rows:
+            group = groups.setdefault((role, provider), {
+                "latencies": [], "ttfts": [], "prompt_estimates": [], "calls": 0, "errors": 0, "prompt_tokens": 0,
+                "completion_tokens": 0, "estimated_tokens": 0,
+            })
+            group["calls"] += 1
+            if outcome != "ok":
+                group["errors"] += 1
+                continue
+            group["latencies"].append(latency)
+            if ttft is not None:
+                group["ttfts"].append(ttft)
+            if prompt_estimate is not None:
+                group["prompt_estimates"].append(prompt_estimate)
+            group["prompt_tokens"] += prompt_tokens or 0
+            group["completion_tokens"] += completion_tokens or 0
+            if tokens_estimated:
+                group["estimated_tokens"] += (prompt_tokens or 0) + (completion_tokens or 0)
+
+        result = []
+        for (role, provider), group in groups.items():
+            latencies = sorted(group["latencies"])
+            ttfts = sorted(group["ttfts"])
+            tokens = group["prompt_tokens"] + group["completion_tokens"]
+            estimates = group["prompt_estimates"]
+            result.append({
+                "role": role,
+                "provider": provider,
+                "calls": group["calls"],
+                "errors": group["errors"],
+                "p50": percentile(latencies, 50) if latencies else None,
+                "p90": percentile(latencies, 90) if latencies else None,
+                "p99": percentile(latencies, 99) if latencies else None,
+                "ttft": percentile(ttfts, 50) if ttfts else None,
+                "prompt_tokens": group["prompt_tokens"],
+                "completion_tokens": group["completion_tokens"],
+                "estimated_share": group["estimated_tokens"] / tokens if tokens else 0.0,
+                "prompt_estimate": round(sum(estimates) / len(estimates)) if estimates else None,
+            })
+        return sorted(result, key=lambda row: (-row["calls"], row["role"], row["provider"]))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def format_summary(rows: list, window_label: str) -> str:
+    """Formats a telemetry summary as a table.
+
+    The estimated column is the share of the token counts that were
+    estimated because the provider reported no usage, and prompt est. the
+    mean prompt size estimated before sending, the figure the role's prompt
+    budget is enforced against.
+
+    Args:
+        rows: Result of Telemetry.summary()
+        window_label: Time window shown in the title (e.g. "24h")
+
+    Returns:
+        Multi-line table text
+    """
+
+    if not rows:
+        return f"No provider calls recorded in the last {window_label}."
+
+    def seconds(value):
+        return "-" if value is None else f"{value:.2f}s"
+
+    lines = [
+        f"Provider calls ({'all time' if window_label == 'all' else 'last ' + window_label})",
+        f"{'role':<20}{'provider':<12}{'calls':>6}{'errors':>7}{'p50':>8}{'p90':>8}{'p99':>8}{'ttft':>8}"
+        f"{'tokens in':>11}{'tokens out':>11}{'estimated':>11}{'prompt est.':>13}",
+    ]
+    for row in rows:
+        lines.append(
+            f"{row['role']:<20}{row['provider']:<12}{row['calls']:>6}{row['errors']:>7}{seconds(row['p50']):>8}"
+            f"{seconds(row['p90']):>8}{seconds(row['p99']):>8}{seconds(row['ttft']):>8}"
+            f"{row['prompt_tokens']:>11}{row['completion_tokens']:>11}{row['estimated_share']:>11.0%}"
+            f"{'-' if row['prompt_estimate'] is None else row['prompt_estimate']:>13}"
+        )
+    return "\n".join(lines)
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+def get_telemetry():
+    """Gets the process-wide telemetry store, opening it on first use.
+
+    Returns:
+        Telemetry, or None if the store cannot be opened
+    """
+
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None or _telemetry.path != TELEMETRY_FILE:
+            try:
+                _telemetry = Telemetry()
+            except (OSError, sqlite3.Error):
+                return None  # Unwritable config directory, run without telemetry
+        return _telemetry
@@ -0,0 +1,220 @@
+import threading
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Iterator, List
+
+# Average UTF-8 bytes per token of English text and shell commands
+BYTES_PER_TOKEN = 4
+
+# Tokens chat APIs add around each message for its role and delimiters
+MESSAGE_OVERHEAD_TOKENS = 4
+
+TRUNCATION_MARKER = "\n[... truncated {count} characters to fit the prompt budget ...]\n"
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of tokens in a text without loading a tokenizer.
+
+    Counting UTF-8 bytes rather than characters makes non-Latin text, which
+    tokenizes into more tokens per character, come out closer to the real count.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+    """
+
+    if not text:
+        return 0
+    if text.isascii():
+        return -(-len(text) // BYTES_PER_TOKEN)
+    return -(-len(text.encode("utf-8", errors="replace")) // BYTES_PER_TOKEN)
+
+def estimate_message_tokens(messages: List[dict]) -> int:
+    """Estimates the number of prompt tokens of a list of chat messages.
+
+    Args:
+        messages: Messages with "role" and "content" keys
+
+    Returns:
+        Estimated token count
+    """
+
+    return sum(estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Shortens a text to roughly fit a token budget.
+
+    The start and the end of the text are kept, since both the header and the
+    last lines of files and logs tend to matter, and a marker replaces the middle.
+
+    Args:
+        text: Text to shorten
+        max_tokens: Token budget
+
+    Returns:
+        The text itself if it fits, otherwise the truncated text with a marker
+    """
+
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    ratio = max(len(text) / max(estimate_tokens(text), 1), 1)
+    keep = max(int(max(max_tokens, 0) * ratio) - len(TRUNCATION_MARKER) - 8, 0)
+    head = keep * 2 // 3
+    tail = keep - head
+    marker = TRUNCATION_MARKER.format(count=len(text) - head - tail)
+    return text[:head] + marker + (text[len(text) - tail:] if tail else "")
+
+# Token counts of the calls made in the current context (see track_usage)
+_usage_record = ContextVar("usage_record", default=None)
+
+@contextmanager
+def track_usage() -> Iterator[dict]:
+    """Collects the token counts providers report for calls made inside the block.
+
+    The record is bound to the current context, so concurrent asyncio tasks
+    each see only their own calls. Counts are also added to the enclosing
+    record when blocks are nested.
+
+    Yields:
+        Dictionary filled with prompt_tokens, completion_tokens and, when the
+        provider reports them, cached_tokens and cache_write_tokens
+    """
+
+    record = {}
+    token = _usage_record.set(record)
+    try:
+        yield record
+    finally:
+        _usage_record.reset(token)
+        outer = _usage_record.get()
+        if outer is not None:
+            _add_counts(outer, record)
+
+def record_usage(prompt_tokens, completion_tokens, cached_tokens=None, cache_write_tokens=None):
+    """Adds reported token counts to the active usage record, if any.
+
+    Counts that are not ints (e.g. missing usage fields) are ignored.
+
+    Args:
+        prompt_tokens: Input tokens reported by the provider, including cached ones
+        completion_tokens: Output tokens reported by the provider
+        cached_tokens: Input tokens read from the provider's prompt cache (optional)
+        cache_write_tokens: Input tokens written to the provider's prompt cache (optional)
+    """
+
+    record = _usage_record.get()
+    if record is None:
+        return
+    counts = (("prompt_tokens", prompt_tokens), ("completion_tokens", completion_tokens),
+              ("cached_tokens", cached_tokens), ("cache_write_tokens", cache_write_tokens))
+    for key, value in counts:
+        if isinstance(value, int) and not isinstance(value, bool):
+            record[key] = record.get(key, 0) + value
+
+def _add_counts(record: dict, counts: dict):
+    for key, value in counts.items():
+        record[key] = record.get(key, 0) + value
+
+def metered(chunks: Iterable[str], usage: dict) -> Iterator[str]:
+    """Passes a streamed response through, collecting the token counts reported while it is read.
+
+    Each chunk is read inside its own usage block, so no record stays active
+    while the consumer handles a chunk. Counts also reach the enclosing
+    record, if any.
+
+    Args:
+        chunks: Streamed response chunks
+        usage: Dictionary receiving prompt_tokens, completion_tokens and the cache counts
+
+    Yields:
+        Response text chunks
+    """
+
+    iterator = iter(chunks)
+    finished = object()
+    try:
+        while True:
+            with track_usage() as counts:
+                chunk = next(iterator, finished)
+            _add_counts(usage, counts)
+            if chunk is finished:
+                return
+            yield chunk
+    finally:
+        close = getattr(iterator, "close", None)
+        if callable(close):
+            # Providers report usage from their cleanup when a stream is closed early
+            with track_usage() as counts:
+                close()
+            _add_counts(usage, counts)
+
+class PromptCacheStats:
+    def __init__(self):
+        """Process-wide prompt cache metrics per role.
+
+        Calls are split by whether the provider served part of the prompt from
+        its cache, so the latency of cached and uncached calls can be compared.
+        """
+
+        self._roles = {}
+        self._lock = threading.Lock()
+
+    def record(self, role: str, usage: dict, seconds: float):
+        """Adds the usage of one call.
+
+        Args:
+            role: Node role name
+            usage: Usage record of the call (see track_usage)
+            seconds: Call latency
+        """
+
+        if "prompt_tokens" not in usage:
+            return  # The provider reported no usage
+        with self._lock:
+            stats = self._roles.setdefault(role, {
+                "calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "cache_write_tokens": 0,
+                "hits": 0, "hit_seconds": 0.0, "miss_seconds": 0.0,
+            })
+            stats["calls"] += 1
+            for key in ("prompt_tokens", "cached_tokens", "cache_write_tokens"):
+                stats[key] += usage.get(key, 0)
+            if usage.get("cached_tokens"):
+                stats["hits"] += 1
+                stats["hit_seconds"] += seconds
+            else:
+                stats["miss_seconds"] += seconds
+
+    def stats(self) -> dict:
+        """Gets prompt cache metrics per role.
+
+        Returns:
+            Dictionary mapping role to calls, prompt_tokens, cached_tokens,
+            cache_write_tokens, hit_rate (share of prompt tokens read from the
+            cache) and the mean latency of cached and uncached calls (None
+            without such calls)
+        """
+
+        with self._lock:
+            result = {}
+            for role, stats in self._roles.items():
+                misses = stats["calls"] - stats["hits"]
+                result[role] = {
+                    "calls": stats["calls"],
+                    "prompt_tokens": stats["prompt_tokens"],
+                    "cached_tokens": stats["cached_tokens"],
+                    "cache_write_tokens": stats["cache_write_tokens"],
+                    "hit_rate": round(stats["cached_tokens"] / stats["prompt_tokens"], 3) if stats["prompt_tokens"] else 0.0,
+                    "cached_latency": round(stats["hit_seconds"] / stats["hits"], 3) if stats["hits"] else None,
+                    "uncached_latency": round(stats["miss_seconds"] / misses, 3) if misses else None,
+                }
+            return result
+
+    def reset(self):
+        """Forgets all recorded calls."""
+
+        with self._lock:
+            self._roles.clear()
+
+prompt_cache_stats = PromptCacheStats()
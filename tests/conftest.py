@@ -5,7 +5,7 @@ import os
 def mock_config_dir(tmp_path, mocker):
     """
     tmp_path creates a temporary config directory and mocks the constants in the
-    setup and alias_manager modules to use it.
+    setup, alias_manager, executable_index, response_cache and rate_limit modules to use it.
     """
 
     # Create a temporary directory for the test
@@ -14,8 +14,31 @@ def mock_config_dir(tmp_path, mocker):
 
     # Mock the constants in the modules where they are defined
     mocker.patch('promptshell.setup.CONFIG_DIR', str(temp_dir))
+    mocker.patch('promptshell.setup.CONFIG_FILE', os.path.join(str(temp_dir), "promptshell_config.conf"))
+    mocker.patch('promptshell.setup._config_snapshot', None)
     mocker.patch('promptshell.alias_manager.CONFIG_DIR', str(temp_dir))
 
     # The ALIAS_FILE is derived from CONFIG_DIR, so we must update it too
     mocker.patch('promptshell.alias_manager.ALIAS_FILE', os.path.join(str(temp_dir), "aliases.json"))
+    mocker.patch('promptshell.executable_index.INDEX_FILE', os.path.join(str(temp_dir), "executables.json"))
+    mocker.patch('promptshell.response_cache.CACHE_FILE', os.path.join(str(temp_dir), "response_cache.sqlite3"))
+    mocker.patch('promptshell.rate_limit.RATE_LIMIT_DIR', os.path.join(str(temp_dir), "rate_limits"))
     return str(temp_dir)
+
+@pytest.fixture(autouse=True)
+def isolate_telemetry(tmp_path, mocker):
+    """Keeps provider calls made by tests out of the user's telemetry store."""
+
+    mocker.patch('promptshell.telemetry.TELEMETRY_FILE', str(tmp_path / "telemetry.sqlite3"))
+
+@pytest.fixture(autouse=True)
+def reset_provider_router():
+    """Keeps provider health and prompt cache metrics recorded by one test out of another."""
+
+    from promptshell.provider_router import router
+    from promptshell.token_utils import prompt_cache_stats
+    router.reset()
+    prompt_cache_stats.reset()
+    yield
+    router.reset()
+    prompt_cache_stats.reset()
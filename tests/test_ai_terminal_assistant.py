@@ -0,0 +1,103 @@
+import asyncio
+import time
+import pytest
+
+from promptshell.ai_terminal_assistant import AITerminalAssistant, ROLES
+
+@pytest.mark.usefixtures("mock_config_dir")
+class TestLazyRoles:
+    def test_roles_are_not_built_at_construction(self, mocker):
+        get_system_info = mocker.patch('promptshell.ai_terminal_assistant.get_system_info', return_value={})
+        assistant = AITerminalAssistant("test-model")
+        assert not any(attr in vars(assistant) for attr in ROLES)
+        assert assistant.system_context is None
+        get_system_info.assert_not_called()
+
+    def test_role_is_built_once_on_first_use(self):
+        assistant = AITerminalAssistant("test-model")
+        node = assistant.command_executor
+        assert node.name == "Command Executor"
+        assert "[ROLE] Shell Command Interpreter" in node.definition
+        assert assistant.command_executor is node
+        assert "debugger" not in vars(assistant)
+
+    def test_reconfigure_keeps_system_context(self, mocker):
+        get_system_info = mocker.patch('promptshell.ai_terminal_assistant.get_system_info', return_value={})
+        assistant = AITerminalAssistant("test-model")
+        old_node = assistant.debugger
+
+        assistant.reconfigure("other-model")
+        new_node = assistant.debugger
+        assert new_node is not old_node
+        assert new_node.model_name == "other-model"
+        get_system_info.assert_called_once()
+
+    def test_reconfigure_keeps_role_history(self, mocker):
+        mocker.patch('promptshell.ai_terminal_assistant.get_system_info', return_value={})
+        assistant = AITerminalAssistant("test-model")
+        assistant.debugger._remember("why did make fail?", "A target is missing.")
+
+        assistant.reconfigure("other-model", config={"MODE": "local", "CONTEXT_TOKEN_BUDGET": "512"})
+        assert assistant.debugger.model_name == "other-model"
+        assert assistant.debugger.context[-1] == {"role": "assistant", "content": "A target is missing."}
+        assert assistant.debugger.context.max_tokens == 512
+
+    def test_unknown_attribute_raises(self):
+        assistant = AITerminalAssistant("test-model")
+        with pytest.raises(AttributeError):
+            assistant.not_a_role
+
+    def test_roles_use_their_configured_models(self):
+        config = {
+            "MODE": "api", "ACTIVE_API_PROVIDER": "openai", "API_MODEL": "gpt-4o", "LOCAL_MODEL": "llama3",
+            "ROLE_COMMAND_EXECUTOR_PROVIDER": "groq", "ROLE_COMMAND_EXECUTOR_MODEL": "llama-3.1-8b-instant",
+            "ROLE_ERROR_HANDLER_PROVIDER": "ollama",
+        }
+        assistant = AITerminalAssistant("gpt-4o", config=config)
+        assert (assistant.command_executor.provider, assistant.command_executor.model_name) == ("groq", "llama-3.1-8b-instant")
+        assert (assistant.error_handler.provider, assistant.error_handler.model_name) == ("ollama", "llama3")
+        assert (assistant.debugger.provider, assistant.debugger.model_name) == ("openai", "gpt-4o")
+        assert "Command Executor    groq/llama-3.1-8b-instant" in assistant.status_report()
+
+    def test_role_on_another_provider_never_inherits_the_active_model(self):
+        config = {
+            "MODE": "api", "ACTIVE_API_PROVIDER": "openai", "API_MODEL": "gpt-4o",
+            "ROLE_COMMAND_EXECUTOR_PROVIDER": "groq", "ROLE_DEBUGGER_PROVIDER": "custom",
+        }
+        assistant = AITerminalAssistant("gpt-4o", config=config)
+        assert assistant.role_model("command_executor") == ("groq", "llama-3.1-8b-instant")
+        with pytest.raises(ValueError, match="set ROLE_DEBUGGER_MODEL"):
+            assistant.debugger
+        assert "ROLE_DEBUGGER_PROVIDER is custom" in assistant.status_report()
+
+@pytest.mark.usefixtures("mock_config_dir")
+def test_answer_question_streams_to_terminal(mocker, capsys):
+    assistant = AITerminalAssistant("test-model")
+    node = assistant.question_answerer
+    mocker.patch.object(node, "stream", return_value=iter(["Use ", "'top'"]))
+    node.last_timing = {"ttft": 0.25, "total": 1.5}
+
+    assert assistant.answer_question("how to monitor cpu?") == ""
+    output = capsys.readouterr().out
+    assert "Answer:\nUse 'top'" in output
+    assert "first token 0.25s | total 1.50s" in output
+
+@pytest.mark.usefixtures("mock_config_dir")
+class TestAsyncRoles:
+    def test_analyze_failure_runs_roles_concurrently(self, mocker):
+        assistant = AITerminalAssistant("test-model")
+
+        async def debug(text):
+            await asyncio.sleep(0.2)
+            return "typo in command"
+
+        async def correct(text):
+            await asyncio.sleep(0.2)
+            return "ls -la"
+
+        mocker.patch.object(assistant.debugger, "acall", side_effect=debug)
+        mocker.patch.object(assistant.error_handler, "acall", side_effect=correct)
+
+        start = time.perf_counter()
+        assert assistant.analyze_failure("lss -la", "lss: command not found", 127) == ("typo in command", "ls -la")
+        assert time.perf_counter() - start < 0.35
@@ -0,0 +1,95 @@
+import asyncio
+import io
+import json
+import os
+import pytest
+
+from promptshell.ai_terminal_assistant import AITerminalAssistant
+from promptshell.batch import BatchTranslator, read_requests, run_batch
+from promptshell.token_utils import estimate_message_tokens, record_usage
+
+def test_read_requests_skips_blanks_and_comments():
+    stream = io.StringIO("list files\n\n# a comment\n  show disk usage  \n")
+    assert read_requests(stream) == ["list files", "show disk usage"]
+
+@pytest.fixture
+def assistant(mock_config_dir, mocker):
+    assistant = AITerminalAssistant("test-model")
+    state = {"in_flight": 0, "peak": 0}
+    replies = {"first": ("ls -la\nLists files", 0.15), "second": ("df -h", 0.01), "third": ("Error in processing: boom", 0.05),
+               "fourth": ("pwd", 0.01)}
+
+    async def acall(text, remember=True):
+        assert remember is False
+        request = next(name for name in replies if f"User Input: {name}\n" in text)
+        reply, delay = replies[request]
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(delay)
+        state["in_flight"] -= 1
+        if request == "second":
+            record_usage(120, 3)
+        elif request == "fourth":
+            record_usage(120, None)
+        return reply
+
+    mocker.patch.object(assistant.command_executor, "acall", side_effect=acall)
+    assistant.concurrency_state = state
+    return assistant
+
+def test_results_keep_input_order(assistant):
+    output = io.StringIO()
+    results = asyncio.run(BatchTranslator(assistant, concurrency=3).run(["first", "second", "third"], output))
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert lines == results
+    assert [line["request"] for line in lines] == ["first", "second", "third"]
+    assert lines[0]["command"] == "ls -la"
+    assert lines[1]["command"] == "df -h"
+    assert lines[2]["command"] is None and lines[2]["error"] == "Error in processing: boom"
+
+def test_token_counts_are_reported_or_estimated(assistant):
+    results = asyncio.run(BatchTranslator(assistant).run(["first", "second", "fourth"], io.StringIO()))
+    assert results[1]["prompt_tokens"] == 120
+    assert results[1]["completion_tokens"] == 3
+    assert results[1]["tokens_estimated"] is False
+    assert results[0]["tokens_estimated"] is True
+    # Estimated from the messages sent, including the role definition
+    messages = assistant.command_executor._build_messages(assistant._translation_input("first"))
+    assert results[0]["prompt_tokens"] == estimate_message_tokens(messages)
+    assert (results[2]["prompt_tokens"], results[2]["tokens_estimated"]) == (120, True)
+    assert results[2]["completion_tokens"] > 0
+    assert results[0]["latency_ms"] >= 150
+
+def test_concurrency_is_bounded(assistant):
+    asyncio.run(BatchTranslator(assistant, concurrency=2).run(["first", "second", "third"] * 3, io.StringIO()))
+    assert assistant.concurrency_state["peak"] == 2
+
+def test_run_batch_reads_file_and_reports_errors(assistant, tmp_path, capsys):
+    requests_file = tmp_path / "requests.txt"
+    requests_file.write_text("first\nsecond\n")
+    output = io.StringIO()
+    assert run_batch(assistant, str(requests_file), concurrency=2, output=output) == 0
+    assert len(output.getvalue().splitlines()) == 2
+    assert "Translated 2 requests" in capsys.readouterr().err
+
+    requests_file.write_text("third\n")
+    assert run_batch(assistant, str(requests_file), output=io.StringIO()) == 1
+
+def test_batch_mode_requires_a_config_file(mock_config_dir, capsys):
+    from promptshell.main import batch_mode
+
+    assert batch_mode(["requests.txt"]) == 1
+    assert "No configuration found" in capsys.readouterr().err
+
+def test_unreadable_requests_file_and_invalid_concurrency(assistant, mock_config_dir, tmp_path, capsys):
+    from promptshell.main import batch_mode
+
+    assert run_batch(assistant, str(tmp_path / "missing.txt"), output=io.StringIO()) == 2
+    assert capsys.readouterr().err.strip().splitlines() == [
+        f"Cannot read requests from {tmp_path / 'missing.txt'}: No such file or directory"
+    ]
+
+    with open(os.path.join(mock_config_dir, "promptshell_config.conf"), "w") as file:
+        file.write("MODE=local\n")
+    assert batch_mode(["requests.txt", "--concurrency", "0"]) == 2
+    assert "Usage: promptshell --batch" in capsys.readouterr().err
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import time
+import pytest
+
+from promptshell.cassette import Cassette, CassetteMissError, get_cassette, load_entries, request_key, reset_cassettes
+from promptshell.fake_llm_server import FakeLLMServer
+from promptshell.node import Node
+from promptshell.providers import client_pool
+from promptshell.token_utils import track_usage
+
+@pytest.fixture(autouse=True)
+def fresh_cassettes():
+    reset_cassettes()
+    yield
+    reset_cassettes()
+
+def make_node(config, name="Command Executor"):
+    node = Node("fake-model", name, config={"MODE": "api", "ACTIVE_API_PROVIDER": "openai", "OPENAI_API_KEY": "test-key",
+                                           "RETRY_MAX_ATTEMPTS": "1", "FALLBACK_TO_LOCAL": "false", **config})
+    node.definition = "Translate requests into shell commands."
+    return node
+
+def write_cassette(path, entries):
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in entries))
+
+def test_record_then_replay_offline(tmp_path):
+    path = tmp_path / "session.jsonl"
+    client_pool.clear()
+    with FakeLLMServer(seed=1) as server:
+        server._queue = [{"content": "ls -la"}, {"content": "du -sh ~\n\nShows disk usage."}]
+        recorder = make_node({**server.config(), "CASSETTE_MODE": "record", "CASSETTE_PATH": str(path)})
+        assert recorder("list files", remember=False) == "ls -la"
+        assert "".join(recorder.stream("disk usage")) == "du -sh ~\n\nShows disk usage."
+    client_pool.clear()
+
+    entries = load_entries(str(path))
+    assert [entry["response"] for entry in entries] == ["ls -la", "du -sh ~\n\nShows disk usage."]
+    assert entries[0]["chunks"] is None and entries[0]["usage"]["completion_tokens"] > 0
+    assert len(entries[1]["chunks"]) > 1 and entries[1]["complete"] is True
+
+    # The server is gone: every answer comes from the cassette
+    replayer = make_node({"OPENAI_BASE_URL": "http://127.0.0.1:9/v1", "CASSETTE_MODE": "replay",
+                          "CASSETTE_PATH": str(path), "CASSETTE_TIME_SCALE": "0"})
+    assert replayer("list files", remember=False) == "ls -la"
+    assert list(replayer.stream("disk usage")) == [chunk for _, chunk in entries[1]["chunks"]]
+
+def test_replay_restores_usage_and_repeats_exact_matches(tmp_path):
+    path = tmp_path / "session.jsonl"
+    node = make_node({"CASSETTE_MODE": "replay", "CASSETTE_PATH": str(path), "CASSETTE_TIME_SCALE": "0"})
+    messages = node._build_messages("list files")
+    write_cassette(path, [{"key": request_key(node.name, messages), "role": node.name, "response": "ls",
+                           "latency": 1.0, "chunks": None, "usage": {"prompt_tokens": 12, "completion_tokens": 2}}])
+
+    for _ in range(2):
+        with track_usage() as usage:
+            assert node("list files", remember=False) == "ls"
+        assert usage == {"prompt_tokens": 12, "completion_tokens": 2}
+
+def test_unmatched_requests_take_the_next_entry_of_their_role(tmp_path):
+    path = tmp_path / "session.jsonl"
+    write_cassette(path, [
+        {"key": "a", "role": "Command Executor", "response": "first", "latency": 0, "chunks": None},
+        {"key": "b", "role": "Debugger", "response": "debug", "latency": 0, "chunks": None},
+        {"key": "c", "role": "Command Executor", "response": "second", "latency": 0, "chunks": None},
+    ])
+    config = {"CASSETTE_MODE": "replay", "CASSETTE_PATH": str(path)}
+    node = make_node(config)
+
+    assert node("anything", remember=False) == "first"
+    assert node("something else", remember=False) == "second"
+    assert node("one more", remember=False).startswith("Error in processing: No recorded response for Command Executor")
+    assert make_node(config, "Debugger")("why", remember=False) == "debug"
+
+    get_cassette(node.config).rewind()
+    assert node("again", remember=False) == "first"
+
+def test_replay_scales_chunk_timing(tmp_path):
+    path = tmp_path / "session.jsonl"
+    write_cassette(path, [{"key": "a", "role": "Command Executor", "response": "ls -la", "latency": 0.4,
+                           "chunks": [[0.2, "ls"], [0.4, " -la"]]}])
+    node = make_node({"CASSETTE_MODE": "replay", "CASSETTE_PATH": str(path), "CASSETTE_TIME_SCALE": "0.5"})
+
+    start = time.perf_counter()
+    stream = node._send_stream([])
+    assert next(stream) == "ls"
+    first = time.perf_counter() - start
+    assert list(stream) == [" -la"]
+    total = time.perf_counter() - start
+    assert 0.09 <= first < 0.18
+    assert 0.19 <= total < 0.3
+
+def test_generate_command_records_the_stream_up_to_the_command(tmp_path):
+    path = tmp_path / "session.jsonl"
+    client_pool.clear()
+    with FakeLLMServer(seed=1) as server:
+        server.default_response = "git status\n\nShows the state of the working tree."
+        node = make_node({**server.config(), "CASSETTE_MODE": "record", "CASSETTE_PATH": str(path)})
+        assert node.generate_command("repo state") == "git status"
+    client_pool.clear()
+
+    entry, = load_entries(str(path))
+    assert entry["complete"] is False
+    assert entry["response"].startswith("git status")
+
+    replayer = make_node({"CASSETTE_MODE": "replay", "CASSETTE_PATH": str(path), "CASSETTE_TIME_SCALE": "0"})
+    assert replayer.generate_command("repo state") == "git status"
+
+def test_async_replay(tmp_path):
+    path = tmp_path / "session.jsonl"
+    write_cassette(path, [{"key": "a", "role": "Command Executor", "response": f"echo {index}", "latency": 0.05,
+                           "chunks": None} for index in range(3)])
+    node = make_node({"CASSETTE_MODE": "replay", "CASSETTE_PATH": str(path)})
+
+    async def run():
+        return await asyncio.gather(*(node.acall(f"request {index}", remember=False) for index in range(3)))
+
+    assert sorted(asyncio.run(run())) == ["echo 0", "echo 1", "echo 2"]
+
+def test_unknown_mode_and_missing_cassette(tmp_path):
+    with pytest.raises(ValueError):
+        Cassette(str(tmp_path / "session.jsonl"), mode="rewind")
+    assert get_cassette({"CASSETTE_MODE": "off"}) is None
+    with pytest.raises(CassetteMissError):
+        write_cassette(tmp_path / "empty.jsonl", [])
+        Cassette(str(tmp_path / "empty.jsonl")).find(make_node({}), [])
+
+def test_replay_skips_rate_limits_retries_and_routing(tmp_path, mocker):
+    from promptshell.provider_router import router
+
+    path = tmp_path / "session.jsonl"
+    write_cassette(path, [{"key": "a", "role": "Command Executor", "response": "ls", "latency": 0, "chunks": None}])
+    node = make_node({"CASSETTE_MODE": "replay", "CASSETTE_PATH": str(path), "RATE_LIMIT_RPM": "1",
+                      "RETRY_MAX_ATTEMPTS": "4", "FALLBACK_PROVIDERS": "groq:llama3"})
+    token_bucket = mocker.patch("promptshell.node.get_token_bucket")
+    find = mocker.spy(Cassette, "find")
+
+    assert node("list files", remember=False) == "ls"
+    assert node("again", remember=False).startswith("Error in processing: No recorded response")
+    token_bucket.assert_not_called()
+    assert find.call_count == 2
+    assert router.status() == {} and not router.decisions
@@ -0,0 +1,70 @@
+import pytest
+
+from promptshell.command_parser import is_balanced_command, first_complete_command
+from promptshell.node import Node
+
+@pytest.mark.parametrize("command, expected", [
+    ("ls -la", True),
+    ("find . -name '*.pdf' -size +5M", True),
+    ('grep -rnw "./" -e "timeout"', True),
+    ("echo $(date +%s)", True),
+    ("cat <<< 'here string'", True),
+    ("echo 'unterminated", False),
+    ("ps aux |", False),
+    ("make &&", False),
+    ("tar -czf backup.tgz \\", False),
+    ("for f in *; do echo $f; done )", False),
+    ("cat <<EOF", False),
+    ("", False),
+])
+def test_is_balanced_command(command, expected):
+    assert is_balanced_command(command) == expected
+
+def test_first_complete_command_waits_for_newline():
+    assert first_complete_command("ls -l") is None
+    assert first_complete_command("ls -l\n") == "ls -l"
+    assert first_complete_command("ls -l", final=True) == "ls -l"
+
+def test_first_complete_command_skips_code_fence():
+    assert first_complete_command("```bash\n") is None
+    assert first_complete_command("```bash\ndu -sh * | sort -h\n```") == "du -sh * | sort -h"
+
+def test_first_complete_command_joins_continued_lines():
+    text = "tar -czf backup.tgz \\\n  docs/\nThis creates an archive"
+    assert first_complete_command(text) == "tar -czf backup.tgz \\\n  docs/"
+
+@pytest.mark.parametrize("text, expected", [
+    ("The command is: ls\n", "ls"),
+    ("Here's the command:\n```bash\nls -la\n```\n", "ls -la"),
+    ("To list files, run `ls -la`.\n", "ls -la"),
+    ("Don't run this as root, it's risky\nrm -rf build\n", "rm -rf build"),
+    ("Sure, this lists files\n", None),
+])
+def test_first_complete_command_skips_prose(text, expected):
+    assert first_complete_command(text) == expected
+
+def test_backslash_is_not_a_continuation_on_windows():
+    assert is_balanced_command("tar -czf backup.tgz \\", posix=True) is False
+    assert is_balanced_command("dir C:\\Users\\", posix=False) is True
+    assert first_complete_command('copy "C:\\temp\\" D:\\\n', posix=False) == 'copy "C:\\temp\\" D:\\'
+
+def test_generate_command_cancels_stream_after_first_command(mocker):
+    config = {"MODE": "local", "OLLAMA_HOST": "http://localhost:11434"}
+    node = Node("llama3", "Command Executor", config=config)
+    produced = []
+    closed = []
+
+    def fake_stream(prompt):
+        try:
+            for chunk in ["ls", " -la\n", "This", " command", " lists", " all", " files", " in", " long", " format"]:
+                produced.append(chunk)
+                yield chunk
+        finally:
+            closed.append(True)
+
+    mocker.patch.object(node, "_stream_ollama", side_effect=fake_stream)
+    assert node.generate_command("list all files") == "ls -la"
+    # A few trailing chunks are read for the usage, then the request is cancelled
+    assert produced == ["ls", " -la\n", "This", " command", " lists", " all"]
+    assert closed == [True]
+    assert node.context[-1] == {"role": "assistant", "content": "ls -la"}
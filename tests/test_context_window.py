@@ -0,0 +1,50 @@
+from promptshell.context_window import ContextWindow
+from promptshell.node import Node
+
+def test_short_history_is_kept_verbatim():
+    window = ContextWindow(max_tokens=1000)
+    window.append("user", "list files")
+    window.append("assistant", "ls")
+    assert window.summary_text() == ""
+    assert window == [{"role": "user", "content": "list files"}, {"role": "assistant", "content": "ls"}]
+
+def test_history_stays_within_budget():
+    window = ContextWindow(max_tokens=200, keep_recent=2)
+    for index in range(50):
+        window.append("user", f"request {index} " + "x" * 100)
+        window.append("assistant", f"answer {index}")
+        assert window.tokens <= 200
+
+    assert window[-1] == {"role": "assistant", "content": "answer 49"}
+    assert window.summary_text().startswith("Summary of earlier conversation:")
+
+def test_recent_messages_are_never_compacted():
+    window = ContextWindow(max_tokens=10, keep_recent=2)
+    window.append("user", "y" * 200)
+    window.append("assistant", "z" * 200)
+    assert len(window) == 2
+
+def test_summary_truncates_messages():
+    window = ContextWindow(max_tokens=60, keep_recent=1, summary_chars=20)
+    window.append("user", "a" * 300 + "\nsecond line")
+    window.append("assistant", "done")
+    assert window.summary == ["user: " + "a" * 17 + "..."]
+    assert "second line" not in window.summary_text()
+
+def test_node_prompt_uses_window(mocker):
+    node = Node("test-model", "Tester", config={"MODE": "local", "OLLAMA_MODEL": "m"}, context_tokens=50)
+    for index in range(20):
+        node._remember(f"question {index}", f"answer {index}")
+    messages = node._build_messages("next")
+    assert messages[-2] == {"role": "assistant", "content": "answer 19"}
+    assert messages[-1] == {"role": "user", "content": "next"}
+    assert messages[1]["content"].startswith("Summary of earlier conversation:")
+    assert "question 0" not in str(messages)
+    assert node.context.tokens <= 50
+
+def test_compacted_history_starts_with_user_turn():
+    window = ContextWindow(max_tokens=40, keep_recent=3)
+    for index in range(10):
+        window.append("user", f"question {index} " + "q" * 30)
+        window.append("assistant", f"answer {index} " + "a" * 30)
+        assert window[0]["role"] == "user"
@@ -0,0 +1,77 @@
+import os
+import json
+import pytest
+
+from pathlib import Path
+from promptshell.executable_index import ExecutableIndex, command_program
+
+def _make_executable(directory, name):
+    path = directory / name
+    path.write_text("#!/bin/sh\n")
+    path.chmod(0o755)
+    return path
+
+@pytest.fixture
+def path_dirs(tmp_path):
+    bin_dir = tmp_path / "bin"
+    local_dir = tmp_path / "local"
+    bin_dir.mkdir()
+    local_dir.mkdir()
+    for name in ("git", "grep", "gzip"):
+        _make_executable(bin_dir, name)
+    _make_executable(local_dir, "python3")
+    (local_dir / "README").write_text("not executable")
+    (local_dir / "README").chmod(0o644)
+    return [str(bin_dir), str(local_dir)]
+
+@pytest.mark.usefixtures("mock_config_dir")
+class TestExecutableIndex:
+    def test_queries(self, path_dirs):
+        index = ExecutableIndex(path_dirs)
+        assert index.exists("git")
+        assert index.exists("python3")
+        assert not index.exists("README")
+        assert index.find_prefix("g") == ["git", "grep", "gzip"]
+        assert index.find_prefix("g", limit=2) == ["git", "grep"]
+        assert index.find_similar("gti")[0] == "git"
+
+    def test_index_is_persisted(self, path_dirs, mock_config_dir):
+        ExecutableIndex(path_dirs)
+        with open(os.path.join(mock_config_dir, "executables.json")) as f:
+            data = json.load(f)
+        assert set(data["directories"]) == set(path_dirs)
+
+    def test_refresh_only_rescans_changed_directories(self, path_dirs):
+        index = ExecutableIndex(path_dirs)
+        assert index.refresh() == 0
+
+        _make_executable(Path(path_dirs[1]), "rg")
+        # Make sure the directory mtime changes even on coarse-grained filesystems
+        stat = os.stat(path_dirs[1])
+        os.utime(path_dirs[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert index.refresh() == 1
+        assert index.exists("rg")
+        assert ExecutableIndex(path_dirs).exists("rg")
+
+    def test_removed_directories_are_forgotten(self, path_dirs):
+        ExecutableIndex(path_dirs)
+        index = ExecutableIndex(path_dirs[:1])
+        assert not index.exists("python3")
+        assert set(index.directories) == {path_dirs[0]}
+
+@pytest.mark.parametrize("command, program", [
+    ("ls -la", "ls"),
+    ("cd /tmp", None),
+    ("export PATH=$PATH:~/bin", None),
+    ("source venv/bin/activate", None),
+    ("alias ll='ls -l'", None),
+    ("FOO=1 BAR='a b' make test", "make"),
+    ("sudo -u postgres psql", "psql"),
+    ("sudo -E env DEBUG=1 ./run.sh", "./run.sh"),
+    ("nice -n 10 tar -czf a.tgz .", "tar"),
+    ("echo 'unbalanced", "echo"),
+    ("", None),
+])
+def test_command_program_skips_builtins_and_prefixes(command, program):
+    assert command_program(command) == program
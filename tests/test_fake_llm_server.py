@@ -0,0 +1,102 @@
+import asyncio
+import json
+import pytest
+
+from promptshell.fake_llm_server import FakeLLMServer, split_tokens
+from promptshell.node import Node
+from promptshell.providers import client_pool
+from promptshell.token_utils import track_usage
+
+@pytest.fixture
+def fake_server():
+    client_pool.clear()
+    with FakeLLMServer(seed=1) as server:
+        yield server
+    client_pool.clear()
+
+def make_node(server, provider, **options):
+    config = {"MODE": "api" if provider != "ollama" else "local", "ACTIVE_API_PROVIDER": provider,
+              f"{provider.upper()}_API_KEY": "test-key", "RETRY_MAX_ATTEMPTS": "1", **server.config(), **options}
+    return Node("fake-model", "Command Executor", config=config)
+
+def test_split_tokens_keeps_whitespace():
+    assert split_tokens("ls -la  /tmp") == ["ls", " -la", "  /tmp"]
+    assert "".join(split_tokens("a\nb ")) == "a\nb"
+
+@pytest.mark.parametrize("provider", ["openai", "anthropic", "ollama"])
+def test_call_and_stream_through_each_protocol(fake_server, provider):
+    fake_server._queue = [{"content": "ls -la"}, {"content": "du -sh ~"}]
+    node = make_node(fake_server, provider)
+    node.definition = "Translate requests into shell commands."
+
+    assert node("list files") == "ls -la"
+    assert "".join(node.stream("disk usage")) == "du -sh ~"
+    assert node.context == [
+        {"role": "user", "content": "list files"}, {"role": "assistant", "content": "ls -la"},
+        {"role": "user", "content": "disk usage"}, {"role": "assistant", "content": "du -sh ~"},
+    ]
+    body = fake_server.requests[-1]["body"]
+    assert body["stream"] is True
+    assert json.dumps(body).count("Translate requests into shell commands.") == 1
+
+@pytest.mark.parametrize("provider", ["openai", "anthropic", "ollama"])
+def test_streams_report_usage(fake_server, provider):
+    fake_server.default_response = "du -sh ~\n\nShows disk usage."
+    node = make_node(fake_server, provider)
+
+    with track_usage() as usage:
+        assert "".join(node.stream("disk usage")) == "du -sh ~\n\nShows disk usage."
+    assert usage["prompt_tokens"] > 0
+    assert usage["completion_tokens"] == len(split_tokens(fake_server.default_response))
+
+    # The short explanation after the command is read to the end, which reports the usage
+    with track_usage() as usage:
+        assert node.generate_command("disk usage") == "du -sh ~"
+    assert usage["prompt_tokens"] > 0
+
+@pytest.mark.parametrize("provider", ["openai", "anthropic", "ollama"])
+def test_async_calls(fake_server, provider):
+    fake_server.default_response = "pwd"
+    node = make_node(fake_server, provider)
+
+    async def run():
+        return await asyncio.gather(*(node.acall(f"where am I {index}", remember=False) for index in range(3)))
+
+    assert asyncio.run(run()) == ["pwd", "pwd", "pwd"]
+
+def test_groq_json_mode(fake_server):
+    fake_server.default_response = '{"command": "git status"}'
+    assert make_node(fake_server, "groq")("show repo state") == "git status"
+
+def test_latency_and_token_rate_shape_the_stream(fake_server):
+    fake_server.latency = 0.2
+    fake_server.tokens_per_second = 20
+    fake_server.default_response = "one two three four five"
+    node = make_node(fake_server, "openai")
+
+    assert "".join(node.stream("count")) == "one two three four five"
+    assert node.last_timing["ttft"] >= 0.2
+    assert node.last_timing["total"] >= 0.2 + 4 / 20
+
+def test_injected_rate_limit_is_retried(fake_server):
+    fake_server._queue = [{"content": "", "status": 429, "retry_after": 0}, {"content": "pwd"}]
+    node = make_node(fake_server, "openai", RETRY_MAX_ATTEMPTS="2")
+    assert node("where am I") == "pwd"
+    assert len(fake_server.requests) == 2
+
+def test_error_rate_and_scripted_rules(fake_server):
+    fake_server.error_rate = 1.0
+    fake_server._rules = [{"match": "disk", "content": "df -h"}]
+    node = make_node(fake_server, "ollama")
+    assert node("free disk space") == "Error in processing: Ollama API call failed: 500 - {\"error\": \"Injected error 500\"}"
+    fake_server.error_rate = 0
+    assert node("free disk space") == "df -h"
+
+def test_stop_sequences_and_token_limit(fake_server):
+    fake_server.default_response = "ls -la\n\nThis lists files"
+    node = make_node(fake_server, "openai")
+    node.stop = ["\n\n"]
+    assert node("list files") == "ls -la"
+    node.stop = []
+    node.max_tokens = 1
+    assert node("list files") == "ls"
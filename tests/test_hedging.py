@@ -0,0 +1,113 @@
+import asyncio
+import time
+import pytest
+
+from promptshell.hedging import LatencyTracker, hedge
+from promptshell.node import Node
+
+def test_tracker_uses_default_until_enough_samples():
+    tracker = LatencyTracker(percentile=90, default_delay=3.0, min_samples=5, min_delay=0.0)
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        tracker.record(seconds)
+    assert tracker.delay() == 3.0
+    for seconds in (0.5, 0.6, 0.7, 0.8, 0.9, 1.0):
+        tracker.record(seconds)
+    assert tracker.delay() == 1.0
+
+def test_tracker_respects_min_delay():
+    tracker = LatencyTracker(min_samples=1, min_delay=0.25)
+    tracker.record(0.01)
+    assert tracker.delay() == 0.25
+
+def reply(text, seconds, log=None):
+    async def call():
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append(f"{text} cancelled")
+            raise
+        return text
+    return call
+
+def test_fast_primary_never_hedges():
+    started = []
+    async def secondary():
+        started.append(True)
+        return "secondary"
+    assert asyncio.run(hedge(reply("primary", 0.01), secondary, delay=0.5)) == ("primary", "primary")
+    assert started == []
+
+def test_slow_primary_loses_and_is_cancelled():
+    log = []
+    start = time.perf_counter()
+    result = asyncio.run(hedge(reply("primary", 2.0, log), reply("secondary", 0.05), delay=0.1))
+    assert result == ("secondary", "secondary")
+    assert time.perf_counter() - start < 1.0
+    assert log == ["primary cancelled"]
+
+def test_failed_primary_hedges_immediately():
+    async def failing():
+        raise ConnectionError("refused")
+    start = time.perf_counter()
+    assert asyncio.run(hedge(failing, reply("secondary", 0.01), delay=5.0)) == ("secondary", "secondary")
+    assert time.perf_counter() - start < 1.0
+
+def test_both_failing_raises_last_error():
+    async def failing():
+        raise ConnectionError("refused")
+    async def timeout():
+        raise TimeoutError("too slow")
+    with pytest.raises(TimeoutError):
+        asyncio.run(hedge(failing, timeout, delay=0.01))
+
+def test_node_hedges_to_configured_provider(mocker):
+    config = {
+        "MODE": "local", "OLLAMA_MODEL": "llama3", "HEDGE_PROVIDER": "openai", "HEDGE_MODEL": "gpt-4o-mini",
+        "HEDGE_DELAY": "0.05",
+    }
+    node = Node("llama3", "Hedge Tester", config=config)
+    assert node.hedge_node.provider == "openai"
+    assert node.hedge_node.model_name == "gpt-4o-mini"
+
+    async def slow(prompt):
+        await asyncio.sleep(2.0)
+        return "from ollama"
+
+    async def fast(prompt):
+        return "from openai"
+
+    mocker.patch.object(node, "_acall_ollama", side_effect=slow)
+    mocker.patch.object(node.hedge_node, "_acall_openai", side_effect=fast)
+    assert node("list files") == "from openai"
+    assert node.last_winner == "secondary"
+    assert node.context[-1] == {"role": "assistant", "content": "from openai"}
+
+def test_hedging_is_off_without_provider():
+    node = Node("llama3", "Tester", config={"MODE": "local", "OLLAMA_MODEL": "llama3"})
+    assert node.hedge_node is None
+
+def test_hedge_legs_are_retried_and_recorded(mocker):
+    from promptshell.provider_router import router
+
+    config = {
+        "MODE": "local", "OLLAMA_MODEL": "llama3", "HEDGE_PROVIDER": "openai", "HEDGE_MODEL": "gpt-4o-mini",
+        "HEDGE_DELAY": "5", "RETRY_MAX_ATTEMPTS": "2", "RETRY_MAX_DELAY": "0.01",
+    }
+    node = Node("llama3", "Hedge Tester", config=config)
+    attempts = []
+
+    async def flaky(prompt):
+        attempts.append(prompt)
+        if len(attempts) == 1:
+            raise ConnectionError("reset")
+        return "from openai"
+
+    mocker.patch.object(node, "_acall_ollama", side_effect=ValueError("unknown model"))
+    mocker.patch.object(node.hedge_node, "_acall_openai", side_effect=flaky)
+    assert node("list files") == "from openai"
+    assert len(attempts) == 2
+    status = router.status()
+    assert status["ollama"]["last_error"] == "unknown model"
+    assert status["openai"]["consecutive_failures"] == 0
+    assert router.decisions[-1] == {**router.decisions[-1], "requested": "ollama", "used": "openai"}
@@ -0,0 +1,125 @@
+import asyncio
+import time
+import pytest
+
+from unittest.mock import MagicMock
+from promptshell.provider_router import ProviderRouter, router
+from promptshell.node import Node
+from promptshell.rate_limit import ProviderHTTPError
+from promptshell.ai_terminal_assistant import AITerminalAssistant
+
+def test_circuit_opens_after_repeated_failures():
+    breaker = ProviderRouter(failure_threshold=2, cooldown=60)
+    breaker.record_failure("openai", RuntimeError("503"))
+    assert breaker.is_available("openai")
+    breaker.record_failure("openai", RuntimeError("503"))
+    assert not breaker.is_available("openai")
+    assert breaker.status()["openai"]["state"] == "open"
+    assert breaker.status()["openai"]["error_rate"] == 1.0
+
+def test_open_circuit_half_opens_after_cooldown():
+    breaker = ProviderRouter(failure_threshold=1, cooldown=0.01)
+    breaker.record_failure("openai", RuntimeError("503"))
+    time.sleep(0.02)
+    assert breaker.is_available("openai")
+    assert breaker.status()["openai"]["state"] == "half-open"
+    breaker.record_failure("openai", RuntimeError("503"))
+    assert breaker.status()["openai"]["state"] == "open"
+
+def test_route_keeps_primary_and_orders_fallbacks_by_latency():
+    breaker = ProviderRouter()
+    breaker.record_success("groq", 0.2)
+    breaker.record_success("deepseek", 1.5)
+    candidates = [("openai", "gpt-4o"), ("deepseek", "deepseek-chat"), ("groq", "llama3")]
+    assert breaker.route(candidates) == [("openai", "gpt-4o"), ("groq", "llama3"), ("deepseek", "deepseek-chat")]
+
+def test_route_tries_primary_when_everything_is_down():
+    breaker = ProviderRouter(failure_threshold=1, cooldown=60)
+    breaker.record_failure("openai", RuntimeError("503"))
+    assert breaker.route([("openai", "gpt-4o")]) == [("openai", "gpt-4o")]
+
+def test_probe_closes_circuit():
+    breaker = ProviderRouter(failure_threshold=1, cooldown=0.0, probe_interval=0.01)
+    probe = MagicMock(return_value=True)
+    breaker.record_failure("openai", RuntimeError("503"), probe=probe)
+    assert not breaker.is_available("openai")
+    deadline = time.time() + 2
+    while breaker.status()["openai"]["state"] != "closed" and time.time() < deadline:
+        time.sleep(0.01)
+    assert breaker.status()["openai"]["state"] == "closed"
+    probe.assert_called()
+
+def test_failed_probe_keeps_circuit_open():
+    breaker = ProviderRouter(failure_threshold=1, cooldown=60)
+    breaker.record_failure("openai", RuntimeError("503"))
+    assert not breaker.probe_now("openai", MagicMock(side_effect=ConnectionError("refused")))
+    assert breaker.status()["openai"]["state"] == "open"
+
+@pytest.fixture
+def failing_openai_node(mocker):
+    config = {
+        "MODE": "api", "ACTIVE_API_PROVIDER": "openai", "OPENAI_API_KEY": "sk",
+        "FALLBACK_PROVIDERS": "deepseek:deepseek-chat", "LOCAL_MODEL": "llama3", "FALLBACK_TO_LOCAL": "true",
+        "RETRY_MAX_ATTEMPTS": "1",
+    }
+    node = Node("gpt-4o", "Command Executor", config=config)
+    mocker.patch.object(Node, "_probe", return_value=False)
+    mocker.patch.object(Node, "_acall_openai", side_effect=ConnectionError("connection reset"))
+    return node
+
+def test_node_candidates_include_fallbacks_and_local_model(failing_openai_node):
+    assert failing_openai_node._candidates() == [
+        ("openai", "gpt-4o"), ("deepseek", "deepseek-chat"), ("ollama", "llama3"),
+    ]
+
+def test_node_fails_over_and_skips_open_circuit(failing_openai_node, mocker):
+    deepseek = mocker.patch.object(Node, "_acall_deepseek", return_value="ls -la")
+    for _ in range(3):
+        assert failing_openai_node("list files") == "ls -la"
+    assert failing_openai_node.last_provider == "deepseek"
+    assert router.status()["openai"]["state"] == "open"
+
+    failing_openai_node("list files")
+    assert Node._acall_openai.call_count == 3  # Open circuit is no longer tried
+    assert deepseek.call_count == 4
+    assert router.decisions[-1] == {**router.decisions[-1], "requested": "openai", "used": "deepseek"}
+
+def test_node_reports_primary_error_when_all_candidates_fail(failing_openai_node, mocker):
+    mocker.patch.object(Node, "_acall_deepseek", side_effect=ConnectionError("deepseek down"))
+    mocker.patch.object(Node, "_acall_ollama", side_effect=ConnectionError("ollama down"))
+    assert failing_openai_node("list files") == "Error in processing: connection reset"
+
+def test_permanent_errors_do_not_fail_over(failing_openai_node, mocker):
+    mocker.patch.object(Node, "_acall_openai", side_effect=ProviderHTTPError("401 - invalid api key", 401))
+    deepseek = mocker.patch.object(Node, "_acall_deepseek", return_value="ls -la")
+    assert failing_openai_node("list files") == "Error in processing: 401 - invalid api key"
+    assert deepseek.call_count == 0
+
+def test_local_fallback_is_off_by_default():
+    node = Node("gpt-4o", "Command Executor", config={"MODE": "api", "ACTIVE_API_PROVIDER": "openai",
+                                                       "LOCAL_MODEL": "llama3"})
+    assert node._candidates() == [("openai", "gpt-4o")]
+
+@pytest.mark.usefixtures("mock_config_dir")
+def test_status_report_lists_providers(failing_openai_node, mocker):
+    mocker.patch.object(Node, "_acall_deepseek", return_value="ls -la")
+    failing_openai_node("list files")
+    report = AITerminalAssistant("test-model").status_report()
+    assert "openai" in report and "deepseek" in report
+    assert "openai -> deepseek (failover)" in report
+
+def test_unreachable_ollama_fails_over():
+    from promptshell.fake_llm_server import FakeLLMServer
+    from promptshell.providers import client_pool
+
+    client_pool.clear()
+    with FakeLLMServer(default_response="ls -la") as server:
+        config = {
+            "MODE": "local", "LOCAL_MODEL": "llama3", "OLLAMA_HOST": "http://127.0.0.1:9", "RETRY_MAX_ATTEMPTS": "1",
+            "FALLBACK_PROVIDERS": "openai:fake-model", "OPENAI_API_KEY": "test-key", **server.config(["openai"]),
+        }
+        node = Node("llama3", "Command Executor", config=config)
+        assert node("list files") == "ls -la"
+        assert node.last_provider == "openai"
+        assert asyncio.run(node.acall("list files", remember=False)) == "ls -la"
+    client_pool.clear()
@@ -0,0 +1,307 @@
+import asyncio
+import pytest
+
+from unittest.mock import AsyncMock, MagicMock
+from promptshell.node import Node
+from promptshell.providers import ClientPool, client_pool, ollama_base_url
+
+def test_client_pool_reuses_clients_per_endpoint():
+    pool = ClientPool()
+    factory = MagicMock(side_effect=lambda: object())
+
+    first = pool.get("openai", "key-1", factory)
+    assert pool.get("openai", "key-1", factory) is first
+    assert pool.get("openai", "key-2", factory) is not first
+    assert pool.get("openai", "key-1", factory, base_url="http://localhost:8000/v1") is not first
+    assert factory.call_count == 3
+
+    stats = pool.client_stats()["openai"]
+    assert stats["created"] == 3
+    assert stats["pool_hits"] == 1
+    assert stats["pool_hit_ratio"] == 0.25
+
+def test_client_pool_clear_closes_clients():
+    pool = ClientPool()
+    client = MagicMock()
+    pool.get("groq", "key", lambda: client)
+    pool.clear()
+    client.close.assert_called_once()
+    assert pool.client_stats() == {}
+
+def test_client_pool_keys_async_clients_by_loop_object():
+    pool = ClientPool()
+    factory = MagicMock(side_effect=lambda: object())
+
+    async def get():
+        return pool.get("openai", "key", factory, bound_to_loop=True)
+
+    first_loop = asyncio.new_event_loop()
+    first = first_loop.run_until_complete(get())
+    assert first_loop.run_until_complete(get()) is first
+    first_loop.close()
+
+    # A new loop may reuse the closed loop's id; it must never get the old loop's client
+    second_loop = asyncio.new_event_loop()
+    try:
+        assert second_loop.run_until_complete(get()) is not first
+        assert all(not key[4].is_closed() for key in pool._clients)
+    finally:
+        second_loop.close()
+
+@pytest.fixture
+def fake_openai(mocker):
+    client_pool.clear()
+    openai_module = MagicMock()
+    response = MagicMock(choices=[MagicMock(message=MagicMock(content="ls -la"))])
+    openai_module.AsyncOpenAI.return_value.chat.completions.create = AsyncMock(return_value=response)
+    mocker.patch('promptshell.node.load_sdk', return_value=openai_module)
+    yield openai_module
+    client_pool.clear()
+
+def test_nodes_share_one_client_per_endpoint(fake_openai):
+    config = {"MODE": "api", "ACTIVE_API_PROVIDER": "openai", "OPENAI_API_KEY": "sk-test"}
+    executor = Node("gpt-4o", "Command Executor", config=config)
+    debugger = Node("gpt-4o", "Debugger Expert", config=config)
+
+    assert executor("list files") == "ls -la"
+    assert debugger("why did it fail") == "ls -la"
+    fake_openai.AsyncOpenAI.assert_called_once_with(api_key="sk-test", base_url=None, max_retries=0)
+    assert client_pool.client_stats()["openai"]["pool_hits"] == 1
+
+@pytest.mark.parametrize("host, expected", [
+    (None, "http://localhost:11434"),
+    ("", "http://localhost:11434"),
+    ("127.0.0.1:11434", "http://127.0.0.1:11434"),
+    ("https://ollama.internal:443/", "https://ollama.internal:443"),
+])
+def test_ollama_base_url(host, expected):
+    assert ollama_base_url(host) == expected
+
+def test_ollama_uses_configured_host_and_keep_alive(mocker):
+    client_pool.clear()
+    session = MagicMock()
+    session.post = AsyncMock(return_value=MagicMock(status_code=200))
+    session.post.return_value.json.return_value = {"message": {"role": "assistant", "content": "pwd"}}
+    mocker.patch('promptshell.node.create_async_http_client', return_value=session)
+    config = {"MODE": "local", "OLLAMA_HOST": "10.0.0.5:11434", "OLLAMA_KEEP_ALIVE": "-1"}
+
+    node = Node("llama3", "Command Executor", config=config)
+    assert node("where am I") == "pwd"
+    assert node("where am I") == "pwd"
+
+    url = session.post.call_args.args[0]
+    payload = session.post.call_args.kwargs["json"]
+    assert url == "http://10.0.0.5:11434/api/chat"
+    assert payload["keep_alive"] == -1
+    assert payload["messages"][-3:] == [
+        {"role": "user", "content": "where am I"},
+        {"role": "assistant", "content": "pwd"},
+        {"role": "user", "content": "where am I"},
+    ]
+    assert client_pool.client_stats()["ollama"] == {"created": 1, "pool_hits": 1, "pool_hit_ratio": 0.5}
+    client_pool.clear()
+
+def test_stream_yields_chunks_and_records_timing(fake_openai):
+    chunks = [MagicMock(choices=[MagicMock(delta=MagicMock(content=text))]) for text in ("Use ", "top", None)]
+    fake_openai.OpenAI.return_value.chat.completions.create.return_value = MagicMock(__iter__=lambda self: iter(chunks))
+    config = {"MODE": "api", "ACTIVE_API_PROVIDER": "openai", "OPENAI_API_KEY": "sk-test"}
+    node = Node("gpt-4o", "Question Answerer", config=config)
+
+    assert list(node.stream("monitor cpu?")) == ["Use ", "top"]
+    assert node.context[-1] == {"role": "assistant", "content": "Use top"}
+    assert 0 <= node.last_timing["ttft"] <= node.last_timing["total"]
+    assert fake_openai.OpenAI.return_value.chat.completions.create.call_args.kwargs["stream"] is True
+
+def test_stream_reports_errors_inline(fake_openai):
+    fake_openai.OpenAI.return_value.chat.completions.create.side_effect = RuntimeError("boom")
+    config = {"MODE": "api", "ACTIVE_API_PROVIDER": "openai", "OPENAI_API_KEY": "sk-test"}
+    node = Node("gpt-4o", "Question Answerer", config=config)
+
+    assert list(node.stream("monitor cpu?")) == ["Error in processing: boom"]
+    assert node.context == []
+
+@pytest.fixture
+def fake_async_openai(mocker):
+    client_pool.clear()
+    openai_module = MagicMock()
+
+    async def create(**kwargs):
+        return MagicMock(choices=[MagicMock(message=MagicMock(content=f" echo {kwargs['model']} "))])
+
+    openai_module.AsyncOpenAI.return_value.chat.completions.create = create
+    mocker.patch('promptshell.node.load_sdk', return_value=openai_module)
+    yield openai_module
+    client_pool.clear()
+
+def test_acall_uses_async_client_and_remembers(fake_async_openai):
+    config = {"MODE": "api", "ACTIVE_API_PROVIDER": "deepseek", "DEEPSEEK_API_KEY": "sk-test"}
+    node = Node("deepseek-chat", "Tester", config=config)
+
+    async def run():
+        return await asyncio.gather(node.acall("first"), node.acall("second", remember=False))
+
+    assert asyncio.run(run()) == ["echo deepseek-chat", "echo deepseek-chat"]
+    fake_async_openai.AsyncOpenAI.assert_called_once_with(
+        api_key="sk-test", base_url="https://api.deepseek.com/v1", max_retries=0
+    )
+    assert [message["content"] for message in node.context] == ["first", "echo deepseek-chat"]
+
+def test_async_clients_are_pooled_per_event_loop(fake_async_openai):
+    node = Node("gpt-4o", "Tester", config={"MODE": "api", "ACTIVE_API_PROVIDER": "openai", "OPENAI_API_KEY": "sk"})
+    asyncio.run(node.acall("one"))
+    asyncio.run(node.acall("two"))
+    assert fake_async_openai.AsyncOpenAI.call_count == 2
+
+def test_acall_reports_errors(mocker):
+    node = Node("llama3", "Tester", config={"MODE": "local", "OLLAMA_MODEL": "llama3", "RETRY_MAX_ATTEMPTS": "1"})
+    mocker.patch.object(node, "_acall_ollama", side_effect=ConnectionError("refused"))
+    assert asyncio.run(node.acall("hi")) == "Error in processing: refused"
+    assert node.context == []
+
+def test_system_prefix_is_identical_across_calls(fake_openai):
+    config = {"MODE": "api", "ACTIVE_API_PROVIDER": "openai", "OPENAI_API_KEY": "sk-test"}
+    node = Node("gpt-4o", "Command Executor", config=config)
+    node.definition = "You translate requests into shell commands."
+
+    node("list files")
+    node("show disk usage")
+    create = fake_openai.AsyncOpenAI.return_value.chat.completions.create
+    first, second = (call.kwargs["messages"] for call in create.call_args_list)
+    assert first[0] == second[0] == {"role": "system", "content": node.definition}
+    assert [message["role"] for message in second] == ["system", "user", "assistant", "user"]
+    assert second[1:3] == [{"role": "user", "content": "list files"}, {"role": "assistant", "content": "ls -la"}]
+
+def test_provider_specific_message_shapes():
+    node = Node("model", "Tester", config={"MODE": "local"})
+    messages = [
+        {"role": "system", "content": "Definition"},
+        {"role": "system", "content": "Summary of earlier conversation: user: a"},
+        {"role": "user", "content": "list files"},
+        {"role": "assistant", "content": "ls"},
+        {"role": "user", "content": "again"},
+    ]
+
+    anthropic = node._anthropic_kwargs(messages)
+    assert anthropic["system"] == "Definition\n\nSummary of earlier conversation: user: a"
+    assert anthropic["messages"] == messages[2:]
+
+    groq = node._groq_json_kwargs(messages)
+    assert groq["messages"][0]["content"].startswith("Definition\n\n")
+    assert groq["messages"][-1]["content"] == "again. Return ONLY a JSON object with a 'command' key."
+    assert messages[-1]["content"] == "again"
+
+    payload = node._ollama_payload(messages, stream=False)
+    assert payload["messages"] == [{"role": "system", "content": anthropic["system"]}] + messages[2:]
+
+def test_google_uses_system_instruction(mocker):
+    client_pool.clear()
+    genai = MagicMock()
+    mocker.patch('promptshell.node.load_sdk', return_value=genai)
+    node = Node("gemini-pro", "Tester", config={"MODE": "api", "GOOGLE_API_KEY": "key"}, provider="google")
+    messages = [
+        {"role": "system", "content": "Definition"},
+        {"role": "system", "content": "Summary"},
+        {"role": "user", "content": "list files"},
+        {"role": "assistant", "content": "ls"},
+        {"role": "user", "content": "again"},
+    ]
+
+    model, contents = node._google_request("key", messages)
+    assert node._google_request("key", messages)[0] is model
+    genai.GenerativeModel.assert_called_once_with("gemini-pro", system_instruction="Definition")
+    assert contents == [
+        {"role": "user", "parts": ["Summary", "list files"]},
+        {"role": "model", "parts": ["ls"]},
+        {"role": "user", "parts": ["again"]},
+    ]
+    client_pool.clear()
+
+def test_anthropic_cache_breakpoints_are_opt_in():
+    messages = [
+        {"role": "system", "content": "Definition"},
+        {"role": "user", "content": "list files"},
+        {"role": "assistant", "content": "ls"},
+        {"role": "user", "content": "again"},
+    ]
+    plain = Node("claude", "Tester", config={"MODE": "api"}, provider="anthropic")
+    assert plain._anthropic_kwargs(messages)["system"] == "Definition"
+
+    cached = Node("claude", "Tester", config={"MODE": "api", "PROMPT_CACHE": "true"}, provider="anthropic")
+    kwargs = cached._anthropic_kwargs(messages)
+    assert kwargs["system"] == [{"type": "text", "text": "Definition", "cache_control": {"type": "ephemeral"}}]
+    assert kwargs["messages"][1]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert kwargs["messages"][2] == {"role": "user", "content": "again"}
+    assert messages[2] == {"role": "assistant", "content": "ls"}
+
+def test_cached_tokens_are_recorded_per_role(fake_openai):
+    from promptshell.token_utils import prompt_cache_stats
+
+    usage = MagicMock(prompt_tokens=1200, completion_tokens=4)
+    usage.prompt_tokens_details.cached_tokens = 1024
+    fake_openai.AsyncOpenAI.return_value.chat.completions.create.return_value.usage = usage
+    config = {"MODE": "api", "ACTIVE_API_PROVIDER": "openai", "OPENAI_API_KEY": "sk-test", "PROMPT_CACHE": "true"}
+    node = Node("gpt-4o", "Command Executor", config=config)
+
+    assert node("list files") == "ls -la"
+    create = fake_openai.AsyncOpenAI.return_value.chat.completions.create
+    assert create.call_args.kwargs["extra_body"] == {"prompt_cache_key": "promptshell-Command Executor"}
+    stats = prompt_cache_stats.stats()["Command Executor"]
+    assert stats["cached_tokens"] == 1024
+    assert stats["hit_rate"] == round(1024 / 1200, 3)
+
+def test_streamed_usage_is_recorded_per_role(fake_openai):
+    from promptshell.token_utils import prompt_cache_stats
+
+    usage = MagicMock(prompt_tokens=1200, completion_tokens=4)
+    usage.prompt_tokens_details.cached_tokens = 1024
+    chunks = [MagicMock(usage=None, choices=[MagicMock(delta=MagicMock(content="ls -la\n"))]),
+              MagicMock(usage=usage, choices=[])]
+    fake_openai.OpenAI.return_value.chat.completions.create.return_value = MagicMock(__iter__=lambda self: iter(chunks))
+    config = {"MODE": "api", "ACTIVE_API_PROVIDER": "openai", "OPENAI_API_KEY": "sk-test"}
+    node = Node("gpt-4o", "Command Executor", config=config)
+
+    assert node.generate_command("list files") == "ls -la"
+    create = fake_openai.OpenAI.return_value.chat.completions.create
+    assert create.call_args.kwargs["stream_options"] == {"include_usage": True}
+
+    list(node.stream("list files again"))
+    stats = prompt_cache_stats.stats()["Command Executor"]
+    assert stats["calls"] == 2
+    assert stats["cached_tokens"] == 2048
+
+def test_anthropic_prompt_tokens_include_cache_reads():
+    from promptshell.token_utils import track_usage
+
+    node = Node("claude", "Tester", config={"MODE": "api"}, provider="anthropic")
+    response = MagicMock()
+    response.usage = MagicMock(input_tokens=20, output_tokens=3, cache_read_input_tokens=1000, cache_creation_input_tokens=0)
+    with track_usage() as usage:
+        node._record_usage(response)
+    assert usage == {"prompt_tokens": 1020, "completion_tokens": 3, "cached_tokens": 1000, "cache_write_tokens": 0}
+
+def test_ollama_context_size_grows_in_buckets_and_never_shrinks():
+    config = {"MODE": "local", "OLLAMA_HOST": "ctx-test:11434"}
+    node = Node("llama3", "Tester", max_tokens=256, config=config)
+    short = [{"role": "user", "content": "hi"}]
+    long = [{"role": "user", "content": "x" * 4 * 5000}]
+
+    assert node._ollama_num_ctx(short) == 2048
+    assert node._ollama_num_ctx(long) == 8192
+    assert node._ollama_num_ctx(short) == 8192
+    assert node._ollama_num_ctx([{"role": "user", "content": "x" * 4 * 100000}]) == 32768
+
+    fixed = Node("llama3", "Tester", config={**config, "OLLAMA_NUM_CTX": "4096"})
+    assert fixed._ollama_num_ctx(long) == 4096
+
+@pytest.mark.parametrize("provider, model, reasoning", [
+    ("openai", "o3-mini", True), ("openai", "gpt-4o", False), ("deepseek", "deepseek-reasoner", True),
+    ("openrouter", "google/gemini-2.0-flash-thinking-exp:free", True), ("ollama", "deepseek-r1:8b", True),
+    ("groq", "llama-3.1-8b-instant", False),
+])
+def test_reasoning_models_get_no_token_cap_or_stop(provider, model, reasoning):
+    node = Node(model, "Tester", max_tokens=256, config={"MODE": "api"}, stop=["\nUser:"], provider=provider)
+    assert node.reasoning_model is reasoning
+    options = node._completion_options(provider)
+    assert (options == {}) is reasoning
+    assert ("stop" in node._ollama_payload([], stream=False)["options"]) is not reasoning
+    assert (node._google_generation_config() is None) is reasoning
@@ -0,0 +1,122 @@
+import time
+import httpx
+import pytest
+
+from unittest.mock import AsyncMock, MagicMock
+from concurrent.futures import ThreadPoolExecutor
+from promptshell.rate_limit import (
+    ProviderHTTPError, RetryPolicy, TokenBucket, get_status_code, parse_duration, retry_after,
+)
+from promptshell.node import Node
+
+def http_error(status_code, headers=None):
+    return ProviderHTTPError(f"HTTP {status_code}", status_code, headers)
+
+@pytest.mark.parametrize("value, expected", [
+    ("2", 2.0), ("1.5", 1.5), ("20ms", 0.02), ("1s", 1.0), ("6m0s", 360.0), ("1m30.5s", 90.5), ("soon", None),
+])
+def test_parse_duration(value, expected):
+    assert parse_duration(value) == expected
+
+def test_retry_after_headers():
+    assert retry_after(http_error(429, {"Retry-After": "3"})) == 3.0
+    assert retry_after(http_error(429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after(http_error(429, {"x-ratelimit-reset-requests": "1s", "x-ratelimit-reset-tokens": "6m0s"})) == 360.0
+    assert retry_after(http_error(500)) is None
+
+def test_status_code_from_sdk_style_errors():
+    assert get_status_code(MagicMock(spec=["status_code"], status_code=503)) == 503
+    assert get_status_code(MagicMock(spec=["response"], response=MagicMock(status_code=429))) == 429
+    assert get_status_code(ValueError("bad")) is None
+
+@pytest.mark.parametrize("error, retryable", [
+    (http_error(429), True), (http_error(503), True), (http_error(529), True),
+    (http_error(400), False), (http_error(401), False),
+    (ConnectionError("reset"), True), (TimeoutError(), True), (ValueError("bad json"), False),
+    (httpx.ConnectError("All connection attempts failed"), True), (httpx.ReadError("connection dropped"), True),
+])
+def test_is_retryable(error, retryable):
+    assert RetryPolicy.is_retryable(error) is retryable
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+    delays = [policy.delay(attempt, http_error(503)) for attempt in range(1, 8) for _ in range(20)]
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert len(set(delays)) > 1
+
+def test_retry_after_takes_precedence():
+    policy = RetryPolicy(base_delay=0.1, max_delay=10.0)
+    assert 5.0 <= policy.delay(1, http_error(429, {"retry-after": "5"})) <= 5.05
+
+def test_call_retries_until_success(mocker):
+    sleep = mocker.patch("promptshell.rate_limit.time.sleep")
+    func = MagicMock(side_effect=[http_error(429, {"retry-after": "1"}), http_error(503), "ok"])
+    assert RetryPolicy(max_attempts=3).call(func) == "ok"
+    assert func.call_count == 3
+    assert sleep.call_count == 2
+
+def test_call_does_not_retry_client_errors(mocker):
+    mocker.patch("promptshell.rate_limit.time.sleep")
+    func = MagicMock(side_effect=http_error(401))
+    with pytest.raises(ProviderHTTPError):
+        RetryPolicy().call(func)
+    assert func.call_count == 1
+
+def test_token_bucket_limits_rate(tmp_path):
+    bucket = TokenBucket("openai:key", requests_per_minute=600, burst=2, directory=str(tmp_path))
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    wait = bucket.try_acquire()
+    assert 0 < wait <= 0.1
+
+def test_token_bucket_is_shared_through_state_file(tmp_path):
+    first = TokenBucket("openai:key", requests_per_minute=60, burst=1, directory=str(tmp_path))
+    second = TokenBucket("openai:key", requests_per_minute=60, burst=1, directory=str(tmp_path))
+    other_key = TokenBucket("openai:other", requests_per_minute=60, burst=1, directory=str(tmp_path))
+    assert first.try_acquire() == 0
+    assert second.try_acquire() > 0
+    assert other_key.try_acquire() == 0
+
+def test_token_bucket_pause(tmp_path):
+    bucket = TokenBucket("groq:key", requests_per_minute=600, burst=5, directory=str(tmp_path))
+    bucket.pause(2.0)
+    assert bucket.try_acquire() > 1.5
+
+def test_concurrent_acquire_respects_rate(tmp_path):
+    bucket = TokenBucket("deepseek:key", requests_per_minute=1200, burst=1, directory=str(tmp_path))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: bucket.acquire(), range(6)))
+    assert time.perf_counter() - start >= 5 / 20 * 0.9  # 20 requests per second after the first
+
+def test_node_retries_rate_limited_call(mock_config_dir, mocker):
+    mocker.patch("promptshell.rate_limit.time.sleep")
+    config = {"MODE": "api", "ACTIVE_API_PROVIDER": "openai", "OPENAI_API_KEY": "sk", "RATE_LIMIT_RPM": "6000"}
+    node = Node("gpt-4o", "Tester", config=config)
+    call = mocker.patch.object(Node, "_acall_openai", side_effect=[http_error(429, {"retry-after": "0"}), "ls"])
+    assert node("list files") == "ls"
+    assert call.call_count == 2
+
+def test_stream_retries_until_first_chunk(mock_config_dir, mocker):
+    mocker.patch("promptshell.rate_limit.time.sleep")
+    config = {"MODE": "api", "ACTIVE_API_PROVIDER": "openai", "OPENAI_API_KEY": "sk", "RATE_LIMIT_RPM": "6000",
+              "FALLBACK_TO_LOCAL": "false"}
+    node = Node("gpt-4o", "Tester", config=config)
+
+    def fake_stream(messages):
+        yield "ls"
+        yield " -la"
+
+    stream = mocker.patch.object(Node, "_stream_openai", side_effect=[http_error(503), fake_stream(None)])
+    assert "".join(node.stream("list files")) == "ls -la"
+    assert stream.call_count == 2
+
+def test_node_retries_dropped_ollama_connection(mock_config_dir, mocker):
+    mocker.patch("promptshell.rate_limit.time.sleep")
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"message": {"role": "assistant", "content": "ls"}}
+    client = MagicMock(post=AsyncMock(side_effect=[httpx.ReadError("connection dropped"), response]))
+    mocker.patch("promptshell.node.create_async_http_client", return_value=client)
+    node = Node("llama3", "Tester", config={"MODE": "local", "OLLAMA_HOST": "retry-test:11434", "RETRY_MAX_DELAY": "0.01"})
+    assert node("list files") == "ls"
+    assert client.post.call_count == 2
@@ -0,0 +1,60 @@
+import time
+import pytest
+
+from unittest.mock import MagicMock
+from promptshell.response_cache import ResponseCache
+from promptshell.ai_terminal_assistant import AITerminalAssistant
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(path=str(tmp_path / "cache.sqlite3"), max_entries=2, ttl=60)
+
+def test_key_ignores_case_whitespace_and_punctuation(cache, tmp_path):
+    key = cache.make_key("List  large files!", "linux", "llama3", "ollama", str(tmp_path))
+    assert key == cache.make_key("list large files", "linux", "llama3", "ollama", str(tmp_path))
+    assert key != cache.make_key("list large files", "windows", "llama3", "ollama", str(tmp_path))
+    assert key != cache.make_key("list large files", "linux", "gpt-4o", "openai", str(tmp_path))
+
+def test_get_put_and_counters(cache):
+    assert cache.get("k1") is None
+    cache.put("k1", "list files", "ls")
+    assert cache.get("k1") == "ls"
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+
+def test_lru_eviction(cache):
+    cache.put("k1", "a", "ls")
+    cache.put("k2", "b", "pwd")
+    cache.get("k1")
+    cache.put("k3", "c", "whoami")
+    assert cache.get("k2") is None
+    assert cache.get("k1") == "ls"
+    assert cache.get("k3") == "whoami"
+
+def test_ttl_expiry(cache, mocker):
+    cache.put("k1", "a", "ls")
+    mocker.patch('promptshell.response_cache.time.time', return_value=time.time() + 120)
+    assert cache.get("k1") is None
+
+@pytest.mark.usefixtures("mock_config_dir")
+class TestExecuteCommandCache:
+    def _run(self, assistant, mocker, user_input):
+        mocker.patch('questionary.confirm', return_value=MagicMock(ask=lambda: True))
+        mocker.patch.object(assistant, "execute_command_with_live_output", return_value=("", "", 0))
+        return assistant.execute_command(user_input)
+
+    def test_second_request_is_served_from_cache(self, mocker):
+        assistant = AITerminalAssistant("test-model")
+        generate = mocker.patch.object(assistant.command_executor, "generate_command", return_value="ls -la")
+
+        self._run(assistant, mocker, "show all entries")
+        self._run(assistant, mocker, "Show all entries.")
+        assert generate.call_count == 1
+        assert assistant.response_cache.stats()["hits"] == 1
+
+    def test_fresh_prefix_bypasses_cache(self, mocker):
+        assistant = AITerminalAssistant("test-model")
+        generate = mocker.patch.object(assistant.command_executor, "generate_command", return_value="ls -la")
+
+        self._run(assistant, mocker, "show all entries")
+        self._run(assistant, mocker, "--fresh show all entries")
+        assert generate.call_count == 2
@@ -0,0 +1,74 @@
+import pytest
+
+from unittest.mock import MagicMock
+from promptshell.semantic_cache import SemanticCache, ngram_vector
+from promptshell.ai_terminal_assistant import AITerminalAssistant
+
+@pytest.fixture
+def cache(tmp_path):
+    return SemanticCache(path=str(tmp_path / "cache.sqlite3"), threshold=0.8, max_entries=3)
+
+def test_vectors_are_normalized():
+    vector = ngram_vector("Show big files")
+    assert sum(weight * weight for weight in vector.values()) == pytest.approx(1.0)
+    assert ngram_vector("   ") == {}
+
+def test_near_duplicate_matches(cache):
+    cache.add("show big files", "du -ah . | sort -rh | head", "linux", "/home/u")
+    command, score, original = cache.lookup("Show the big files", "linux", "/home/u")
+    assert command == "du -ah . | sort -rh | head"
+    assert original == "show big files"
+    assert score >= 0.8
+
+@pytest.mark.parametrize("paraphrase", ["list large files here", "which files are huge"])
+def test_paraphrases_match(cache, paraphrase):
+    cache.add("show big files", "du -ah . | sort -rh | head", "linux", "/home/u")
+    assert cache.lookup(paraphrase, "linux", "/home/u")[0] == "du -ah . | sort -rh | head"
+
+@pytest.mark.parametrize("original, changed", [
+    ("find files larger than 10MB", "find files larger than 100MB"),
+    ("delete report_2023", "delete report_2024"),
+    ("count lines in main.py", "count lines in app.py"),
+    ("grep for 'TODO' in src", "grep for 'FIXME' in src"),
+    ("compress the logs folder", "decompress the logs folder"),
+    ("list files in downloads sorted by size", "delete files in downloads sorted by size"),
+    ("delete files in downloads sorted by size", "list files in downloads sorted by size"),
+    ("turn on wifi", "turn off wifi"),
+    ("turn off wifi", "turn on wifi"),
+])
+def test_changed_arguments_and_opposites_miss(cache, original, changed):
+    cache.add(original, "some command", "linux", "/home/u")
+    assert cache.lookup(original, "linux", "/home/u") is not None
+    assert cache.lookup(changed, "linux", "/home/u") is None
+
+def test_different_intent_misses(cache):
+    cache.add("show big files", "du -ah . | sort -rh | head", "linux", "/home/u")
+    assert cache.lookup("delete big files", "linux", "/home/u") is None
+    assert cache.stats()["misses"] == 1
+
+def test_context_must_match(cache):
+    cache.add("show big files", "du -ah . | sort -rh | head", "linux", "/home/u")
+    assert cache.lookup("show big files", "windows", "/home/u") is None
+    assert cache.lookup("show big files", "linux", "/tmp") is None
+
+def test_entries_persist_and_are_capped(cache, tmp_path):
+    for index in range(5):
+        cache.add(f"request number {index}", f"echo {index}", "linux", "/")
+    assert cache.stats()["entries"] == 3
+    reopened = SemanticCache(path=str(tmp_path / "cache.sqlite3"), max_entries=3)
+    assert reopened.stats()["entries"] == 3
+    assert reopened.lookup("request number 4", "linux", "/")[0] == "echo 4"
+    assert reopened.lookup("request number 0", "linux", "/") is None
+
+@pytest.mark.usefixtures("mock_config_dir")
+def test_execute_command_reuses_similar_request(mocker, tmp_path):
+    mocker.patch('os.getcwd', return_value=str(tmp_path))
+    mocker.patch('questionary.confirm', return_value=MagicMock(ask=lambda: True))
+    assistant = AITerminalAssistant("test-model")
+    mocker.patch.object(assistant, "execute_command_with_live_output", return_value=("", "", 0))
+    generate = mocker.patch.object(assistant.command_executor, "generate_command", return_value="ls -S")
+
+    assistant.execute_command("list the large files")
+    assistant.execute_command("list large files")
+    assert generate.call_count == 1
+    assert assistant.semantic_cache.stats()["hits"] == 1
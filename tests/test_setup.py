@@ -0,0 +1,68 @@
+import os
+import pytest
+
+from promptshell import setup
+from promptshell.setup import get_config_snapshot, load_config, get_active_model, get_provider
+
+def _write_config(config_dir, content):
+    path = os.path.join(config_dir, "promptshell_config.conf")
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+def _bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+@pytest.mark.usefixtures("mock_config_dir")
+class TestConfigSnapshot:
+    def test_defaults_when_file_missing(self):
+        snapshot = get_config_snapshot()
+        assert snapshot.mode == "local"
+        assert snapshot.provider == "ollama"
+        assert snapshot.active_model == "llama3:8b-instruct-q4_1"
+
+    def test_snapshot_is_reused_until_file_changes(self, mock_config_dir, mocker):
+        path = _write_config(mock_config_dir, "MODE=api\nACTIVE_API_PROVIDER=openai\nAPI_MODEL=gpt-4o\n")
+        first = get_config_snapshot()
+        read_config = mocker.spy(setup, "_read_config")
+        assert get_config_snapshot() is first
+        assert read_config.call_count == 0
+
+        _write_config(mock_config_dir, "MODE=api\nACTIVE_API_PROVIDER=groq\nAPI_MODEL=gpt-4o\n")
+        _bump_mtime(path)
+        second = get_config_snapshot()
+        assert second is not first
+        assert second.provider == "groq"
+        assert first.provider == "openai"
+
+    def test_snapshot_is_immutable(self):
+        snapshot = get_config_snapshot()
+        with pytest.raises(TypeError):
+            snapshot["MODE"] = "api"
+
+    def test_load_config_returns_mutable_copy(self):
+        config = load_config()
+        config["MODE"] = "api"
+        assert get_config_snapshot()["MODE"] == "local"
+
+    def test_helpers_accept_explicit_config(self):
+        config = {"MODE": "api", "ACTIVE_API_PROVIDER": "anthropic", "API_MODEL": "claude", "LOCAL_MODEL": "llama3"}
+        assert get_provider(config) == "anthropic"
+        assert get_active_model(config) == "claude"
+
+def test_setup_wizard_keeps_settings_missing_from_the_template(mock_config_dir, mocker):
+    path = _write_config(mock_config_dir, "MODE=api\nOPENAI_BASE_URL=http://127.0.0.1:8765/v1\nOPENAI_RATE_LIMIT_RPM=60\n")
+    response = mocker.Mock()
+    response.json.return_value = {"models": [{"name": "llama3"}]}
+    mocker.patch("requests.get", return_value=response)
+    select = mocker.patch("promptshell.setup.questionary.select")
+    select.return_value.ask.side_effect = ["local (Privacy-first, needs 4GB+ RAM)", "llama3"]
+
+    setup.setup_wizard()
+    config = load_config()
+    assert (config["MODE"], config["LOCAL_MODEL"]) == ("local", "llama3")
+    assert config["OPENAI_BASE_URL"] == "http://127.0.0.1:8765/v1"
+    assert config["OPENAI_RATE_LIMIT_RPM"] == "60"
+    with open(path) as file:
+        assert file.read().count("\nOPENAI_BASE_URL=") == 1
@@ -0,0 +1,68 @@
+import os
+import json
+import sys
+import subprocess
+
+from promptshell.providers import PROVIDER_SDKS
+
+# Cold-start import budget for `promptshell.main`, in milliseconds. Override with
+# PROMPTSHELL_IMPORT_BUDGET_MS on slow CI machines.
+IMPORT_BUDGET_MS = float(os.environ.get("PROMPTSHELL_IMPORT_BUDGET_MS", "750"))
+
+def _run_python(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        capture_output=True,
+        text=True,
+    )
+
+def test_main_import_does_not_load_provider_sdks():
+    """Importing the entry point must not pull in any provider SDK or HTTP client."""
+    sdk_modules = sorted(set(PROVIDER_SDKS.values()) | {"requests"})
+    result = _run_python(
+        "import sys, promptshell.main\n"
+        f"print(','.join(m for m in {sdk_modules!r} if m in sys.modules))"
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+
+def test_cold_start_import_within_budget():
+    """Cold import of `promptshell.main` stays under the configured budget."""
+    result = _run_python("import promptshell.main", "-X", "importtime")
+    assert result.returncode == 0, result.stderr
+
+    # -X importtime lines look like: "import time:  self | cumulative | module"
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == "promptshell.main":
+            cumulative_us = int(parts[1])
+    assert cumulative_us is not None, result.stderr
+
+    elapsed_ms = cumulative_us / 1000
+    assert elapsed_ms <= IMPORT_BUDGET_MS, \
+        f"Cold start import took {elapsed_ms:.0f}ms (budget {IMPORT_BUDGET_MS:.0f}ms)"
+
+def test_profile_startup_json_report(tmp_path):
+    env = dict(os.environ, HOME=str(tmp_path), APPDATA=str(tmp_path))
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys; sys.argv = ['promptshell', '--profile-startup', '--json']; "
+                               "from promptshell.main import main; main()"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    assert result.returncode == 0, result.stderr
+
+    report = json.loads(result.stdout)
+    names = [phase["name"] for phase in report["phases"]]
+    assert names == [
+        "module imports",
+        "load_config",
+        "enable_ansi_support",
+        "setup_readline",
+        "AITerminalAssistant construction",
+        "first prompt render",
+    ]
+    assert all(phase["wall_ms"] >= 0 for phase in report["phases"])
+    assert report["total_ms"] >= report["phases"][0]["wall_ms"]
@@ -0,0 +1,121 @@
+import pytest
+import sqlite3
+
+from unittest.mock import AsyncMock, MagicMock
+from promptshell import telemetry
+from promptshell.telemetry import Telemetry, format_summary, parse_window, percentile
+from promptshell.node import Node
+from promptshell.providers import client_pool
+from promptshell.main import stats_report
+from promptshell.token_utils import estimate_message_tokens
+
+def test_parse_window():
+    assert parse_window("30m") == 1800
+    assert parse_window("24h") == 86400
+    assert parse_window("7d") == 7 * 86400
+    assert parse_window("all") is None
+    with pytest.raises(ValueError):
+        parse_window("yesterday")
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 90) == 90
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 99) == 3.0
+
+def test_summary_groups_by_role_and_provider(tmp_path, mocker):
+    store = Telemetry(str(tmp_path / "telemetry.sqlite3"))
+    for latency in (1.0, 2.0, 3.0, 4.0):
+        store.record("Command Executor", "groq", "llama", latency, prompt_tokens=100, completion_tokens=10)
+    store.record("Command Executor", "groq", "llama", 0.5, outcome="RateLimitError")
+    store.record("Debugger Expert", "openai", "gpt-4o", 6.0, prompt_tokens=900, completion_tokens=300, ttft=0.8)
+
+    executor, debugger = store.summary()
+    assert (executor["role"], executor["provider"]) == ("Command Executor", "groq")
+    assert executor["calls"] == 5
+    assert executor["errors"] == 1
+    assert (executor["p50"], executor["p90"], executor["p99"]) == (2.0, 4.0, 4.0)
+    assert executor["prompt_tokens"] == 400
+    assert debugger["ttft"] == 0.8
+
+    mocker.patch("promptshell.telemetry.time.time", return_value=10 ** 11)
+    assert store.summary(3600) == []
+    table = format_summary(store.summary(None), "all")
+    assert "Debugger Expert" in table and "all time" in table
+
+def test_node_calls_are_recorded(mocker):
+    client_pool.clear()
+    openai_module = MagicMock()
+    openai_module.AsyncOpenAI.return_value.chat.completions.create = AsyncMock()
+    response = openai_module.AsyncOpenAI.return_value.chat.completions.create.return_value
+    response.choices = [MagicMock(message=MagicMock(content="ls -la"))]
+    response.usage = MagicMock(prompt_tokens=120, completion_tokens=3)
+    mocker.patch('promptshell.node.load_sdk', return_value=openai_module)
+    config = {"MODE": "api", "ACTIVE_API_PROVIDER": "openai", "OPENAI_API_KEY": "sk-test", "RETRY_MAX_ATTEMPTS": "1"}
+
+    node = Node("gpt-4o", "Command Executor", config=config)
+    assert node("list files") == "ls -la"
+    openai_module.AsyncOpenAI.return_value.chat.completions.create.side_effect = ConnectionError("refused")
+    node("list files")
+    Node("gpt-4o", "Command Executor", config={**config, "TELEMETRY": "false"})("list files")
+
+    rows = telemetry.get_telemetry()._conn.execute(
+        "SELECT role, provider, model, prompt_tokens, completion_tokens, tokens_estimated, outcome, prompt_estimate "
+        "FROM calls"
+    ).fetchall()
+    assert rows[0][:-1] == ("Command Executor", "openai", "gpt-4o", 120, 3, 0, "ok")
+    fresh = Node("gpt-4o", "Command Executor", config=config)
+    assert rows[0][-1] == estimate_message_tokens(fresh._build_messages("list files"))
+    assert rows[1][-2] == "ConnectionError"
+    assert len([row for row in rows if row[1] == "openai"]) == 2
+    assert "Command Executor" in stats_report("1h")
+    assert "Invalid time window" in stats_report("soon")
+    client_pool.clear()
+
+def test_generate_command_records_ttft_and_estimates_missing_counts(mocker):
+    config = {"MODE": "local", "OLLAMA_HOST": "http://localhost:11434", "RETRY_MAX_ATTEMPTS": "1"}
+    node = Node("llama3", "Command Executor", config=config)
+
+    def fake_stream(messages):
+        yield "ls -la\n"
+        node._record_usage({"prompt_eval_count": 50})
+
+    mocker.patch.object(node, "_stream_ollama", side_effect=fake_stream)
+    assert node.generate_command("list all files") == "ls -la"
+
+    prompt_tokens, completion_tokens, estimated, ttft = telemetry.get_telemetry()._conn.execute(
+        "SELECT prompt_tokens, completion_tokens, tokens_estimated, ttft FROM calls ORDER BY time DESC LIMIT 1"
+    ).fetchone()
+    assert prompt_tokens == 50 and completion_tokens > 0
+    assert estimated == 1 and ttft is not None
+
+def test_summary_reports_estimated_share(tmp_path):
+    store = Telemetry(str(tmp_path / "telemetry.sqlite3"))
+    store.record("Command Executor", "ollama", "llama3", 1.0, prompt_tokens=60, completion_tokens=15)
+    store.record("Command Executor", "ollama", "llama3", 1.0, prompt_tokens=20, completion_tokens=5, tokens_estimated=True)
+
+    row, = store.summary()
+    assert row["estimated_share"] == 0.25
+    assert "25%" in format_summary([row], "24h")
+
+def test_summary_reports_mean_prompt_estimate(tmp_path):
+    path = str(tmp_path / "telemetry.sqlite3")
+    old = sqlite3.connect(path)
+    old.execute(
+        "CREATE TABLE calls (time REAL, role TEXT, provider TEXT, model TEXT, prompt_tokens INTEGER, "
+        "completion_tokens INTEGER, tokens_estimated INTEGER, ttft REAL, latency REAL, outcome TEXT)"
+    )
+    old.commit()
+    old.close()
+
+    store = Telemetry(path)
+    store.record("Command Executor", "groq", "llama", 1.0, prompt_tokens=100, completion_tokens=5, prompt_estimate=90)
+    store.record("Command Executor", "groq", "llama", 1.0, prompt_tokens=120, completion_tokens=5, prompt_estimate=110)
+    store.record("Debugger Expert", "groq", "llama", 1.0, prompt_tokens=300, completion_tokens=50)
+
+    executor, debugger = store.summary()
+    assert executor["prompt_estimate"] == 100
+    assert debugger["prompt_estimate"] is None
+    table = format_summary([executor, debugger], "24h")
+    assert "prompt est." in table and table.splitlines()[2].rstrip().endswith("100")
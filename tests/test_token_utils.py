@@ -0,0 +1,68 @@
+import logging
+
+from unittest.mock import MagicMock
+from promptshell.token_utils import PromptCacheStats, estimate_tokens, estimate_message_tokens, record_usage, track_usage, truncate_to_tokens
+from promptshell.node import Node
+from promptshell import ai_terminal_assistant
+from promptshell.ai_terminal_assistant import AITerminalAssistant
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a" * 400) == 100
+    assert estimate_tokens("ü" * 400) == 200
+
+def test_truncate_keeps_head_and_tail():
+    text = "HEAD" + "x" * 10000 + "TAIL"
+    truncated = truncate_to_tokens(text, 200)
+    assert truncated.startswith("HEAD")
+    assert truncated.endswith("TAIL")
+    assert "truncated" in truncated
+    assert estimate_tokens(truncated) <= 200
+    assert truncate_to_tokens("short", 200) == "short"
+
+def make_node(prompt_tokens):
+    return Node("test-model", "Tester", config={"MODE": "local", "OLLAMA_MODEL": "m"}, prompt_tokens=prompt_tokens)
+
+def test_additional_data_is_truncated_to_budget(caplog):
+    node = make_node(1000)
+    with caplog.at_level(logging.INFO, logger="promptshell.node"):
+        messages = node._build_messages("summarize", {"target_file": "big.log", "file_content": "line\n" * 100000})
+    assert "target_file: big.log" in messages[-1]["content"]
+    assert "truncated" in messages[-1]["content"]
+    assert estimate_message_tokens(messages) <= 1000
+    assert "Tester prompt: ~" in caplog.text
+
+def test_small_additional_data_is_untouched():
+    node = make_node(1000)
+    messages = node._build_messages("summarize", {"file_content": "hello"})
+    assert messages[-1]["content"] == "summarize\n\nAdditional data:\nfile_content: hello\n"
+
+def test_file_read_is_capped(mock_config_dir, tmp_path, mocker):
+    mocker.patch.object(ai_terminal_assistant, "MAX_FILE_READ_BYTES", 100)
+    big_file = tmp_path / "big.txt"
+    big_file.write_text("z" * 1000)
+    assistant = AITerminalAssistant("test-model")
+    data = assistant.gather_additional_data(f"read file {big_file}")
+    assert data["file_content"].startswith("z" * 100)
+    assert "file truncated after 100 characters" in data["file_content"]
+
+def test_nested_usage_is_added_to_outer_record():
+    with track_usage() as outer:
+        with track_usage() as inner:
+            record_usage(100, 5, cached_tokens=80)
+        record_usage(10, 1)
+    assert inner == {"prompt_tokens": 100, "completion_tokens": 5, "cached_tokens": 80}
+    assert outer == {"prompt_tokens": 110, "completion_tokens": 6, "cached_tokens": 80}
+
+def test_prompt_cache_stats_split_cached_calls():
+    stats = PromptCacheStats()
+    stats.record("Command Executor", {"prompt_tokens": 1000, "cached_tokens": 0, "cache_write_tokens": 900}, 2.0)
+    stats.record("Command Executor", {"prompt_tokens": 1000, "cached_tokens": 900}, 1.0)
+    stats.record("Command Executor", {}, 5.0)  # No usage reported
+
+    executor = stats.stats()["Command Executor"]
+    assert executor["calls"] == 2
+    assert executor["hit_rate"] == 0.45
+    assert executor["cache_write_tokens"] == 900
+    assert executor["cached_latency"] == 1.0
+    assert executor["uncached_latency"] == 2.0
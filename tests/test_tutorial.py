@@ -1,9 +1,14 @@
+import os
+
 from unittest.mock import patch, MagicMock
 from io import StringIO
 from promptshell.main import main
 
-def test_tutorial_command():
+def test_tutorial_command(mock_config_dir):
     """Test that entering --tutorial in the REPL launches the tutorial and prints the welcome message."""
+    with open(os.path.join(mock_config_dir, "promptshell_config.conf"), "w") as f:
+        f.write("MODE=local\n")
+
     def input_side_effect(*args, **kwargs):
         responses = iter(['--tutorial', 'exit'])
         def inner(*args, **kwargs):